@@ -0,0 +1,54 @@
+"""add holds queue
+
+Revision ID: 3f1a7c2b9d10
+Revises: e66344cec24d
+Create Date: 2026-10-19 10:05:12.418233
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1a7c2b9d10"
+down_revision: Union[str, None] = "e66344cec24d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "holds",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("reader_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("ready_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["book_id"],
+            ["books.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["reader_id"],
+            ["readers.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_holds_id"), "holds", ["id"], unique=False)
+    op.create_index(
+        "ix_holds_book_id_created_at",
+        "holds",
+        ["book_id", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_holds_book_id_created_at", table_name="holds")
+    op.drop_index(op.f("ix_holds_id"), table_name="holds")
+    op.drop_table("holds")
@@ -0,0 +1,36 @@
+"""add row versions to books and readers
+
+Revision ID: 5c9e1d7a4b20
+Revises: 8b2d4e6f1a3c
+Create Date: 2026-10-19 13:05:44.318270
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5c9e1d7a4b20"
+down_revision: Union[str, None] = "8b2d4e6f1a3c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ("books", "readers"):
+        op.add_column(
+            table,
+            sa.Column(
+                "version", sa.Integer(), server_default="1", nullable=False
+            ),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("books", "readers"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("version")
@@ -0,0 +1,67 @@
+"""add soft delete and archived loans
+
+Revision ID: a41f6c8e2d57
+Revises: 5c9e1d7a4b20
+Create Date: 2026-10-19 13:48:12.604931
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a41f6c8e2d57"
+down_revision: Union[str, None] = "5c9e1d7a4b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    live = sa.text("deleted_at IS NULL")
+    deleted = sa.text("deleted_at IS NOT NULL")
+    for table in ("books", "readers"):
+        op.add_column(
+            table, sa.Column("deleted_at", sa.DateTime(), nullable=True)
+        )
+        op.create_index(
+            f"ix_{table}_live_id",
+            table,
+            ["id"],
+            unique=False,
+            sqlite_where=live,
+            postgresql_where=live,
+        )
+        op.create_index(
+            f"ix_{table}_deleted_at",
+            table,
+            ["deleted_at"],
+            unique=False,
+            sqlite_where=deleted,
+            postgresql_where=deleted,
+        )
+    op.create_table(
+        "archived_loans",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("reader_id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("author", sa.String(), nullable=False),
+        sa.Column("reader_email", sa.String(), nullable=False),
+        sa.Column("borrow_date", sa.DateTime(), nullable=False),
+        sa.Column("return_date", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("archived_loans")
+    for table in ("books", "readers"):
+        op.drop_index(f"ix_{table}_deleted_at", table_name=table)
+        op.drop_index(f"ix_{table}_live_id", table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("deleted_at")
@@ -0,0 +1,96 @@
+"""add items
+
+Revision ID: b2f7c4e81d36
+Revises: f1c6a9d2e874
+Create Date: 2026-10-19 16:20:54.170392
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b2f7c4e81d36"
+down_revision: Union[str, None] = "f1c6a9d2e874"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Свободные экземпляры: copies плюс закреплённые за готовыми бронями
+# (их copies уже не учитывает). Номера 1..N даёт рекурсивный CTE, вся
+# вставка — один INSERT ... SELECT без чтения строк в Python.
+BACKFILL_AVAILABLE = """
+WITH RECURSIVE
+shelf AS (
+    SELECT books.id AS book_id,
+           books.copies + (
+               SELECT count(*) FROM holds
+               WHERE holds.book_id = books.id AND holds.status = 'ready'
+           ) AS total
+    FROM books
+),
+n(i) AS (
+    SELECT 1
+    UNION ALL
+    SELECT i + 1 FROM n WHERE i < (SELECT max(total) FROM shelf)
+)
+INSERT INTO items (barcode, book_id, status)
+SELECT 'B' || shelf.book_id || '-' || n.i, shelf.book_id, 'available'
+FROM shelf JOIN n ON n.i <= shelf.total
+"""
+# Экземпляры на руках: по одному на невозвращённую выдачу
+BACKFILL_ON_LOAN = """
+INSERT INTO items (barcode, book_id, status)
+SELECT 'L' || id, book_id, 'on_loan'
+FROM borrowed_books WHERE return_date IS NULL
+"""
+LINK_LOANS = """
+UPDATE borrowed_books SET item_id = (
+    SELECT items.id FROM items WHERE items.barcode = 'L' || borrowed_books.id
+)
+WHERE return_date IS NULL
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "items",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("barcode", sa.String(), nullable=False),
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["book_id"], ["books.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("barcode"),
+    )
+    op.create_index(
+        "ix_items_book_id_status",
+        "items",
+        ["book_id", "status"],
+        unique=False,
+    )
+    with op.batch_alter_table("borrowed_books") as batch_op:
+        batch_op.add_column(sa.Column("item_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_borrowed_books_item_id_items", "items", ["item_id"], ["id"]
+        )
+        batch_op.create_index(
+            "ix_borrowed_books_item_id", ["item_id"], unique=False
+        )
+    op.execute(BACKFILL_AVAILABLE)
+    op.execute(BACKFILL_ON_LOAN)
+    op.execute(LINK_LOANS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("borrowed_books") as batch_op:
+        batch_op.drop_index("ix_borrowed_books_item_id")
+        batch_op.drop_constraint(
+            "fk_borrowed_books_item_id_items", type_="foreignkey"
+        )
+        batch_op.drop_column("item_id")
+    op.drop_index("ix_items_book_id_status", table_name="items")
+    op.drop_table("items")
@@ -0,0 +1,40 @@
+"""add user admin flag
+
+Revision ID: b6e9c2f5a018
+Revises: f2b7d4a9e613
+Create Date: 2026-10-20 14:12:45.730519
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b6e9c2f5a018"
+down_revision: Union[str, None] = "f2b7d4a9e613"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column(
+            "is_admin", sa.Boolean(), server_default=sa.false(), nullable=False
+        ),
+    )
+    # Администратором становится первый библиотекарь (из init_db_app)
+    users = sa.table("users", sa.column("id"), sa.column("is_admin"))
+    first = sa.select(sa.func.min(users.c.id)).scalar_subquery()
+    op.execute(
+        users.update().where(users.c.id == first).values(is_admin=sa.true())
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("is_admin")
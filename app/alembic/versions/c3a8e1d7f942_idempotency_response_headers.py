@@ -0,0 +1,35 @@
+"""idempotency response headers
+
+Revision ID: c3a8e1d7f942
+Revises: b6e9c2f5a018
+Create Date: 2026-10-21 10:04:18.552307
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c3a8e1d7f942"
+down_revision: Union[str, None] = "b6e9c2f5a018"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "idempotency_keys", sa.Column("headers", sa.JSON(), nullable=True)
+    )
+    # Незавершённым захватам expires_at ставился на срок ответа (сутки);
+    # теперь захват продлевает сам запрос, поэтому старые освобождаем
+    keys = sa.table("idempotency_keys", sa.column("status_code"))
+    op.execute(keys.delete().where(keys.c.status_code.is_(None)))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("idempotency_keys") as batch_op:
+        batch_op.drop_column("headers")
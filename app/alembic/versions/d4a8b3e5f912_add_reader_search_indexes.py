@@ -0,0 +1,72 @@
+"""add reader search indexes
+
+Revision ID: d4a8b3e5f912
+Revises: c7d2e9f04b61
+Create Date: 2026-10-19 15:02:47.318205
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a8b3e5f912"
+down_revision: Union[str, None] = "c7d2e9f04b61"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FTS = "readers_name_fts"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_readers_email_lower",
+        "readers",
+        [sa.text("lower(email)")],
+        unique=False,
+    )
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        # Триграммный FTS5 по имени поверх readers, синхронизация триггерами
+        op.execute(
+            f"CREATE VIRTUAL TABLE {FTS} USING fts5("
+            "name, content='readers', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            f"CREATE TRIGGER {FTS}_ai AFTER INSERT ON readers BEGIN "
+            f"INSERT INTO {FTS}(rowid, name) VALUES (new.id, new.name); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {FTS}_ad AFTER DELETE ON readers BEGIN "
+            f"INSERT INTO {FTS}({FTS}, rowid, name) "
+            "VALUES ('delete', old.id, old.name); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {FTS}_au AFTER UPDATE OF name ON readers BEGIN "
+            f"INSERT INTO {FTS}({FTS}, rowid, name) "
+            "VALUES ('delete', old.id, old.name); "
+            f"INSERT INTO {FTS}(rowid, name) VALUES (new.id, new.name); END"
+        )
+        # Индекс по уже существующим читателям
+        op.execute(f"INSERT INTO {FTS}({FTS}) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX ix_readers_name_trgm ON readers "
+            "USING gin (lower(name) gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {FTS}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {FTS}")
+    elif dialect == "postgresql":
+        op.drop_index("ix_readers_name_trgm", table_name="readers")
+    op.drop_index("ix_readers_email_lower", table_name="readers")
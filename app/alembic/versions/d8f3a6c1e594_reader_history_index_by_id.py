@@ -0,0 +1,42 @@
+"""reader history index by id
+
+Revision ID: d8f3a6c1e594
+Revises: c5e1b8d3a720
+Create Date: 2026-10-20 10:41:27.604118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d8f3a6c1e594"
+down_revision: Union[str, None] = "c5e1b8d3a720"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = "ix_borrowed_books_reader_history"
+# История листается по id: он идёт сразу за reader_id, а branch_id
+# покрывает условие филиала
+NEW_COLUMNS = [
+    "reader_id",
+    "id",
+    "return_date",
+    "borrow_date",
+    "book_id",
+    "branch_id",
+]
+OLD_COLUMNS = ["reader_id", "return_date", "borrow_date", "book_id"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index(INDEX, table_name="borrowed_books")
+    op.create_index(INDEX, "borrowed_books", NEW_COLUMNS, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(INDEX, table_name="borrowed_books")
+    op.create_index(INDEX, "borrowed_books", OLD_COLUMNS, unique=False)
@@ -0,0 +1,170 @@
+"""add branches
+
+Revision ID: e8a3f5b70c29
+Revises: b2f7c4e81d36
+Create Date: 2026-10-19 17:05:12.486105
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e8a3f5b70c29"
+down_revision: Union[str, None] = "b2f7c4e81d36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Существующие данные попадают в филиал по умолчанию
+DEFAULT_BRANCH_ID = 1
+SCOPED = ("users", "books", "readers", "borrowed_books")
+# Безымянные UNIQUE из первой миграции: в SQLite имя даёт naming_convention
+# batch-режима, в PostgreSQL — сама СУБД (<таблица>_<колонка>_key)
+OLD_UNIQUE = {"books": "isbn", "readers": "email"}
+NEW_UNIQUE = {
+    "books": ("uq_books_isbn_branch", ["isbn", "branch_id"]),
+    "readers": ("uq_readers_branch_email", ["branch_id", "email"]),
+}
+FTS = "readers_name_fts"
+# Пересоздание readers в SQLite удаляет триггеры FTS-индекса имён
+FTS_TRIGGERS = [
+    f"CREATE TRIGGER {FTS}_ai AFTER INSERT ON readers BEGIN "
+    f"INSERT INTO {FTS}(rowid, name) VALUES (new.id, new.name); END",
+    f"CREATE TRIGGER {FTS}_ad AFTER DELETE ON readers BEGIN "
+    f"INSERT INTO {FTS}({FTS}, rowid, name) "
+    "VALUES ('delete', old.id, old.name); END",
+    f"CREATE TRIGGER {FTS}_au AFTER UPDATE OF name ON readers BEGIN "
+    f"INSERT INTO {FTS}({FTS}, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {FTS}(rowid, name) VALUES (new.id, new.name); END",
+]
+
+
+def _old_unique_name(dialect: str, table: str) -> str:
+    column = OLD_UNIQUE[table]
+    if dialect == "sqlite":
+        return f"uq_{table}_{column}"
+    return f"{table}_{column}_key"
+
+
+def _batch(table: str):
+    return op.batch_alter_table(
+        table,
+        naming_convention={"uq": "uq_%(table_name)s_%(column_0_name)s"},
+    )
+
+
+def _restore_fts_triggers(dialect: str):
+    if dialect == "sqlite":
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {FTS}_{suffix}")
+        for trigger in FTS_TRIGGERS:
+            op.execute(trigger)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    live = sa.text("deleted_at IS NULL")
+    op.create_table(
+        "branches",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.execute(
+        f"INSERT INTO branches (id, name) VALUES ({DEFAULT_BRANCH_ID}, 'Main')"
+    )
+    # Индексы заменяются составными с branch_id первым
+    op.drop_index("ix_readers_email_lower", table_name="readers")
+    for table in ("books", "readers"):
+        op.drop_index(f"ix_{table}_live_id", table_name=table)
+
+    for table in SCOPED:
+        with _batch(table) as batch_op:
+            batch_op.add_column(
+                sa.Column(
+                    "branch_id",
+                    sa.Integer(),
+                    server_default=str(DEFAULT_BRANCH_ID),
+                    nullable=False,
+                )
+            )
+            batch_op.create_foreign_key(
+                f"fk_{table}_branch_id_branches",
+                "branches",
+                ["branch_id"],
+                ["id"],
+            )
+            if table in OLD_UNIQUE:
+                batch_op.drop_constraint(
+                    _old_unique_name(dialect, table), type_="unique"
+                )
+                name, columns = NEW_UNIQUE[table]
+                batch_op.create_unique_constraint(name, columns)
+    _restore_fts_triggers(dialect)
+
+    for table in ("books", "readers"):
+        op.create_index(
+            f"ix_{table}_branch_live_id",
+            table,
+            ["branch_id", "id"],
+            unique=False,
+            sqlite_where=live,
+            postgresql_where=live,
+        )
+    op.create_index(
+        "ix_readers_branch_email_lower",
+        "readers",
+        ["branch_id", sa.text("lower(email)")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_borrowed_books_branch_id",
+        "borrowed_books",
+        ["branch_id", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    live = sa.text("deleted_at IS NULL")
+    op.drop_index("ix_borrowed_books_branch_id", table_name="borrowed_books")
+    op.drop_index("ix_readers_branch_email_lower", table_name="readers")
+    for table in ("books", "readers"):
+        op.drop_index(f"ix_{table}_branch_live_id", table_name=table)
+
+    for table in SCOPED:
+        with _batch(table) as batch_op:
+            if table in OLD_UNIQUE:
+                batch_op.drop_constraint(NEW_UNIQUE[table][0], type_="unique")
+                batch_op.create_unique_constraint(
+                    _old_unique_name(dialect, table), [OLD_UNIQUE[table]]
+                )
+            batch_op.drop_constraint(
+                f"fk_{table}_branch_id_branches", type_="foreignkey"
+            )
+            batch_op.drop_column("branch_id")
+    _restore_fts_triggers(dialect)
+
+    for table in ("books", "readers"):
+        op.create_index(
+            f"ix_{table}_live_id",
+            table,
+            ["id"],
+            unique=False,
+            sqlite_where=live,
+            postgresql_where=live,
+        )
+    op.create_index(
+        "ix_readers_email_lower",
+        "readers",
+        [sa.text("lower(email)")],
+        unique=False,
+    )
+    op.drop_table("branches")
@@ -0,0 +1,34 @@
+"""add reader history index
+
+Revision ID: f1c6a9d2e874
+Revises: d4a8b3e5f912
+Create Date: 2026-10-19 15:41:09.827514
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f1c6a9d2e874"
+down_revision: Union[str, None] = "d4a8b3e5f912"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_borrowed_books_reader_history",
+        "borrowed_books",
+        ["reader_id", "return_date", "borrow_date", "book_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_borrowed_books_reader_history", table_name="borrowed_books"
+    )
@@ -0,0 +1,53 @@
+"""audit log branch
+
+Revision ID: f2b7d4a9e613
+Revises: d8f3a6c1e594
+Create Date: 2026-10-20 11:37:02.319845
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "f2b7d4a9e613"
+down_revision: Union[str, None] = "d8f3a6c1e594"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NO_UPDATE = (
+    "CREATE TRIGGER audit_log_no_update BEFORE UPDATE ON audit_log "
+    "BEGIN SELECT RAISE(ABORT, 'audit_log is append-only'); END"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    op.add_column(
+        "audit_log", sa.Column("branch_id", sa.Integer(), nullable=True)
+    )
+    # Прежние записи получают филиал своего библиотекаря; на время
+    # заполнения журнал в SQLite разрешает UPDATE
+    if dialect == "sqlite":
+        op.execute("DROP TRIGGER audit_log_no_update")
+    op.execute(
+        "UPDATE audit_log SET branch_id = (SELECT users.branch_id "
+        "FROM users WHERE users.id = audit_log.actor_id)"
+    )
+    if dialect == "sqlite":
+        op.execute(NO_UPDATE)
+    op.create_index(
+        "ix_audit_log_branch",
+        "audit_log",
+        ["branch_id", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_audit_log_branch", table_name="audit_log")
+    op.drop_column("audit_log", "branch_id")
@@ -0,0 +1,190 @@
+"""Журнал аудита изменений (append-only).
+
+Эндпоинты после успешного commit вызывают ``AuditWriter.record``: запись
+только добавляется в буфер в памяти, поэтому аудит почти не влияет на
+время ответа. Фоновый поток раз в ``AUDIT_FLUSH_SECONDS`` секунд или при
+накоплении ``AUDIT_BATCH_SIZE`` записей пишет буфер одной пачкой
+(executemany) в ``audit_log`` — основной БД или отдельном файле из
+``AUDIT_DATABASE_URL``. Если запись отстаёт и буфер дорастает до
+``AUDIT_BUFFER_LIMIT``, сброс выполняется прямо в запросе.
+
+Записи, не успевшие попасть в БД при аварийном завершении процесса,
+теряются; при штатной остановке буфер сбрасывается в lifespan.
+"""
+
+from datetime import date, datetime
+import logging
+import threading
+
+from sqlalchemy import bindparam, insert, inspect, select, text, update
+
+from app.config_app import (
+    AUDIT_BATCH_SIZE,
+    AUDIT_BUFFER_LIMIT,
+    AUDIT_FLUSH_SECONDS,
+)
+from app.models import AUDIT_LOG_TRIGGERS, AuditEntry, User
+
+logger = logging.getLogger(__name__)
+
+table = AuditEntry.__table__
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def diff(before: dict = None, after: dict = None) -> dict:
+    """Изменившиеся поля: ``{поле: [было, стало]}``."""
+    before = before or {}
+    after = after or {}
+    return {
+        field: [_jsonable(before.get(field)), _jsonable(after.get(field))]
+        for field in {**before, **after}
+        if before.get(field) != after.get(field)
+    }
+
+
+def _backfill_branches(conn, users_engine):
+    """Записывает в старые записи филиал их библиотекаря."""
+    with users_engine.connect() as users:
+        rows = users.execute(
+            select(User.id.label("actor"), User.branch_id.label("branch"))
+        ).mappings()
+        rows = [dict(row) for row in rows]
+    if not rows:
+        return
+    sqlite = conn.dialect.name == "sqlite"
+    if sqlite:
+        # Единственное изменение журнала: триггер снимается на время
+        # заполнения
+        conn.execute(text("DROP TRIGGER IF EXISTS audit_log_no_update"))
+    conn.execute(
+        update(table)
+        .where(table.c.actor_id == bindparam("actor"))
+        .values(branch_id=bindparam("branch")),
+        rows,
+    )
+    if sqlite:
+        conn.execute(text(AUDIT_LOG_TRIGGERS[0]))
+
+
+def _upgrade_table(engine, users_engine=None):
+    """Догоняет схему журнала в отдельном файле, созданном прежней версией.
+
+    Миграции его не видят; колонка ``branch_id`` и её индекс добавляются
+    здесь, а старые записи получают филиал из ``users`` основной БД
+    (``users_engine``), как и при миграции.
+    """
+    columns = {
+        column["name"] for column in inspect(engine).get_columns(table.name)
+    }
+    if "branch_id" not in columns:
+        with engine.begin() as conn:
+            conn.execute(
+                text("ALTER TABLE audit_log ADD COLUMN branch_id INTEGER")
+            )
+            if users_engine is not None:
+                _backfill_branches(conn, users_engine)
+    for index in table.indexes:
+        index.create(engine, checkfirst=True)
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        engine,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_SECONDS,
+        buffer_limit: int = AUDIT_BUFFER_LIMIT,
+    ):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer_limit = buffer_limit
+        self._buffer = []
+        self._lock = threading.Lock()
+        # Пачки пишутся по одной, чтобы id шли в порядке записи
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def record(
+        self,
+        actor_id,
+        action: str,
+        entity: str,
+        entity_id,
+        before: dict = None,
+        after: dict = None,
+        branch_id: int = None,
+    ):
+        entry = {
+            "created_at": datetime.utcnow(),
+            "actor_id": actor_id,
+            "branch_id": branch_id,
+            "action": action,
+            "entity": entity,
+            "entity_id": entity_id,
+            "diff": diff(before, after),
+        }
+        with self._lock:
+            self._buffer.append(entry)
+            size = len(self._buffer)
+        if size >= self.buffer_limit:
+            self.flush()
+        elif size >= self.batch_size:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """Пишет накопленные записи одной транзакцией; возвращает их число."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(table), rows)
+            except Exception:
+                # Возвращаем пачку в начало буфера, порядок сохраняется
+                with self._lock:
+                    self._buffer[:0] = rows
+                raise
+            return len(rows)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit log flush failed, will retry")
+
+    def start(self, users_engine=None):
+        """Запускает фоновую запись; ``users_engine`` — основная БД."""
+        # Для отдельного файла таблицу создаём сами; в основной БД она
+        # уже есть после миграций
+        table.create(self.engine, checkfirst=True)
+        _upgrade_table(self.engine, users_engine)
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="audit-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
@@ -0,0 +1,41 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.dependencies import get_audit, get_current_user
+from app.models import AuditEntry
+from app.schemas import AuditEntryOut
+from app.serialization import json_stream_response, schema_columns
+
+router = APIRouter(prefix="/audit", tags=["audit"])
+
+
+# Потоковая выгрузка журнала аудита по возрастанию id
+@router.get("", response_model=List[AuditEntryOut])
+def export_audit_log(
+    since_id: int = Query(0, ge=0, description="Записи с id больше этого"),
+    entity: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    actor_id: Optional[int] = None,
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    # В выгрузку попадает всё, что записано до запроса
+    audit.flush()
+    # Журнал не в сессии с фильтром филиала, поэтому условие явное
+    stmt = select(*schema_columns(AuditEntryOut, AuditEntry)).where(
+        AuditEntry.branch_id == current_user.branch_id,
+        AuditEntry.id > since_id,
+    )
+    if entity is not None:
+        stmt = stmt.where(AuditEntry.entity == entity)
+    if entity_id is not None:
+        stmt = stmt.where(AuditEntry.entity_id == entity_id)
+    if actor_id is not None:
+        stmt = stmt.where(AuditEntry.actor_id == actor_id)
+    # Журнал может лежать в отдельной БД, поэтому сессия своя
+    return json_stream_response(
+        Session(audit.engine), stmt, AuditEntry.id, AuditEntryOut
+    )
@@ -0,0 +1,229 @@
+"""Резервное копирование и восстановление SQLite-базы библиотеки.
+
+Копия снимается онлайн через backup API SQLite (``sqlite3.Connection.backup``)
+порциями по ``BACKUP_PAGES_PER_STEP`` страниц с паузой между порциями:
+блокировка чтения держится только на время одной порции, и писатели
+(выдача и возврат книг) ждут не дольше неё. Если между порциями базу
+изменили, SQLite начинает копирование заново, поэтому при постоянной
+записи лучше увеличить порцию (``--pages 0`` — вся база за один шаг; в
+режиме WAL это снимок, который писателей не блокирует).
+
+Готовая копия проверяется ``PRAGMA integrity_check``, при необходимости
+сжимается gzip и только после этого появляется под своим именем.
+В каталоге остаются ``BACKUP_KEEP`` последних копий.
+
+Восстановление сначала проверяет копию, затем переносит её в базу тем же
+backup API (другие соединения видят новые данные целиком) и сверяет
+число строк в таблицах.
+
+Команды:
+    python -m app.backup_app backup --compress
+    python -m app.backup_app backup --every 3600   # по расписанию
+    python -m app.backup_app restore data/backups/library-....db.gz
+"""
+
+import argparse
+from datetime import datetime
+import gzip
+import os
+from pathlib import Path
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from app.config_app import (
+    BACKUP_DIR,
+    BACKUP_KEEP,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_SLEEP,
+)
+from app.database import engine
+
+# Без этих таблиц файл не считается копией базы библиотеки
+REQUIRED_TABLES = ("books", "readers", "borrowed_books", "users")
+
+
+class BackupError(Exception):
+    pass
+
+
+def database_path() -> str:
+    """Путь к файлу основной БД из DATABASE_URL."""
+    if engine.url.get_backend_name() != "sqlite" or not engine.url.database:
+        raise BackupError("Online backup is only supported for SQLite files")
+    return engine.url.database
+
+
+def verify(path) -> dict:
+    """Проверяет целостность файла SQLite; возвращает число строк таблиц."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if result != "ok":
+            raise BackupError(f"{path}: integrity check failed: {result}")
+        tables = {
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        missing = set(REQUIRED_TABLES) - tables
+        if missing:
+            raise BackupError(f"{path}: missing tables {sorted(missing)}")
+        return {
+            table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+            for table in REQUIRED_TABLES
+        }
+    except sqlite3.DatabaseError as exc:
+        raise BackupError(f"{path}: {exc}") from exc
+    finally:
+        conn.close()
+
+
+def _copy(
+    source: sqlite3.Connection,
+    target_path,
+    pages: int,
+    sleep: float,
+    standalone: bool = False,
+):
+    target = sqlite3.connect(target_path)
+    try:
+        # pages <= 0 — вся база за один шаг
+        source.backup(target, pages=pages if pages > 0 else -1, sleep=sleep)
+        if standalone:
+            # Режим WAL копируется вместе с заголовком; копии нужен один
+            # самодостаточный файл без -wal/-shm
+            target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+
+
+def rotate(backup_dir, keep: int) -> list:
+    """Удаляет старые копии, оставляя ``keep`` последних."""
+    backups = sorted(
+        path
+        for path in Path(backup_dir).glob("library-*.db*")
+        if path.name.endswith((".db", ".db.gz"))
+    )
+    removed = backups[:-keep] if keep > 0 else []
+    for path in removed:
+        path.unlink()
+    return removed
+
+
+def backup(
+    db_path=None,
+    backup_dir=BACKUP_DIR,
+    compress: bool = False,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    sleep: float = BACKUP_STEP_SLEEP,
+    keep: int = BACKUP_KEEP,
+) -> Path:
+    """Снимает проверенную копию базы; возвращает путь к ней."""
+    db_path = db_path or database_path()
+    backup_dir = Path(backup_dir)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    final = backup_dir / f"library-{stamp}.db"
+    partial = backup_dir / f"{final.name}.part"
+
+    source = sqlite3.connect(db_path)
+    try:
+        _copy(source, partial, pages, sleep, standalone=True)
+    finally:
+        source.close()
+    try:
+        verify(partial)
+        if compress:
+            final = final.with_name(final.name + ".gz")
+            packed = final.with_name(final.name + ".part")
+            with open(partial, "rb") as raw, gzip.open(packed, "wb") as gz:
+                shutil.copyfileobj(raw, gz)
+            partial.unlink()
+            partial = packed
+        # Под своим именем копия появляется только целиком
+        os.replace(partial, final)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    rotate(backup_dir, keep)
+    return final
+
+
+def restore(backup_path, db_path=None) -> dict:
+    """Восстанавливает базу из копии; возвращает число строк таблиц."""
+    db_path = db_path or database_path()
+    backup_path = Path(backup_path)
+    with tempfile.TemporaryDirectory(dir=Path(db_path).parent) as tmp:
+        plain = backup_path
+        if backup_path.suffix == ".gz":
+            plain = Path(tmp) / backup_path.stem
+            with gzip.open(backup_path, "rb") as gz, open(plain, "wb") as raw:
+                shutil.copyfileobj(gz, raw)
+        expected = verify(plain)
+        source = sqlite3.connect(plain)
+        try:
+            _copy(source, db_path, pages=0, sleep=0)
+        finally:
+            source.close()
+    restored = verify(db_path)
+    if restored != expected:
+        raise BackupError(
+            f"Restored row counts {restored} differ from backup {expected}"
+        )
+    return restored
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Library database backup")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    make = commands.add_parser("backup", help="снять копию")
+    make.add_argument("--dir", default=BACKUP_DIR)
+    make.add_argument("--compress", action="store_true")
+    make.add_argument(
+        "--pages",
+        type=int,
+        default=BACKUP_PAGES_PER_STEP,
+        help="страниц за шаг (0 — всё за один шаг)",
+    )
+    make.add_argument("--sleep", type=float, default=BACKUP_STEP_SLEEP)
+    make.add_argument("--keep", type=int, default=BACKUP_KEEP)
+    make.add_argument(
+        "--every",
+        type=float,
+        default=0,
+        help="повторять каждые N секунд (0 — один раз)",
+    )
+
+    back = commands.add_parser("restore", help="восстановить из копии")
+    back.add_argument("backup")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Запуск резервного копирования или восстановления."""
+    args = parse_args(argv)
+    if args.command == "restore":
+        counts = restore(args.backup)
+        print(f"Восстановлено из {args.backup}: {counts}")
+        return
+    while True:
+        started = time.monotonic()
+        path = backup(
+            backup_dir=args.dir,
+            compress=args.compress,
+            pages=args.pages,
+            sleep=args.sleep,
+            keep=args.keep,
+        )
+        print(f"Копия {path} за {time.monotonic() - started:.2f} с")
+        if args.every <= 0:
+            return
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,38 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.dependencies import get_current_user, get_db
-from app.models import Book
-from app.schemas import BookCreate, BookOut, BookUpdate
+from app import queries
+from app.bookkeeping_app import has_active_loans
+from app.config_app import FAST_JSON_RESPONSES
+from app.database import insert_ignore
+from app.dependencies import (
+    etag,
+    get_audit,
+    get_current_user,
+    get_db,
+    get_live,
+    get_read_db,
+    if_match_version,
+    not_found_or_conflict,
+    versioned_update,
+)
+from app.events import book_change, publish
+from app.hold_app import assign_copies_to_holds, notify_holds, open_holds
+from app.item_app import create_items, withdraw_items
+from app.models import Book, Hold
+from app.schemas import (
+    BookCreate,
+    BookOut,
+    BookPatch,
+    BookUpdate,
+    BranchAvailabilityOut,
+)
+from app.serialization import json_stream_response, rows_to_dicts
+from app.tenancy import ALL_BRANCHES
 
 router = APIRouter(prefix="/books", tags=["books"])
 
@@ -15,29 +42,57 @@ router = APIRouter(prefix="/books", tags=["books"])
 def add_book(
     book: BookCreate,
     db: Session = Depends(get_db),
+    audit=Depends(get_audit),
     current_user=Depends(get_current_user),
 ):
     if book.copies is not None and book.copies < 0:
         raise HTTPException(status_code=400, detail="Copies must be >= 0")
-    new_book = Book(
-        title=book.title,
-        author=book.author,
-        year=book.year,
-        isbn=book.isbn,
-        copies=book.copies if book.copies is not None else 1,
+    # INSERT ... RETURNING: строка приходит обратно без отдельного SELECT;
+    # занятый в филиале ISBN — конфликт uq_books_isbn_branch, RETURNING пуст
+    new_book = db.scalar(
+        insert_ignore(db.get_bind(Book).dialect.name, Book)
+        .values(
+            title=book.title,
+            author=book.author,
+            year=book.year,
+            isbn=book.isbn,
+            copies=book.copies if book.copies is not None else 1,
+            branch_id=current_user.branch_id,
+        )
+        .returning(Book)
     )
-    db.add(new_book)
+    if new_book is None:
+        raise HTTPException(
+            status_code=409, detail="Book with this ISBN already exists"
+        )
+    create_items(db, new_book.id, new_book.copies)
+    change = book_change("created", new_book)
+    result = BookOut.model_validate(new_book)
     db.commit()
-    db.refresh(new_book)
-    return new_book
+    publish(change)
+    audit.record(
+        current_user.id,
+        "create",
+        "book",
+        result.id,
+        None,
+        result.model_dump(),
+        branch_id=current_user.branch_id,
+    )
+    return result
 
 
 # Получение списка книг (Read)
 @router.get("", response_model=List[BookOut])
 def get_books(
-    db: Session = Depends(get_db), current_user=Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
 ):
-    books = db.query(Book).all()
+    if FAST_JSON_RESPONSES:
+        return json_stream_response(
+            db, queries.LIVE_BOOK_ROWS, Book.id, BookOut
+        )
+    books = db.scalars(queries.LIVE_BOOKS).all()
     return books
 
 
@@ -45,33 +100,125 @@ def get_books(
 @router.get("/{book_id}", response_model=BookOut)
 def get_book(
     book_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user=Depends(get_current_user),
 ):
-    book = db.query(Book).get(book_id)
+    book = get_live(db, Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
+    response.headers["ETag"] = etag(book.version)
     return book
 
 
+# Наличие книги во всех филиалах
+@router.get(
+    "/{book_id}/availability", response_model=List[BranchAvailabilityOut]
+)
+def get_book_availability(
+    book_id: int,
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    book = get_live(db, Book, book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    # Без ISBN книгу не сопоставить с другими филиалами
+    if book.isbn is None:
+        stmt, value = queries.AVAILABILITY["id"], book.id
+    else:
+        stmt, value = queries.AVAILABILITY["isbn"], book.isbn
+    rows = db.execute(stmt, {"value": value}, execution_options=ALL_BRANCHES)
+    return rows_to_dicts(rows, BranchAvailabilityOut)
+
+
+def _update_book(
+    db: Session,
+    book_id: int,
+    values: dict,
+    expected_version: Optional[int],
+    response: Response,
+    audit,
+    actor,
+) -> BookOut:
+    """Меняет только переданные колонки одним UPDATE ... RETURNING.
+
+    Тот же запрос возвращает прежние значения этих колонок для журнала
+    аудита и для подписчиков прежнего жанра.
+    """
+    stmt = versioned_update(Book, book_id, values, expected_version)
+    try:
+        row = db.execute(stmt).first()
+    except IntegrityError:
+        # ISBN уже у другой книги филиала (uq_books_isbn_branch)
+        db.rollback()
+        raise HTTPException(status_code=409, detail="ISBN already in use")
+    if row is None:
+        raise not_found_or_conflict(db, Book, book_id, "Book")
+    book, before = row[0], dict(zip(values, row[1:]))
+    # copies — кэш свободных экземпляров: их заводят или списывают под него
+    if "copies" in values:
+        delta = book.copies - before["copies"]
+        create_items(db, book_id, delta)
+        withdraw_items(db, book_id, -delta)
+    # Новые экземпляры сначала достаются стоящим в очереди
+    ready = assign_copies_to_holds(db, book)
+    if ready:
+        db.flush()
+    change = book_change("updated", book, before.get("genre"))
+    result = BookOut.model_validate(book)
+    db.commit()
+    notify_holds(ready)
+    publish(change)
+    audit.record(
+        actor.id,
+        "update",
+        "book",
+        book_id,
+        before,
+        {field: getattr(result, field) for field in before},
+        branch_id=actor.branch_id,
+    )
+    response.headers["ETag"] = etag(result.version)
+    return result
+
+
 # Обновление книги (Update)
 @router.put("/{book_id}", response_model=BookOut)
 def update_book(
     book_id: int,
     book_data: BookUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
     db: Session = Depends(get_db),
+    audit=Depends(get_audit),
     current_user=Depends(get_current_user),
 ):
-    book = db.query(Book).get(book_id)
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
     if book_data.copies is not None and book_data.copies < 0:
         raise HTTPException(status_code=400, detail="Copies must be >= 0")
-    for field, value in book_data.dict(exclude_unset=True).items():
-        setattr(book, field, value)
-    db.commit()
-    db.refresh(book)
-    return book
+    values = book_data.dict(exclude_unset=True)
+    return _update_book(
+        db, book_id, values, expected_version, response, audit, current_user
+    )
+
+
+# Частичное обновление книги: меняются только переданные поля
+@router.patch("/{book_id}", response_model=BookOut)
+def patch_book(
+    book_id: int,
+    book_data: BookPatch,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    values = book_data.model_dump(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    return _update_book(
+        db, book_id, values, expected_version, response, audit, current_user
+    )
 
 
 # Удаление книги (Delete)
@@ -79,11 +226,31 @@ def update_book(
 def delete_book(
     book_id: int,
     db: Session = Depends(get_db),
+    audit=Depends(get_audit),
     current_user=Depends(get_current_user),
 ):
-    book = db.query(Book).get(book_id)
+    book = get_live(db, Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    db.delete(book)
+    if has_active_loans(db, "book_id", book_id):
+        raise HTTPException(status_code=409, detail="Book has copies on loan")
+    # Строка остаётся ради истории выдач, её удалит фоновая очистка
+    deleted_at = datetime.utcnow()
+    book.deleted_at = deleted_at
+    holds = open_holds(db, Hold.book_id == book_id)
+    for hold in holds:
+        hold.status = "cancelled"
+    change = book_change("deleted", book)
     db.commit()
+    notify_holds(holds)
+    publish(change)
+    audit.record(
+        current_user.id,
+        "delete",
+        "book",
+        book_id,
+        {"deleted_at": None},
+        {"deleted_at": deleted_at},
+        branch_id=current_user.branch_id,
+    )
     return None
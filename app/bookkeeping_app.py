@@ -4,104 +4,200 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.dependencies import get_current_user, get_db  # JWT-аутентификация
-from app.models import Book, BorrowedBook, Reader
+from app import queries
+from app.config_app import FAST_JSON_RESPONSES
+from app.dependencies import (  # JWT-аутентификация
+    get_audit,
+    get_current_user,
+    get_db,
+    get_live,
+    get_read_db,
+)
+from app.events import book_change, publish
+from app.hold_app import assign_copies_to_holds, notify_holds
+from app.models import Book, BorrowedBook, Hold, Item, Reader, new_barcode
 from app.schemas import (
     BorrowedBookOut,
     BorrowedBookWithTitleOut,
     BorrowRequest,
     ReturnRequest,
 )
+from app.serialization import json_stream_response
 
 router = APIRouter(prefix="/borrow", tags=["borrow"])
 
 
-# Эндпоинт выдачи книги читателю
-@router.post("", response_model=BorrowedBookOut, status_code=200)
-def borrow_book(
-    borrow_data: BorrowRequest,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
-):
-    book = db.query(Book).get(borrow_data.book_id)
-    reader = db.query(Reader).get(borrow_data.reader_id)
+def has_active_loans(db: Session, column: str, value: int) -> bool:
+    """Есть ли невозвращённые выдачи с ``column`` (book_id/reader_id)."""
+    stmt = queries.ACTIVE_LOAN_ID[column]
+    return db.scalar(stmt, {"id": value}) is not None
 
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    if not reader:
-        raise HTTPException(status_code=404, detail="Reader not found")
+
+def check_can_borrow(db: Session, book: Book, reader_id: int):
+    """Проверяет, что читателю можно выдать книгу; возвращает его бронь.
+
+    Экземпляр, закреплённый за читателем по готовой брони, выдаётся вне
+    очереди, даже если свободных (``copies``) нет.
+    """
+    hold = db.scalars(
+        queries.READY_HOLD, {"book_id": book.id, "reader_id": reader_id}
+    ).first()
 
     # Проверка доступных экземпляров
-    if book.copies <= 0:
+    if hold is None and book.copies <= 0:
         raise HTTPException(
             status_code=400, detail="No available copies of this book"
         )
 
     # Проверка количества выданных книг у читателя (не более 3)
-    active_borrows_count = (
-        db.query(BorrowedBook)
-        .filter(
-            BorrowedBook.reader_id == borrow_data.reader_id,
-            BorrowedBook.return_date.is_(None),
-        )
-        .count()
+    active_borrows_count = db.scalar(
+        queries.ACTIVE_LOAN_COUNT, {"reader_id": reader_id}
     )
     if active_borrows_count >= 3:
         raise HTTPException(
             status_code=400, detail="Reader already has 3 borrowed books"
         )
+    return hold
+
+
+def lend(
+    db: Session, book: Book, reader_id: int, item: Item, hold: Optional[Hold]
+) -> BorrowedBook:
+    """Выдаёт экземпляр ``item``: запись о выдаче, статус и кэш copies.
 
-    # Создаём запись о выдаче
+    У экземпляра нет версии, поэтому статус меняется условным UPDATE; 409,
+    если экземпляр уже выдал или списал другой запрос.
+    """
+    if db.execute(queries.TAKE_ITEM, {"item_id": item.id}).rowcount == 0:
+        raise HTTPException(
+            status_code=409, detail="Item was taken by another request"
+        )
     borrowed = BorrowedBook(
-        book_id=borrow_data.book_id, reader_id=borrow_data.reader_id
+        book_id=book.id,
+        reader_id=reader_id,
+        item_id=item.id,
+        branch_id=book.branch_id,
     )
-    book.copies -= 1
+    if hold is not None:
+        hold.status = "fulfilled"
+    else:
+        book.copies -= 1
     db.add(borrowed)
-    db.commit()
-    db.refresh(borrowed)
+    db.flush()
     return borrowed
 
 
+def take_back(db: Session, borrowed: BorrowedBook, book: Book) -> list:
+    """Закрывает выдачу и возвращает экземпляр на полку.
+
+    Возвращает готовые брони для ``notify_holds``: вернувшийся экземпляр
+    сразу закрепляется за первым в очереди.
+    """
+    borrowed.return_date = datetime.utcnow()
+    if borrowed.item_id is not None:
+        db.get(Item, borrowed.item_id).status = "available"
+    else:
+        # Выдача сделана до появления экземпляров: заводим его при возврате
+        db.add(Item(barcode=new_barcode(), book_id=book.id))
+    book.copies += 1
+    return assign_copies_to_holds(db, book)
+
+
+# Эндпоинт выдачи книги читателю
+@router.post("", response_model=BorrowedBookOut, status_code=200)
+def borrow_book(
+    borrow_data: BorrowRequest,
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    book = get_live(db, Book, borrow_data.book_id)
+    reader = get_live(db, Reader, borrow_data.reader_id)
+
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    if not reader:
+        raise HTTPException(status_code=404, detail="Reader not found")
+
+    hold = check_can_borrow(db, book, borrow_data.reader_id)
+    # Любой свободный экземпляр: при готовой брони он за ней и закреплён
+    item = db.scalars(
+        queries.AVAILABLE_ITEMS, {"book_id": book.id, "count": 1}
+    ).first()
+    if item is None:
+        raise HTTPException(
+            status_code=400, detail="No available copies of this book"
+        )
+    borrowed = lend(db, book, borrow_data.reader_id, item, hold)
+    change = book_change("borrowed", book)
+    result = BorrowedBookOut.model_validate(borrowed)
+    db.commit()
+    publish(change)
+    audit.record(
+        current_user.id,
+        "borrow",
+        "loan",
+        result.id,
+        None,
+        result.model_dump(),
+        branch_id=current_user.branch_id,
+    )
+    return result
+
+
 # Эндпоинт возврата книги читателем
 @router.post("/return", response_model=dict)
 def return_book(
     return_data: ReturnRequest,
     db: Session = Depends(get_db),
+    audit=Depends(get_audit),
     current_user=Depends(get_current_user),
 ):
-    borrowed: Optional[BorrowedBook] = (
-        db.query(BorrowedBook)
-        .filter(
-            BorrowedBook.book_id == return_data.book_id,
-            BorrowedBook.reader_id == return_data.reader_id,
-            BorrowedBook.return_date.is_(None),
-        )
-        .first()
-    )
+    borrowed: Optional[BorrowedBook] = db.scalars(
+        queries.ACTIVE_LOAN,
+        {"book_id": return_data.book_id, "reader_id": return_data.reader_id},
+    ).first()
     if not borrowed:
         raise HTTPException(
             status_code=400,
             detail="No active borrow record found for this book and reader",
         )
 
-    book = db.query(Book).get(return_data.book_id)
+    book = db.get(Book, return_data.book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
-    borrowed.return_date = datetime.utcnow()
-    book.copies += 1
+    loan_id = borrowed.id
+    ready = take_back(db, borrowed, book)
+    return_date = borrowed.return_date
+    change = book_change("returned", book)
     db.commit()
+    notify_holds(ready)
+    publish(change)
+    audit.record(
+        current_user.id,
+        "return",
+        "loan",
+        loan_id,
+        {"return_date": None},
+        {"return_date": return_date},
+        branch_id=current_user.branch_id,
+    )
     return {"msg": "Book successfully returned"}
 
 
 # Эндпоинт для списка взятых читателем книг
 @router.get("", response_model=List[BorrowedBookWithTitleOut])
 def list_borrowed_books_with_title(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user=Depends(get_current_user),
 ):
     """Получить список всех взятых книг с названиями."""
-    borrowed_books = db.query(BorrowedBook).join(Book).all()
+    if FAST_JSON_RESPONSES:
+        return json_stream_response(
+            db, queries.LOAN_ROWS, BorrowedBook.id, BorrowedBookWithTitleOut
+        )
+    borrowed_books = db.scalars(queries.LOANS_WITH_BOOK).all()
     return [
         {
             "id": borrowed.id,
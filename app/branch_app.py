@@ -0,0 +1,61 @@
+"""Филиалы библиотеки.
+
+Книги, читатели, выдачи и библиотекари принадлежат филиалу; запросы
+роутеров ограничиваются филиалом библиотекаря (``app.tenancy``).
+"""
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.dependencies import (
+    get_admin_user,
+    get_audit,
+    get_current_user,
+    get_db,
+    get_read_db,
+)
+from app.models import Branch
+from app.schemas import BranchCreate, BranchOut
+
+router = APIRouter(prefix="/branches", tags=["branches"])
+
+
+# Список филиалов
+@router.get("", response_model=List[BranchOut])
+def get_branches(
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    return db.scalars(queries.BRANCHES).all()
+
+
+# Открытие филиала (только администратор)
+@router.post("", response_model=BranchOut, status_code=201)
+def add_branch(
+    branch: BranchCreate,
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_admin_user),
+):
+    if db.scalar(queries.BRANCH_ID_BY_NAME, {"name": branch.name}):
+        raise HTTPException(
+            status_code=409, detail="Branch with this name already exists"
+        )
+    new_branch = Branch(name=branch.name)
+    db.add(new_branch)
+    db.flush()
+    result = BranchOut.model_validate(new_branch)
+    db.commit()
+    audit.record(
+        current_user.id,
+        "create",
+        "branch",
+        result.id,
+        None,
+        result.model_dump(),
+        branch_id=current_user.branch_id,
+    )
+    return result
@@ -0,0 +1,59 @@
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.config_app import SSE_HEARTBEAT_SECONDS, SSE_QUEUE_SIZE
+from app.dependencies import get_current_user, get_db
+from app.events import branch_topic, bus
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+def feed_topics(branch_id: int, book_ids, genres) -> list:
+    topics = [f"book:{book_id}" for book_id in book_ids or ()]
+    topics += [f"genre:{genre}" for genre in genres or ()]
+    return [branch_topic(branch_id, topic) for topic in topics or ["books"]]
+
+
+async def sse_stream(subscription, heartbeat: float):
+    """События подписки в формате text/event-stream."""
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            event = await subscription.get(heartbeat)
+            if event is None:
+                # Комментарий не даёт прокси закрыть простаивающее соединение
+                yield b": keep-alive\n\n"
+                continue
+            data = json.dumps(event, ensure_ascii=False)
+            yield f"event: {event['action']}\ndata: {data}\n\n".encode()
+    finally:
+        subscription.close()
+
+
+# Поток изменений наличия книг (Server-Sent Events)
+@router.get("/books")
+async def book_changes(
+    book_id: Optional[List[int]] = Query(None),
+    genre: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Изменения ``copies`` и каталога; фильтр по ``book_id`` и ``genre``.
+
+    Без фильтров приходят события по всем книгам филиала библиотекаря.
+    """
+    topics = feed_topics(current_user.branch_id, book_id, genre)
+    # Соединение с БД нужно только для проверки токена: простаивающие
+    # подписчики не должны занимать пул
+    await run_in_threadpool(db.close)
+    subscription = bus.subscribe(*topics, maxsize=SSE_QUEUE_SIZE)
+    return StreamingResponse(
+        sse_stream(subscription, SSE_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,3 +1,128 @@
-SECRET_KEY = "your-secret-key"
+import json
+import os
+
+# Значения по умолчанию нет: без SIGNING_KEYS или SECRET_KEY приложение
+# не стартует (tokens.check_signing_keys)
+SECRET_KEY = os.getenv("SECRET_KEY", "")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_WEEKS = 1
+# Ключи подписи по kid: JSON {"kid": "секрет", ...} в SIGNING_KEYS (пусто —
+# один ключ SECRET_KEY с kid "default", им же проверяются токены без kid).
+# Новые токены подписываются ключом SIGNING_KID, остальные ключи только
+# проверяют уже выданные: для ротации добавьте новый ключ, переключите
+# SIGNING_KID, а старый удалите, когда истекут его refresh-токены
+SIGNING_KEYS = json.loads(os.getenv("SIGNING_KEYS") or "{}") or (
+    {"default": SECRET_KEY} if SECRET_KEY else {}
+)
+SIGNING_KID = os.getenv("SIGNING_KID") or next(iter(SIGNING_KEYS), None)
+# Срок жизни токена доступа (минуты) и refresh-токена (дни)
+ACCESS_TOKEN_EXPIRE_MINUTES = int(
+    os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15")
+)
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+# Отозванные токены: размер фильтра Блума в битах, число хэш-функций и
+# период (секунды), с которым процесс подтягивает отзывы других воркеров
+REVOCATION_FILTER_BITS = int(os.getenv("REVOCATION_FILTER_BITS", "1048576"))
+REVOCATION_FILTER_HASHES = int(os.getenv("REVOCATION_FILTER_HASHES", "7"))
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+
+# Реплики для чтения: строки подключения через запятую,
+# например "sqlite:////srv/replica.db,postgresql://replica/library"
+READ_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("READ_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# Сколько секунд после записи чтения библиотекаря идут в основную БД
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Быстрый путь для списков: выборка колонок и кодирование через orjson
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Сколько строк кодируется за одну порцию потокового ответа
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+# Ответы меньше этого размера (в байтах) не сжимаются
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+
+# Ограничение частоты запросов: префикс пути -> (токенов в секунду, ёмкость)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+RATE_LIMITS = {
+    "/librarian/login": (5 / 60, 5),  # 5 попыток, затем одна в 12 секунд
+    "*": (20, 100),
+}
+# Пусто — счётчики в памяти процесса, иначе путь к общему файлу SQLite
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "")
+
+# Сколько соединений открыть в пуле при старте процесса
+POOL_WARM_CONNECTIONS = int(os.getenv("POOL_WARM_CONNECTIONS", "5"))
+
+# Поток изменений (SSE): период keep-alive и длина очереди подписчика
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+
+# Idempotency-Key: POST-эндпоинты (пути или шаблоны маршрутов), срок
+# хранения ответа, ожидание повтора
+IDEMPOTENT_PATHS = (
+    "/borrow",
+    "/borrow/return",
+    "/books",
+    "/readers",
+    "/holds",
+    "/items/{barcode}/borrow",
+    "/items/{barcode}/return",
+)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Сколько повтор ждёт первый запрос; на столько же выполняющийся запрос
+# продлевает захват ключа, так что ключ упавшего воркера освобождается
+# не позже чем через это время
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+
+# Мягкое удаление: через сколько дней удалённые книги и читатели вместе с
+# историей выдач переносятся в archived_loans и удаляются окончательно
+SOFT_DELETE_RETENTION_DAYS = int(os.getenv("SOFT_DELETE_RETENTION_DAYS", "30"))
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+# Период фоновой очистки; 0 — очистка не запускается
+PURGE_INTERVAL_SECONDS = int(os.getenv("PURGE_INTERVAL_SECONDS", "3600"))
+
+# Журнал аудита: отдельная БД (пусто — основная), размер пачки, период
+# сброса буфера и предел буфера, после которого запись идёт синхронно
+AUDIT_DATABASE_URL = os.getenv("AUDIT_DATABASE_URL", "")
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+AUDIT_BUFFER_LIMIT = int(os.getenv("AUDIT_BUFFER_LIMIT", "10000"))
+
+# Выгрузка таблиц для аналитики: строк в одной порции (record batch)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+
+# Резервные копии SQLite: каталог, сколько копий хранить, страниц за шаг
+# backup API и пауза между шагами (секунды)
+BACKUP_DIR = os.getenv("BACKUP_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "backups"
+)
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "1024"))
+BACKUP_STEP_SLEEP = float(os.getenv("BACKUP_STEP_SLEEP", "0.01"))
+
+# Профилирование запросов: доля профилируемых запросов, токен для заголовка
+# X-Profile (пустой — по заголовку нельзя), период выборки стеков
+# (секунды), каталог свёрнутых стеков и сколько файлов хранить
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_INTERVAL_SECONDS = float(
+    os.getenv("PROFILE_INTERVAL_SECONDS", "0.005")
+)
+PROFILE_DIR = os.getenv("PROFILE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "profiles"
+)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "500"))
+
+# Постраничные списки читателей (GET /readers?limit=...&after_id=...) и их
+# выдач (GET /readers/{id}/loans): размер страницы по умолчанию и наибольший
+READERS_PAGE_SIZE = int(os.getenv("READERS_PAGE_SIZE", "50"))
+READERS_MAX_PAGE_SIZE = int(os.getenv("READERS_MAX_PAGE_SIZE", "500"))
@@ -1,19 +1,138 @@
+from contextlib import contextmanager
+import os
 from os.path import abspath, dirname, join
+import random
+import time
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, configure_mappers, sessionmaker
+
+from app.config_app import READ_REPLICA_URLS, READ_YOUR_WRITES_SECONDS
 
 BASE_DIR = dirname(abspath(__file__))
 DATA_DIR = join(BASE_DIR, "..", "data")
 DB_PATH = join(DATA_DIR, "library.db")
 
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL: читатели не блокируют писателя, когда воркеров несколько
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def make_engine(url: str):
+    connect_args = {}
+    if url.startswith("sqlite"):
+        connect_args["check_same_thread"] = False  # только для SQLite
+    new_engine = create_engine(
+        url, connect_args=connect_args, pool_pre_ping=True
+    )
+    if url.startswith("sqlite") and new_engine.url.database not in (
+        None,
+        "",
+        ":memory:",
+    ):
+        event.listen(new_engine, "connect", _sqlite_pragmas)
+    return new_engine
+
+
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
+replica_engines = [make_engine(url) for url in READ_REPLICA_URLS]
+
+# Время последней записи по каждому библиотекарю (read-your-writes)
+_last_write_at: dict = {}
+
+
+def wrote_recently(actor) -> bool:
+    if actor is None:
+        return False
+    last = _last_write_at.get(actor)
+    return (
+        last is not None and time.monotonic() - last < READ_YOUR_WRITES_SECONDS
+    )
+
+
+class RoutingSession(Session):
+    """Сессия, отправляющая чтения на реплики, а запись — в основную БД.
+
+    На реплику уходят только запросы сессий с ``info["read_only"]``, пока
+    сессия ничего не записала и её автор не писал в последние
+    ``READ_YOUR_WRITES_SECONDS`` секунд.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.info["wrote"] = True
+        elif (
+            replica_engines
+            and self.info.get("read_only")
+            and not self.info.get("wrote")
+            and not wrote_recently(self.info.get("actor"))
+        ):
+            # В пределах сессии держимся одной реплики
+            if "replica" not in self.info:
+                self.info["replica"] = random.choice(replica_engines)
+            return self.info["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+@contextmanager
+def on_primary(db: Session):
+    """Запросы внутри блока идут в основную БД, даже у сессии для чтения.
+
+    Для данных, отставание которых недопустимо: отзыв токена, сделанный
+    секунду назад, на реплике может ещё не появиться.
+    """
+    read_only = db.info.pop("read_only", False)
+    try:
+        yield db
+    finally:
+        if read_only:
+            db.info["read_only"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_write(session):
+    actor = session.info.get("actor")
+    if actor is not None and session.info.get("wrote"):
+        _last_write_at[actor] = time.monotonic()
+
+
+def insert_ignore(dialect_name: str, table):
+    """INSERT ... ON CONFLICT DO NOTHING для SQLite и PostgreSQL."""
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    return dialect.insert(table).on_conflict_do_nothing()
+
+
+def warm_up(engines=None, connections: int = 5):
+    """Готовит процесс к первым запросам: маппинги и пул соединений."""
+    configure_mappers()
+    for warm_engine in engines or [engine, *replica_engines]:
+        opened = []
+        try:
+            for _ in range(connections):
+                conn = warm_engine.connect()
+                opened.append(conn)
+                conn.execute(text("SELECT 1"))
+        finally:
+            # Соединения возвращаются в пул и переиспользуются запросами
+            for conn in opened:
+                conn.close()
+
+
+def dispose_engines(engines=None):
+    for used_engine in engines or [engine, *replica_engines]:
+        used_engine.dispose()
+
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},  # только для SQLite
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
 def get_db():
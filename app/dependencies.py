@@ -1,11 +1,16 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
-from app.config_app import ALGORITHM, SECRET_KEY
-from app.database import get_db  # получение сессии БД
+from app import queries
+from app.database import get_db, on_primary  # получение сессии БД
 from app.models import User
+from app.profiling import phase
+from app.tenancy import set_branch
+from app.tokens import InvalidToken, decode_token, revocations
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/librarian/login")
 
@@ -13,20 +18,123 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/librarian/login")
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
 ):
+    with phase("auth"):
+        return _authenticate(db, token)
+
+
+def _authenticate(db: Session, token: str):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         user_id_str = payload.get("sub")
-        if user_id_str is None:
+        # refresh-токен годится только для POST /librarian/refresh, а
+        # токен без jti (выдан до появления отзыва) нельзя отозвать
+        if (
+            user_id_str is None
+            or payload.get("typ") != "access"
+            or "jti" not in payload
+        ):
             raise credentials_exception
         user_id = int(user_id_str)
-    except (JWTError, ValueError):
+    except (InvalidToken, ValueError):
         raise credentials_exception
-    user = db.query(User).get(user_id)
+    # Отзыв и новый библиотекарь могут ещё не дойти до реплики
+    with on_primary(db):
+        revocations.sync(db)
+        if revocations.is_revoked(db, payload["jti"]):
+            raise credentials_exception
+        user = db.get(User, user_id)
     if user is None:
         raise credentials_exception
+    db.info["actor"] = user.id  # для read-your-writes при работе с репликами
+    set_branch(db, user.branch_id)  # дальше сессия видит только свой филиал
     return user
+
+
+def get_admin_user(current_user=Depends(get_current_user)):
+    """Библиотекарь с правами администратора сети филиалов."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return current_user
+
+
+def get_read_db(db: Session = Depends(get_db)):
+    """Сессия для безопасных GET-запросов: чтения могут идти на реплику."""
+    db.info["read_only"] = True
+    return db
+
+
+def get_audit(request: Request):
+    """Журнал аудита приложения (``AuditWriter``)."""
+    return request.app.state.audit_log
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def if_match_version(
+    if_match: Optional[str] = Header(None),
+) -> Optional[int]:
+    """Ожидаемая версия из If-Match; None — обновлять без проверки."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+
+
+def get_live(db: Session, model, obj_id: int):
+    """Книга или читатель по id; мягко удалённые считаются отсутствующими."""
+    obj = db.get(model, obj_id)
+    if obj is None or obj.deleted_at is not None:
+        return None
+    return obj
+
+
+def not_found_or_conflict(db: Session, model, obj_id: int, name: str):
+    """Причина, по которой условный UPDATE не затронул ни одной строки."""
+    if db.scalar(queries.LIVE_ID[model], {"id": obj_id}) is None:
+        return HTTPException(status_code=404, detail=f"{name} not found")
+    return HTTPException(
+        status_code=412, detail=f"{name} was modified by another request"
+    )
+
+
+def versioned_update(
+    model, obj_id: int, values: dict, expected_version: Optional[int]
+):
+    """UPDATE ... RETURNING живой строки вместе с прежними значениями.
+
+    Строка результата — ``(объект, *прежние значения values)``. Прежние
+    значения читает тот же запрос: CTE с ``FOR UPDATE`` блокирует строку
+    в PostgreSQL, а ``MATERIALIZED`` в SQLite вычисляет его до изменения
+    строки (RETURNING видит только новые значения таблицы).
+    """
+    old = (
+        select(model.id, *(getattr(model, field) for field in values))
+        .where(model.id == obj_id, model.deleted_at.is_(None))
+        .with_for_update()
+        .cte("old")
+        .prefix_with("MATERIALIZED")
+    )
+    stmt = (
+        update(model)
+        .where(model.id.in_(select(old.c.id)))
+        .values(**values, version=model.version + 1)
+        .returning(
+            model,
+            *(select(old.c[field]).scalar_subquery() for field in values),
+        )
+    )
+    if expected_version is not None:
+        stmt = stmt.where(model.version == expected_version)
+    return stmt
@@ -0,0 +1,124 @@
+"""Внутрипроцессная шина событий (pub/sub) для push-уведомлений.
+
+Подписчики — асинхронные обработчики (long-poll, SSE), у каждого своя
+ограниченная очередь в своём event loop. Публиковать можно из любого
+потока, в том числе из синхронных эндпоинтов в threadpool: доставка идёт
+через ``loop.call_soon_threadsafe``. Подписки индексируются по топикам,
+поэтому публикация затрагивает только заинтересованных подписчиков.
+Топики книг начинаются с филиала (``branch_topic``): подписчик получает
+изменения только своего филиала.
+
+Шина живёт в памяти одного воркера: события из других процессов
+сюда не попадают.
+"""
+
+import asyncio
+from collections import defaultdict
+import threading
+
+
+class Subscription:
+    def __init__(self, bus, topics, maxsize: int):
+        self.bus = bus
+        self.topics = topics
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _deliver(self, event):
+        # Медленный подписчик теряет самые старые события, а не тормозит
+        # публикацию и не растит память
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float = None):
+        """Следующее событие или None, если за ``timeout`` ничего не пришло."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class EventBus:
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, *topics: str, maxsize: int = 100) -> Subscription:
+        """Подписка на топики; вызывать из работающего event loop."""
+        subscription = Subscription(self, topics, maxsize)
+        with self._lock:
+            for topic in topics:
+                self._subscriptions[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscriptions.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[topic]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(set().union(*self._subscriptions.values()))
+
+    def publish(self, topics, event: dict):
+        """Доставляет ``event`` подписчикам любого из ``topics`` (по разу)."""
+        with self._lock:
+            targets = set()
+            for topic in topics:
+                targets.update(self._subscriptions.get(topic, ()))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription._deliver, event
+                )
+            except RuntimeError:
+                # Event loop подписчика уже закрыт
+                self.unsubscribe(subscription)
+
+
+bus = EventBus()
+
+
+def branch_topic(branch_id: int, topic: str) -> str:
+    return f"branch:{branch_id}:{topic}"
+
+
+def book_change(action: str, book, *extra_genres) -> tuple:
+    """Топики и событие об изменении книги для ``bus.publish``.
+
+    Собирается до commit, пока атрибуты книги не истекли; ``extra_genres``
+    — прежний жанр, если он изменился.
+    """
+    topics = ["books", f"book:{book.id}"]
+    topics.extend(
+        f"genre:{genre}" for genre in {book.genre, *extra_genres} if genre
+    )
+    topics = [branch_topic(book.branch_id, topic) for topic in topics]
+    event = {
+        "type": "book",
+        "action": action,
+        "book_id": book.id,
+        "genre": book.genre,
+        "copies": book.copies,
+    }
+    return topics, event
+
+
+def publish(change: tuple):
+    bus.publish(*change)
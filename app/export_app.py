@@ -0,0 +1,309 @@
+"""Выгрузка таблиц для аналитики: CSV, Arrow IPC или Parquet.
+
+Строки читаются серверным курсором (``stream_results``) порциями по
+``EXPORT_CHUNK_SIZE`` и сразу кодируются, так что память не зависит от
+размера таблицы. Каждая порция — отдельный record batch (Arrow) или
+row group (Parquet). Для форматов Arrow и Parquet нужен pyarrow
+(``pip install .[export]``).
+
+Для ночных дельт выдачи можно выгружать инкрементально: ``since_id`` —
+выдачи с id больше заданного, ``since`` — выданные или возвращённые
+начиная с этого момента.
+
+Через API выгружаются строки филиала библиотекаря, в команде — все
+филиалы или один (``--branch-id``).
+
+Команда (выдачи после id 1200 в Parquet):
+    python -m app.export_app borrowed_books --format parquet --since-id 1200
+"""
+
+import argparse
+import csv
+from datetime import datetime
+import importlib.util
+import io
+import sys
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.config_app import EXPORT_CHUNK_SIZE
+from app.database import engine
+from app.dependencies import get_current_user, get_read_db
+from app.models import Book, BorrowedBook, Item, Reader
+
+# pyarrow — необязательная зависимость, и импортируется он долго, поэтому
+# при старте только проверяем, что он установлен
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+TABLES = {
+    "books": Book.__table__,
+    "readers": Reader.__table__,
+    "borrowed_books": BorrowedBook.__table__,
+    "items": Item.__table__,
+}
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+
+class _Sink:
+    """Файл для pyarrow/csv, из которого записанное забирается порциями."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _pyarrow():
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    return pyarrow
+
+
+def _arrow_type(pyarrow, column):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return pyarrow.timestamp("us")
+    if python_type is bool:
+        return pyarrow.bool_()
+    if python_type is int:
+        return pyarrow.int64()
+    return pyarrow.string()
+
+
+class _CsvWriter:
+    def __init__(self, sink, columns):
+        self._sink = sink
+        self._text = io.StringIO()
+        self._csv = csv.writer(self._text)
+        self._csv.writerow([column.name for column in columns])
+
+    def write(self, rows):
+        self._csv.writerows(rows)
+        self._sink.write(self._text.getvalue().encode("utf-8"))
+        self._text.seek(0)
+        self._text.truncate()
+
+    def close(self):
+        pass
+
+
+class _ArrowWriter:
+    def __init__(self, sink, columns, file_format: str):
+        pyarrow = self._pyarrow = _pyarrow()
+        self._schema = pyarrow.schema(
+            [(column.name, _arrow_type(pyarrow, column)) for column in columns]
+        )
+        if file_format == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(sink, self._schema)
+        else:
+            self._writer = pyarrow.ipc.new_stream(sink, self._schema)
+
+    def write(self, rows):
+        pyarrow = self._pyarrow
+        arrays = [
+            pyarrow.array(values, type=field.type)
+            for values, field in zip(zip(*rows), self._schema)
+        ]
+        self._writer.write_batch(
+            pyarrow.record_batch(arrays, schema=self._schema)
+        )
+
+    def close(self):
+        self._writer.close()
+
+
+def export_statement(
+    table_name: str,
+    since_id: int = None,
+    since: datetime = None,
+    branch_id: int = None,
+):
+    """SELECT всех колонок таблицы по возрастанию id.
+
+    ``since_id`` и ``since`` применяются только к ``borrowed_books``;
+    ``branch_id`` оставляет строки одного филиала (экземпляры — по книге).
+    """
+    table = TABLES[table_name]
+    stmt = select(table).order_by(table.c.id)
+    if branch_id is not None:
+        if "branch_id" in table.c:
+            stmt = stmt.where(table.c.branch_id == branch_id)
+        else:
+            stmt = stmt.where(
+                table.c.book_id.in_(
+                    select(Book.id).where(Book.branch_id == branch_id)
+                )
+            )
+    if table_name == "borrowed_books":
+        if since_id is not None:
+            stmt = stmt.where(table.c.id > since_id)
+        if since is not None:
+            stmt = stmt.where(
+                or_(table.c.borrow_date >= since, table.c.return_date >= since)
+            )
+    return stmt
+
+
+def iter_export(
+    db,
+    table_name: str,
+    file_format: str = "csv",
+    since_id: int = None,
+    since: datetime = None,
+    chunk_size: int = None,
+    branch_id: int = None,
+):
+    """Байты выгрузки по мере чтения; ``db`` — Session или Connection."""
+    if file_format != "csv" and not HAS_PYARROW:
+        raise RuntimeError(f"pyarrow is required for {file_format} export")
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    columns = list(TABLES[table_name].columns)
+    sink = _Sink()
+    if file_format == "csv":
+        writer = _CsvWriter(sink, columns)
+    else:
+        writer = _ArrowWriter(sink, columns, file_format)
+    stmt = export_statement(
+        table_name, since_id, since, branch_id
+    ).execution_options(stream_results=True, max_row_buffer=chunk_size)
+    result = db.execute(stmt)
+    try:
+        for rows in result.partitions(chunk_size):
+            writer.write(rows)
+            yield sink.take()
+        writer.close()
+        yield sink.take()
+    finally:
+        result.close()
+
+
+def _stream(db: Session, chunks):
+    try:
+        yield from chunks
+    finally:
+        # Генератор переживает выход из зависимости get_db
+        db.close()
+
+
+# Потоковая выгрузка таблицы (с реплики, если она настроена)
+@router.get("/{table_name}")
+def export_table(
+    table_name: str,
+    file_format: str = Query(
+        "csv", alias="format", pattern="^(csv|arrow|parquet)$"
+    ),
+    since_id: Optional[int] = Query(None, ge=0),
+    since: Optional[datetime] = None,
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    if table_name not in TABLES:
+        raise HTTPException(status_code=404, detail="Unknown table")
+    if file_format != "csv" and not HAS_PYARROW:
+        raise HTTPException(
+            status_code=501, detail=f"{file_format} export requires pyarrow"
+        )
+    # Выгружается только филиал библиотекаря
+    chunks = iter_export(
+        db,
+        table_name,
+        file_format,
+        since_id,
+        since,
+        branch_id=current_user.branch_id,
+    )
+    extension = "arrows" if file_format == "arrow" else file_format
+    return StreamingResponse(
+        _stream(db, chunks),
+        media_type=MEDIA_TYPES[file_format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{table_name}.{extension}"'
+            )
+        },
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export a library table")
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument(
+        "--format",
+        dest="file_format",
+        choices=sorted(MEDIA_TYPES),
+        default="csv",
+    )
+    parser.add_argument(
+        "-o", "--output", help="файл выгрузки (по умолчанию stdout)"
+    )
+    parser.add_argument("--since-id", type=int, help="выдачи с id больше")
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="выдачи, выданные или возвращённые с этого момента (ISO 8601)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument(
+        "--branch-id", type=int, help="только этот филиал (по умолчанию все)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Выгрузка таблицы в файл или stdout."""
+    args = parse_args(argv)
+    if args.file_format != "csv" and not HAS_PYARROW:
+        raise SystemExit(f"pyarrow is required for {args.file_format} export")
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        with engine.connect() as conn:
+            for chunk in iter_export(
+                conn,
+                args.table,
+                args.file_format,
+                args.since_id,
+                args.since,
+                args.chunk_size,
+                args.branch_id,
+            ):
+                output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
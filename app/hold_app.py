@@ -0,0 +1,180 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.dependencies import get_audit, get_current_user, get_db, get_live
+from app.events import book_change, bus, publish
+from app.models import Book, Hold, Reader
+from app.schemas import HoldCreate, HoldOut
+
+router = APIRouter(prefix="/holds", tags=["holds"])
+
+
+def hold_topic(hold_id: int) -> str:
+    return f"hold:{hold_id}"
+
+
+def assign_copies_to_holds(db: Session, book: Book) -> list:
+    """Закрепляет свободные экземпляры за первыми в очереди.
+
+    Вызывается в транзакции, которая увеличила ``book.copies``; закреплённый
+    экземпляр сразу списывается из ``copies``. Возвращает готовые брони,
+    о которых нужно уведомить после commit.
+    """
+    if book.copies <= 0:
+        return []
+    ready = db.scalars(
+        queries.WAITING_HOLDS, {"book_id": book.id, "copies": book.copies}
+    ).all()
+    for hold in ready:
+        hold.status = "ready"
+        hold.ready_at = datetime.utcnow()
+        book.copies -= 1
+    return ready
+
+
+def notify_holds(holds: list):
+    for hold in holds:
+        bus.publish(
+            [hold_topic(hold.id)],
+            {"type": "hold", "hold_id": hold.id, "status": hold.status},
+        )
+
+
+def cancel_holds(db: Session, holds: list) -> tuple:
+    """Отменяет брони; закреплённые экземпляры переходят следующим в очереди.
+
+    Возвращает брони для ``notify_holds`` и изменения книг для ``publish``
+    — и то и другое отправляется после commit.
+    """
+    notified, changes = [], []
+    for hold in holds:
+        # Книга не видна, если она в другом филиале: экземпляр не
+        # возвращается в чужой учёт
+        book = db.get(Book, hold.book_id) if hold.status == "ready" else None
+        if book is not None:
+            book.copies += 1
+            notified.extend(assign_copies_to_holds(db, book))
+            changes.append(book_change("updated", book))
+        hold.status = "cancelled"
+        notified.append(hold)
+    return notified, changes
+
+
+def open_holds(db: Session, *criteria) -> list:
+    return (
+        db.query(Hold)
+        .filter(*criteria, Hold.status.in_(queries.OPEN_HOLD_STATUSES))
+        .all()
+    )
+
+
+def _get_hold(db: Session, hold_id: int) -> Hold:
+    hold = db.scalars(queries.HOLD_BY_ID, {"id": hold_id}).first()
+    if not hold:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    return hold
+
+
+# Постановка в очередь на книгу
+@router.post("", response_model=HoldOut, status_code=201)
+def place_hold(
+    hold_data: HoldCreate,
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    book = get_live(db, Book, hold_data.book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    if not get_live(db, Reader, hold_data.reader_id):
+        raise HTTPException(status_code=404, detail="Reader not found")
+    if book.copies > 0:
+        raise HTTPException(
+            status_code=400, detail="Book has available copies"
+        )
+    existing = db.scalar(
+        queries.OPEN_HOLD_ID,
+        {"book_id": hold_data.book_id, "reader_id": hold_data.reader_id},
+    )
+    if existing is not None:
+        raise HTTPException(
+            status_code=409, detail="Reader already has a hold on this book"
+        )
+    hold = Hold(book_id=hold_data.book_id, reader_id=hold_data.reader_id)
+    db.add(hold)
+    db.flush()
+    result = HoldOut.model_validate(hold)
+    db.commit()
+    audit.record(
+        current_user.id,
+        "create",
+        "hold",
+        result.id,
+        None,
+        result.model_dump(),
+        branch_id=current_user.branch_id,
+    )
+    return result
+
+
+# Получение брони
+@router.get("/{hold_id}", response_model=HoldOut)
+def get_hold(
+    hold_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    return _get_hold(db, hold_id)
+
+
+# Long-poll: ответ приходит, как только экземпляр закреплён за читателем
+@router.get("/{hold_id}/wait", response_model=HoldOut)
+async def wait_for_hold(
+    hold_id: int,
+    timeout: float = Query(25, ge=0, le=60),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Ждёт смены статуса ``waiting`` не дольше ``timeout`` секунд."""
+    # Подписываемся до чтения статуса, чтобы не пропустить событие
+    with bus.subscribe(hold_topic(hold_id)) as subscription:
+        hold = await run_in_threadpool(_get_hold, db, hold_id)
+        if hold.status == "waiting":
+            # Пока ждём, соединение возвращается в пул
+            await run_in_threadpool(db.close)
+            if await subscription.get(timeout):
+                hold = await run_in_threadpool(_get_hold, db, hold_id)
+    return hold
+
+
+# Отмена брони; закреплённый экземпляр переходит следующему в очереди
+@router.delete("/{hold_id}", status_code=204)
+def cancel_hold(
+    hold_id: int,
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    hold = _get_hold(db, hold_id)
+    if hold.status not in ("waiting", "ready"):
+        raise HTTPException(status_code=400, detail="Hold is already closed")
+    status = hold.status
+    notified, changes = cancel_holds(db, [hold])
+    db.commit()
+    notify_holds(notified)
+    for change in changes:
+        publish(change)
+    audit.record(
+        current_user.id,
+        "cancel",
+        "hold",
+        hold_id,
+        {"status": status},
+        {"status": "cancelled"},
+        branch_id=current_user.branch_id,
+    )
+    return None
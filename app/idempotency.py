@@ -0,0 +1,291 @@
+"""Поддержка заголовка Idempotency-Key для повторяемых POST-запросов.
+
+Первый запрос с ключом занимает строку в ``idempotency_keys``
+(INSERT ... ON CONFLICT DO NOTHING), выполняется, и его ответ вместе с
+заголовками (ETag, Location, Link) сохраняется на
+``IDEMPOTENCY_TTL_SECONDS``. Повторы получают сохранённый ответ с
+заголовком ``Idempotent-Replayed: true`` и ничего не пишут в БД.
+Повтор, пришедший, пока первый запрос ещё выполняется, ждёт его: в том же
+воркере — по событию, в другом — опрашивая таблицу.
+
+Ключ действует в пределах клиента (``sub`` из JWT или IP). Ответы 5xx не
+сохраняются, чтобы повтор мог выполниться заново. Пока запрос
+выполняется, он продлевает занятую строку на ``IDEMPOTENCY_WAIT_SECONDS``;
+строку упавшего воркера можно занять заново, когда продление истекло.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+import hashlib
+import itertools
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select, update
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.routing import compile_path
+
+from app.config_app import IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_WAIT_SECONDS
+from app.database import insert_ignore
+from app.models import IdempotencyKey
+from app.rate_limit import client_identity
+
+table = IdempotencyKey.__table__
+
+# Заголовки, которые Response выставляет сам при повторе
+NOT_STORED_HEADERS = {"content-length", "content-type"}
+
+
+def _lease_until(now):
+    """До какого момента выполняющийся запрос держит ключ."""
+    return now + timedelta(seconds=IDEMPOTENCY_WAIT_SECONDS)
+
+
+class IdempotencyStore:
+    # Просроченные ключи удаляются попутно, раз в столько захватов
+    PURGE_EVERY = 500
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._claims = itertools.count(1)
+
+    def claim(self, key: str, fingerprint: str):
+        """Пытается занять ключ.
+
+        Возвращает ("claimed", None), ("done", строка), ("in_progress", None)
+        или ("mismatch", None).
+        """
+        now = datetime.utcnow()
+        if next(self._claims) % self.PURGE_EVERY == 0:
+            self.purge_expired(now)
+        with self.engine.begin() as conn:
+            # Просроченные ответы и непродлённые захваты упавших запросов
+            # можно занимать заново
+            conn.execute(
+                delete(table).where(
+                    table.c.key == key, table.c.expires_at <= now
+                )
+            )
+            inserted = conn.execute(
+                insert_ignore(self.engine.dialect.name, table).values(
+                    key=key,
+                    fingerprint=fingerprint,
+                    created_at=now,
+                    expires_at=_lease_until(now),
+                )
+            )
+            if inserted.rowcount == 1:
+                return "claimed", None
+            row = conn.execute(select(table).where(table.c.key == key)).first()
+        if row is None:
+            return "in_progress", None
+        if row.fingerprint != fingerprint:
+            return "mismatch", None
+        if row.status_code is None:
+            return "in_progress", None
+        return "done", row
+
+    def renew(self, key):
+        """Продлевает захват ключа выполняющимся запросом."""
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.key == key, table.c.status_code.is_(None))
+                .values(expires_at=_lease_until(datetime.utcnow()))
+            )
+
+    def complete(self, key, status_code, content_type, headers, body):
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.key == key)
+                .values(
+                    status_code=status_code,
+                    content_type=content_type,
+                    headers=headers,
+                    body=body,
+                    expires_at=datetime.utcnow()
+                    + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+                )
+            )
+
+    def release(self, key):
+        with self.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.key == key))
+
+    def purge_expired(self, now=None):
+        with self.engine.begin() as conn:
+            conn.execute(
+                delete(table).where(
+                    table.c.expires_at <= (now or datetime.utcnow())
+                )
+            )
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, paths):
+        """``paths`` — пути POST-эндпоинтов, принимающих Idempotency-Key.
+
+        Путь с параметрами задаётся шаблоном маршрута, например
+        ``/items/{barcode}/borrow``.
+        """
+        self.app = app
+        self.paths = {path for path in paths if "{" not in path}
+        self.patterns = [
+            compile_path(path)[0] for path in paths if "{" in path
+        ]
+        # Выполняющиеся в этом воркере запросы: ключ -> (loop, Event)
+        self._inflight = {}
+
+    async def __call__(self, scope, receive, send):
+        store = header = None
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and self._accepts(scope["path"])
+        ):
+            store = getattr(scope["app"].state, "idempotency_store", None)
+            header = Headers(scope=scope).get("idempotency-key")
+        if store is None or header is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(header) <= 255:
+            response = JSONResponse(
+                {"detail": "Invalid Idempotency-Key"}, status_code=400
+            )
+            await response(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(
+            b"\n".join([scope["path"].encode(), body])
+        ).hexdigest()
+        key = f"{client_identity(scope)}|{header}"
+
+        response = await self._wait_for_turn(store, key, fingerprint)
+        if response is not None:
+            await response(scope, receive, send)
+            return
+        await self._run_once(store, key, body, scope, receive, send)
+
+    def _accepts(self, path: str) -> bool:
+        return path in self.paths or any(
+            pattern.match(path) for pattern in self.patterns
+        )
+
+    async def _wait_for_turn(self, store, key, fingerprint):
+        """None, если ключ занят нами, иначе готовый ответ клиенту."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            state, row = await run_in_threadpool(store.claim, key, fingerprint)
+            if state == "claimed":
+                return None
+            if state == "done":
+                response = Response(
+                    row.body,
+                    status_code=row.status_code,
+                    media_type=row.content_type,
+                )
+                for name, value in row.headers or []:
+                    response.headers.append(name, value)
+                response.headers["Idempotent-Replayed"] = "true"
+                return response
+            if state == "mismatch":
+                return JSONResponse(
+                    {
+                        "detail": "Idempotency-Key was used "
+                        "with a different request"
+                    },
+                    status_code=422,
+                )
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return JSONResponse(
+                    {
+                        "detail": "A request with this Idempotency-Key "
+                        "is still in progress"
+                    },
+                    status_code=409,
+                    headers={"Retry-After": "1"},
+                )
+            inflight = self._inflight.get(key)
+            if inflight is not None and inflight[0] is loop:
+                try:
+                    await asyncio.wait_for(inflight[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                # Первый запрос выполняется в другом воркере
+                await asyncio.sleep(min(0.05, remaining))
+
+    async def _run_once(self, store, key, body, scope, receive, send):
+        done = asyncio.Event()
+        self._inflight[key] = (asyncio.get_running_loop(), done)
+        lease = asyncio.create_task(self._keep_lease(store, key))
+        body_sent = False
+        status_code = None
+        content_type = None
+        headers = []
+        chunks = []
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body}
+            return await receive()
+
+        async def capture_send(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in Headers(raw=message["headers"]).items():
+                    if name == "content-type":
+                        content_type = value
+                    elif name not in NOT_STORED_HEADERS:
+                        headers.append([name, value])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            try:
+                await self.app(scope, replay_receive, capture_send)
+            finally:
+                lease.cancel()
+        except BaseException:
+            await run_in_threadpool(store.release, key)
+            raise
+        else:
+            if status_code is not None and status_code < 500:
+                await run_in_threadpool(
+                    store.complete,
+                    key,
+                    status_code,
+                    content_type,
+                    headers,
+                    b"".join(chunks),
+                )
+            else:
+                await run_in_threadpool(store.release, key)
+        finally:
+            del self._inflight[key]
+            done.set()
+
+    @staticmethod
+    async def _keep_lease(store, key):
+        # Продлеваем заранее, чтобы захват не истёк между продлениями
+        while True:
+            await asyncio.sleep(IDEMPOTENCY_WAIT_SECONDS / 3)
+            await run_in_threadpool(store.renew, key)
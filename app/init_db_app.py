@@ -1,11 +1,11 @@
 import os
 
-from passlib.hash import bcrypt
 from sqlalchemy import create_engine, inspect, select
 from sqlalchemy.orm import sessionmaker
 
 # Импортируем модели (из models.py)
 from app.models import User
+from app.tokens import hash_password
 
 # Путь к базе данных
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -43,8 +43,10 @@ def add_first_librarian_if_needed(db_path):
         # Добавляем первого библиотекаря
         email = "first_librarian@library.com"
         password = "qwe123"
-        password_hash = bcrypt.hash(password)
-        librarian = User(email=email, password_hash=password_hash)
+        password_hash = hash_password(password)
+        librarian = User(
+            email=email, password_hash=password_hash, is_admin=True
+        )
         session.add(librarian)
         session.commit()
         print(f"Добавлен первый библиотекарь: {email}")
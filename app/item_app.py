@@ -0,0 +1,215 @@
+"""Экземпляры книг: приёмка, списание, выдача и возврат по штрихкоду.
+
+Каждый физический экземпляр — строка ``items`` со штрихкодом и статусом
+(``available``, ``on_loan``, ``damaged``, ``lost``, ``withdrawn``).
+``Book.copies`` остаётся кэшем числа свободных экземпляров и меняется
+вместе со статусами в той же транзакции.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.bookkeeping_app import check_can_borrow, lend, take_back
+from app.dependencies import get_audit, get_current_user, get_db, get_live
+from app.events import book_change, publish
+from app.hold_app import assign_copies_to_holds, notify_holds
+from app.models import Book, Item, Reader, item_rows, new_barcode
+from app.schemas import (
+    BorrowedBookOut,
+    ItemBorrowRequest,
+    ItemCreate,
+    ItemOut,
+    ItemStatusUpdate,
+)
+
+router = APIRouter(prefix="/items", tags=["items"])
+
+
+def create_items(db: Session, book_id: int, count: int):
+    """Заводит ``count`` свободных экземпляров (кэш copies не меняет)."""
+    if count > 0:
+        db.execute(insert(Item), item_rows(book_id, count))
+
+
+def withdraw_items(db: Session, book_id: int, count: int):
+    """Списывает ``count`` свободных экземпляров (кэш copies не меняет)."""
+    if count > 0:
+        items = db.scalars(
+            queries.AVAILABLE_ITEMS, {"book_id": book_id, "count": count}
+        ).all()
+        for item in items:
+            item.status = "withdrawn"
+
+
+def _get_item(db: Session, barcode: str) -> Item:
+    item = db.scalars(queries.ITEM_BY_BARCODE, {"barcode": barcode}).first()
+    # Штрихкоды общие для всех филиалов; экземпляр чужой книги не виден
+    if item is None or db.get(Book, item.book_id) is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
+
+
+# Приёмка экземпляра
+@router.post("", response_model=ItemOut, status_code=201)
+def add_item(
+    item_data: ItemCreate,
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    book = get_live(db, Book, item_data.book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    barcode = item_data.barcode or new_barcode()
+    if db.scalars(queries.ITEM_BY_BARCODE, {"barcode": barcode}).first():
+        raise HTTPException(
+            status_code=409, detail="Item with this barcode already exists"
+        )
+    item = Item(barcode=barcode, book_id=book.id)
+    db.add(item)
+    book.copies += 1
+    # Новый экземпляр сначала достаётся стоящим в очереди
+    ready = assign_copies_to_holds(db, book)
+    db.flush()
+    change = book_change("updated", book)
+    result = ItemOut.model_validate(item)
+    db.commit()
+    notify_holds(ready)
+    publish(change)
+    audit.record(
+        current_user.id,
+        "create",
+        "item",
+        result.id,
+        None,
+        result.model_dump(),
+        branch_id=current_user.branch_id,
+    )
+    return result
+
+
+# Получение экземпляра по штрихкоду
+@router.get("/{barcode}", response_model=ItemOut)
+def get_item(
+    barcode: str,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    return _get_item(db, barcode)
+
+
+# Смена статуса: повреждён, утерян, списан или снова на полке
+@router.patch("/{barcode}", response_model=ItemOut)
+def update_item_status(
+    barcode: str,
+    update: ItemStatusUpdate,
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    item = _get_item(db, barcode)
+    before = item.status
+    if before == "on_loan":
+        raise HTTPException(status_code=409, detail="Item is on loan")
+    if before == update.status:
+        return item
+    book = db.get(Book, item.book_id)
+    ready = []
+    if before == "available":
+        # Свободные экземпляры закреплены за готовыми бронями
+        if book.copies <= 0:
+            raise HTTPException(
+                status_code=409, detail="Item is reserved for a hold"
+            )
+        book.copies -= 1
+    elif update.status == "available":
+        book.copies += 1
+        ready = assign_copies_to_holds(db, book)
+    item.status = update.status
+    db.flush()
+    change = book_change("updated", book)
+    result = ItemOut.model_validate(item)
+    db.commit()
+    notify_holds(ready)
+    publish(change)
+    audit.record(
+        current_user.id,
+        "update",
+        "item",
+        result.id,
+        {"status": before},
+        {"status": result.status},
+        branch_id=current_user.branch_id,
+    )
+    return result
+
+
+# Выдача отсканированного экземпляра
+@router.post("/{barcode}/borrow", response_model=BorrowedBookOut)
+def borrow_item(
+    barcode: str,
+    borrow_data: ItemBorrowRequest,
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    item = _get_item(db, barcode)
+    book = get_live(db, Book, item.book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    if not get_live(db, Reader, borrow_data.reader_id):
+        raise HTTPException(status_code=404, detail="Reader not found")
+    if item.status != "available":
+        raise HTTPException(status_code=400, detail="Item is not available")
+    hold = check_can_borrow(db, book, borrow_data.reader_id)
+    borrowed = lend(db, book, borrow_data.reader_id, item, hold)
+    change = book_change("borrowed", book)
+    result = BorrowedBookOut.model_validate(borrowed)
+    db.commit()
+    publish(change)
+    audit.record(
+        current_user.id,
+        "borrow",
+        "loan",
+        result.id,
+        None,
+        result.model_dump(),
+        branch_id=current_user.branch_id,
+    )
+    return result
+
+
+# Возврат отсканированного экземпляра
+@router.post("/{barcode}/return", response_model=dict)
+def return_item(
+    barcode: str,
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    item = _get_item(db, barcode)
+    borrowed = db.scalars(
+        queries.ACTIVE_LOAN_BY_ITEM, {"item_id": item.id}
+    ).first()
+    if borrowed is None:
+        raise HTTPException(status_code=400, detail="Item is not on loan")
+    book = db.get(Book, item.book_id)
+    loan_id = borrowed.id
+    ready = take_back(db, borrowed, book)
+    return_date = borrowed.return_date
+    change = book_change("returned", book)
+    db.commit()
+    notify_holds(ready)
+    publish(change)
+    audit.record(
+        current_user.id,
+        "return",
+        "loan",
+        loan_id,
+        {"return_date": None},
+        {"return_date": return_date},
+        branch_id=current_user.branch_id,
+    )
+    return {"msg": "Book successfully returned"}
@@ -1,17 +1,27 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from jose import jwt
-from passlib.hash import bcrypt
 from sqlalchemy.orm import Session
 
-from app.config_app import ACCESS_TOKEN_EXPIRE_WEEKS, ALGORITHM, SECRET_KEY
-from app.database import get_db
-from app.dependencies import get_current_user
-from app.models import User
-from app.schemas import Token, UserCreate
+from app import queries
+from app.config_app import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+)
+from app.database import get_db, insert_ignore
+from app.dependencies import get_audit, get_current_user, oauth2_scheme
+from app.models import Branch, User
+from app.schemas import RefreshRequest, Token, UserCreate
+from app.tokens import (
+    InvalidToken,
+    decode_token,
+    hash_password,
+    issue_token,
+    revocations,
+    verify_password,
+)
 
 router = APIRouter(prefix="/librarian", tags=["librarian"])
 
@@ -29,34 +39,79 @@ router = APIRouter(prefix="/librarian", tags=["librarian"])
 
 
 def get_user(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+    return db.scalars(queries.USER_BY_EMAIL, {"email": email}).first()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(weeks=ACCESS_TOKEN_EXPIRE_WEEKS)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    if not expires_delta:
+        expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return issue_token(data, "access", expires_delta)
+
+
+def create_token_pair(user_id: int) -> dict:
+    """Короткий токен доступа и refresh-токен для его обновления."""
+    data = {"sub": str(user_id)}
+    return {
+        "access_token": create_access_token(data),
+        "refresh_token": issue_token(
+            data, "refresh", timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        ),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+def _refresh_payload(token: str) -> Optional[dict]:
+    try:
+        payload = decode_token(token)
+    except InvalidToken:
+        return None
+    if payload.get("typ") != "refresh" or "jti" not in payload:
+        return None
+    return payload
 
 
 @router.post("/register", response_model=dict)
 def register(
     user: UserCreate,
     db: Session = Depends(get_db),
+    audit=Depends(get_audit),
     current_user=Depends(get_current_user),  # <- Токен обязателен
 ):
-    if get_user(db, user.email):
+    # По умолчанию новый библиотекарь работает в филиале регистрирующего
+    branch_id = user.branch_id or current_user.branch_id
+    # Иначе через новую учётную запись открылся бы чужой филиал
+    if branch_id != current_user.branch_id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if db.get(Branch, branch_id) is None:
+        raise HTTPException(status_code=404, detail="Branch not found")
+    hashed_password = hash_password(user.password)
+    # Уникальность email проверяет индекс ix_users_email: при конфликте
+    # INSERT ничего не вставляет, и одновременные регистрации не дают 500
+    user_id = db.scalar(
+        insert_ignore(db.get_bind(User).dialect.name, User)
+        .values(
+            email=user.email,
+            password_hash=hashed_password,
+            branch_id=branch_id,
+        )
+        .returning(User.id)
+    )
+    if user_id is None:
         raise HTTPException(
-            status_code=400, detail="User with this email already exists"
+            status_code=409, detail="User with this email already exists"
         )
-    hashed_password = bcrypt.hash(user.password)
-    db_user = User(email=user.email, password_hash=hashed_password)
-    db.add(db_user)
     db.commit()
+    # Хэш пароля в журнал не попадает
+    audit.record(
+        current_user.id,
+        "create",
+        "user",
+        user_id,
+        None,
+        {"email": user.email, "branch_id": branch_id},
+        branch_id=current_user.branch_id,
+    )
     return {"msg": "Librarian registered successfully"}
 
 
@@ -74,17 +129,76 @@ def login(
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    if not bcrypt.verify(form_data.password, str(user.password_hash)):
+    if not verify_password(form_data.password, str(user.password_hash)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(weeks=ACCESS_TOKEN_EXPIRE_WEEKS)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
+    return create_token_pair(user.id)
+
+
+# Новая пара токенов в обмен на refresh-токен; старый отзывается
+@router.post("/refresh", response_model=Token)
+def refresh(
+    request: RefreshRequest,
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = _refresh_payload(request.refresh_token)
+    if payload is None:
+        raise credentials_exception
+    user = db.get(User, int(payload["sub"]))
+    # Отзыв — вставка jti с ON CONFLICT DO NOTHING: из двух одновременных
+    # обменов одного токена проходит только один
+    if user is None or not revocations.revoke(db, payload):
+        raise credentials_exception
+    db.commit()
+    # В журнал попадают только jti: по ним токен не восстановить
+    audit.record(
+        user.id,
+        "refresh",
+        "token",
+        None,
+        None,
+        {"revoked": [payload["jti"]]},
+        branch_id=user.branch_id,
+    )
+    return create_token_pair(user.id)
+
+
+# Выход: отзывает текущий токен доступа и переданный refresh-токен
+@router.post("/logout", status_code=204)
+def logout(
+    request: Optional[RefreshRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    payload = decode_token(token)
+    revocations.revoke(db, payload)
+    revoked = [payload["jti"]]
+    refresh_payload = request and _refresh_payload(request.refresh_token)
+    # Чужой refresh-токен выходом не отзывается
+    if refresh_payload and refresh_payload["sub"] == str(current_user.id):
+        revocations.revoke(db, refresh_payload)
+        revoked.append(refresh_payload["jti"])
+    db.commit()
+    audit.record(
+        current_user.id,
+        "logout",
+        "token",
+        None,
+        None,
+        {"revoked": revoked},
+        branch_id=current_user.branch_id,
     )
-    return {"access_token": access_token, "token_type": "bearer"}
 
 
 __all__ = ["router"]
@@ -1,18 +1,116 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.audit import AuditWriter
+from app.audit_app import router as audit_router
 from app.book_db_management_app import router as book_router
 from app.bookkeeping_app import router as borrow_router
+from app.branch_app import router as branch_router
+from app.change_feed_app import router as change_feed_router
+from app.compression import CompressionMiddleware
+from app.config_app import (
+    AUDIT_DATABASE_URL,
+    COMPRESSION_MINIMUM_SIZE,
+    IDEMPOTENT_PATHS,
+    POOL_WARM_CONNECTIONS,
+    PROFILE_DIR,
+    PROFILE_INTERVAL_SECONDS,
+    PROFILE_KEEP,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_TOKEN,
+    PURGE_INTERVAL_SECONDS,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_STORE,
+    RATE_LIMITS,
+)
+from app.database import dispose_engines, engine, make_engine, warm_up
+from app.export_app import router as export_router
+from app.hold_app import router as hold_router
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.item_app import router as item_router
 from app.librarian_db_management_app import router as librarian_router
+from app.profiling import ProfilingMiddleware
+from app.purge import purge_periodically
+from app.rate_limit import RateLimitMiddleware, build_backend
 from app.reader_db_management_app import router as reader_router
+from app.tokens import check_signing_keys
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_signing_keys()
+    # Прогрев до первого запроса: маппинги SQLAlchemy и пул соединений
+    warm_up(connections=POOL_WARM_CONNECTIONS)
+    app.state.audit_log.start(users_engine=engine)
+    purge_task = None
+    if PURGE_INTERVAL_SECONDS > 0:
+        purge_task = asyncio.create_task(
+            purge_periodically(engine, PURGE_INTERVAL_SECONDS)
+        )
+    yield
+    # Сюда попадаем после того, как uvicorn дождался текущих запросов
+    if purge_task is not None:
+        purge_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await purge_task
+    # Записи аудита из буфера дописываются до закрытия пулов
+    app.state.audit_log.stop()
+    app.state.audit_log.engine.dispose()
+    dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
+app.state.audit_log = AuditWriter(
+    make_engine(AUDIT_DATABASE_URL) if AUDIT_DATABASE_URL else engine
+)
+# Сохраняется ответ до сжатия: повтор может прийти с другим Accept-Encoding
+app.state.idempotency_store = IdempotencyStore(engine)
+app.add_middleware(IdempotencyMiddleware, paths=IDEMPOTENT_PATHS)
+app.add_middleware(
+    CompressionMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE
+)
+rate_limit_backend = build_backend(RATE_LIMIT_STORE)
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware, backend=rate_limit_backend, limits=RATE_LIMITS
+    )
+# Внешний слой: в профиль попадают и остальные middleware
+if PROFILE_SAMPLE_RATE > 0 or PROFILE_TOKEN:
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=PROFILE_DIR,
+        sample_rate=PROFILE_SAMPLE_RATE,
+        token=PROFILE_TOKEN,
+        interval=PROFILE_INTERVAL_SECONDS,
+        keep=PROFILE_KEEP,
+    )
+
+
+# Книгу или читателя изменили между чтением и flush в этом запросе
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    return JSONResponse(
+        {"detail": "Resource was modified by another request, retry"},
+        status_code=409,
+    )
 
-app = FastAPI()
 
 app.include_router(librarian_router)
 app.include_router(book_router)
 app.include_router(reader_router)
 app.include_router(borrow_router)
+app.include_router(hold_router)
+app.include_router(item_router)
+app.include_router(branch_router)
+app.include_router(change_feed_router)
+app.include_router(audit_router)
+app.include_router(export_router)
 
 if __name__ == "__main__":
-    import uvicorn
+    from app.server_app import main
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    main()
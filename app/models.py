@@ -1,17 +1,99 @@
 import datetime
+import uuid
 
-from sqlalchemy import CheckConstraint, ForeignKey, Integer, func
+from sqlalchemy import (
+    DDL,
+    JSON,
+    CheckConstraint,
+    ForeignKey,
+    Index,
+    Integer,
+    event,
+    false,
+    func,
+    text,
+)
 from sqlalchemy.orm import (
     Mapped,
     declarative_base,
     mapped_column,
     relationship,
 )
-from sqlalchemy.types import String
+from sqlalchemy.types import LargeBinary, String
 
 Base = declarative_base()
 
 
+# Филиал, которому принадлежат строки без явно указанного branch_id
+DEFAULT_BRANCH_ID = 1
+
+
+def live_indexes(table: str) -> tuple:
+    """Частичные индексы для таблицы с мягким удалением.
+
+    Списки читают только живые строки своего филиала, фоновая очистка —
+    только удалённые, и каждый запрос касается лишь своей части таблицы.
+    """
+    live = text("deleted_at IS NULL")
+    deleted = text("deleted_at IS NOT NULL")
+    return (
+        Index(
+            f"ix_{table}_branch_live_id",
+            "branch_id",
+            "id",
+            sqlite_where=live,
+            postgresql_where=live,
+        ),
+        Index(
+            f"ix_{table}_deleted_at",
+            "deleted_at",
+            sqlite_where=deleted,
+            postgresql_where=deleted,
+        ),
+    )
+
+
+def live_unique_index(name: str, *columns: str) -> Index:
+    """Уникальность среди живых строк: удалённая строка не занимает ключ."""
+    live = text("deleted_at IS NULL")
+    return Index(
+        name,
+        *columns,
+        unique=True,
+        sqlite_where=live,
+        postgresql_where=live,
+    )
+
+
+def branch_column():
+    """Филиал строки; запросы сессии ограничиваются им (``app.tenancy``)."""
+    return mapped_column(
+        ForeignKey("branches.id"),
+        default=DEFAULT_BRANCH_ID,
+        server_default=str(DEFAULT_BRANCH_ID),
+        nullable=False,
+    )
+
+
+class Branch(Base):
+    """Филиал библиотеки. Все филиалы обслуживает одно развёртывание."""
+
+    __tablename__ = "branches"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+
+
+# Филиал по умолчанию: ему принадлежат данные, созданные до филиалов
+event.listen(
+    Branch.__table__,
+    "after_create",
+    DDL(
+        f"INSERT INTO branches (id, name) VALUES ({DEFAULT_BRANCH_ID}, 'Main')"
+    ),
+)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -21,6 +103,12 @@ class User(Base):
     )
     password_hash: Mapped[str] = mapped_column(nullable=False)
     is_librarian: Mapped[bool] = mapped_column(default=True)
+    # Администратор открывает филиалы и регистрирует библиотекарей в любом
+    # из них; остальные работают только в своём
+    is_admin: Mapped[bool] = mapped_column(
+        default=False, server_default=false(), nullable=False
+    )
+    branch_id: Mapped[int] = branch_column()
 
 
 class Book(Base):
@@ -30,13 +118,28 @@ class Book(Base):
     title: Mapped[str] = mapped_column(nullable=False)
     author: Mapped[str] = mapped_column(nullable=False)
     year: Mapped[int] = mapped_column(nullable=True)
-    isbn: Mapped[str] = mapped_column(unique=True, nullable=True)
+    isbn: Mapped[str] = mapped_column(nullable=True)
     copies: Mapped[int] = mapped_column(default=1, nullable=False)
     genre: Mapped[str] = mapped_column(String, nullable=True)
+    # Версия строки для оптимистичных блокировок (ETag / If-Match)
+    version: Mapped[int] = mapped_column(
+        default=1, server_default="1", nullable=False
+    )
+    # Метка удаления: строка остаётся, пока на неё ссылается история выдач
+    deleted_at: Mapped[datetime.datetime | None] = mapped_column(
+        nullable=True
+    )
+    branch_id: Mapped[int] = branch_column()
 
     __table_args__ = (
         CheckConstraint("copies >= 0", name="check_copies_positive"),
+        # ISBN уникален среди живых книг филиала: ISBN удалённой книги
+        # сразу свободен. Индекс по isbn первым служит и поиску
+        # экземпляров книги во всех филиалах
+        live_unique_index("uq_books_isbn_branch", "isbn", "branch_id"),
+        *live_indexes("books"),
     )
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Reader(Base):
@@ -44,7 +147,68 @@ class Reader(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(nullable=False)
-    email: Mapped[str] = mapped_column(unique=True, nullable=False)
+    email: Mapped[str] = mapped_column(nullable=False)
+    version: Mapped[int] = mapped_column(
+        default=1, server_default="1", nullable=False
+    )
+    deleted_at: Mapped[datetime.datetime | None] = mapped_column(
+        nullable=True
+    )
+    branch_id: Mapped[int] = branch_column()
+
+    __table_args__ = (
+        # Читатель записан в филиал; email уникален среди его живых
+        # читателей
+        live_unique_index("uq_readers_branch_email", "branch_id", "email"),
+        *live_indexes("readers"),
+        # Поиск по началу email без учёта регистра
+        Index(
+            "ix_readers_branch_email_lower", "branch_id", text("lower(email)")
+        ),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+
+# Поиск по подстроке имени читателя. SQLite: FTS5 с токенизатором trigram
+# поверх readers (external content), синхронизируется триггерами.
+# PostgreSQL: GIN-индекс pg_trgm, его использует обычный LIKE '%...%'.
+READER_NAME_FTS = "readers_name_fts"
+READER_NAME_SEARCH_DDL = {
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE {READER_NAME_FTS} USING fts5("
+        "name, content='readers', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER {READER_NAME_FTS}_ai AFTER INSERT ON readers BEGIN "
+        f"INSERT INTO {READER_NAME_FTS}(rowid, name) "
+        "VALUES (new.id, new.name); END",
+        f"CREATE TRIGGER {READER_NAME_FTS}_ad AFTER DELETE ON readers BEGIN "
+        f"INSERT INTO {READER_NAME_FTS}({READER_NAME_FTS}, rowid, name) "
+        "VALUES ('delete', old.id, old.name); END",
+        f"CREATE TRIGGER {READER_NAME_FTS}_au AFTER UPDATE OF name ON readers "
+        f"BEGIN INSERT INTO {READER_NAME_FTS}({READER_NAME_FTS}, rowid, name) "
+        "VALUES ('delete', old.id, old.name); "
+        f"INSERT INTO {READER_NAME_FTS}(rowid, name) "
+        "VALUES (new.id, new.name); END",
+    ],
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX ix_readers_name_trgm ON readers "
+        "USING gin (lower(name) gin_trgm_ops)",
+    ],
+}
+for _dialect, _statements in READER_NAME_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(
+            Reader.__table__,
+            "after_create",
+            DDL(_statement).execute_if(dialect=_dialect),
+        )
+event.listen(
+    Reader.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {READER_NAME_FTS}").execute_if(
+        dialect="sqlite"
+    ),
+)
 
 
 class BorrowedBook(Base):
@@ -57,12 +221,210 @@ class BorrowedBook(Base):
     reader_id: Mapped[int] = mapped_column(
         ForeignKey("readers.id"), nullable=False
     )
+    # Выданный экземпляр; пусто у выдач, сделанных до появления items
+    item_id: Mapped[int | None] = mapped_column(
+        ForeignKey("items.id"), nullable=True, index=True
+    )
     borrow_date: Mapped[datetime.datetime | None] = mapped_column(
         default=func.now(), nullable=False
     )
     return_date: Mapped[datetime.datetime | None] = mapped_column(
         nullable=True
     )
+    # Филиал выдачи — филиал книги
+    branch_id: Mapped[int] = branch_column()
 
     book: Mapped["Book"] = relationship("Book")
     reader: Mapped["Reader"] = relationship("Reader")
+
+    __table_args__ = (
+        Index("ix_borrowed_books_branch_id", "branch_id", "id"),
+        # История читателя (GET /readers/{id}/loans) читается только из
+        # индекса и в порядке id, как её листают: остальные колонки
+        # покрывают фильтр статуса, ответ, соединение с books и условие
+        # филиала
+        Index(
+            "ix_borrowed_books_reader_history",
+            "reader_id",
+            "id",
+            "return_date",
+            "borrow_date",
+            "book_id",
+            "branch_id",
+        ),
+    )
+    # borrow_date возвращается тем же INSERT ... RETURNING
+    __mapper_args__ = {"eager_defaults": True}
+
+
+class Item(Base):
+    """Физический экземпляр книги со штрихкодом.
+
+    ``Book.copies`` — кэш числа экземпляров, которые можно выдать любому:
+    экземпляры со статусом ``available`` за вычетом закреплённых за
+    готовыми бронями. Его меняет тот же код, что меняет статусы.
+    """
+
+    __tablename__ = "items"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    barcode: Mapped[str] = mapped_column(
+        String, unique=True, nullable=False
+    )
+    book_id: Mapped[int] = mapped_column(
+        ForeignKey("books.id"), nullable=False
+    )
+    # available, on_loan, damaged, lost, withdrawn
+    status: Mapped[str] = mapped_column(
+        String, default="available", nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_items_book_id_status", "book_id", "status"),
+    )
+
+
+def new_barcode() -> str:
+    """Штрихкод для экземпляра, которому его не назначили при приёмке."""
+    return uuid.uuid4().hex[:12].upper()
+
+
+def item_rows(book_id: int, count: int) -> list:
+    """Строки для ``insert(Item)``: ``count`` свободных экземпляров."""
+    return [
+        {"barcode": new_barcode(), "book_id": book_id, "status": "available"}
+        for _ in range(count)
+    ]
+
+
+@event.listens_for(Book, "after_insert")
+def _add_initial_items(mapper, connection, target):
+    # Книга, созданная через ORM, получает экземпляры по числу copies
+    if target.copies:
+        connection.execute(
+            Item.__table__.insert(), item_rows(target.id, target.copies)
+        )
+
+
+class Hold(Base):
+    """Очередь на книгу без свободных экземпляров (FIFO по created_at)."""
+
+    __tablename__ = "holds"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    book_id: Mapped[int] = mapped_column(
+        ForeignKey("books.id"), nullable=False
+    )
+    reader_id: Mapped[int] = mapped_column(
+        ForeignKey("readers.id"), nullable=False
+    )
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        default=func.now(), nullable=False
+    )
+    # waiting -> ready (экземпляр закреплён) -> fulfilled, либо cancelled
+    status: Mapped[str] = mapped_column(
+        String, default="waiting", nullable=False
+    )
+    ready_at: Mapped[datetime.datetime | None] = mapped_column(nullable=True)
+
+    __table_args__ = (
+        Index("ix_holds_book_id_created_at", "book_id", "created_at"),
+    )
+    __mapper_args__ = {"eager_defaults": True}
+
+
+class IdempotencyKey(Base):
+    """Сохранённый ответ на запрос с заголовком Idempotency-Key."""
+
+    __tablename__ = "idempotency_keys"
+
+    # "<клиент>|<значение заголовка>"
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    # Хэш пути и тела: повтор ключа с другим запросом — ошибка
+    fingerprint: Mapped[str] = mapped_column(nullable=False)
+    # None, пока первый запрос ещё выполняется
+    status_code: Mapped[int | None] = mapped_column(nullable=True)
+    content_type: Mapped[str | None] = mapped_column(nullable=True)
+    # Остальные заголовки ответа парами [имя, значение]
+    headers: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    body: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(nullable=False)
+    # Пока запрос выполняется — конец продления захвата, потом — срок ответа
+    expires_at: Mapped[datetime.datetime] = mapped_column(
+        nullable=False, index=True
+    )
+
+
+class RevokedToken(Base):
+    """Отозванный токен (``jti``); хранится, пока токен не истечёт."""
+
+    __tablename__ = "revoked_tokens"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    jti: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    expires_at: Mapped[datetime.datetime] = mapped_column(
+        nullable=False, index=True
+    )
+
+
+class ArchivedLoan(Base):
+    """История выдач удалённой книги или читателя, перенесённая при очистке.
+
+    Хранит названия и email вместо внешних ключей, поэтому переживает
+    окончательное удаление связанных строк.
+    """
+
+    __tablename__ = "archived_loans"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    book_id: Mapped[int] = mapped_column(nullable=False)
+    reader_id: Mapped[int] = mapped_column(nullable=False)
+    title: Mapped[str] = mapped_column(nullable=False)
+    author: Mapped[str] = mapped_column(nullable=False)
+    reader_email: Mapped[str] = mapped_column(nullable=False)
+    borrow_date: Mapped[datetime.datetime] = mapped_column(nullable=False)
+    return_date: Mapped[datetime.datetime | None] = mapped_column(
+        nullable=True
+    )
+    archived_at: Mapped[datetime.datetime] = mapped_column(nullable=False)
+
+
+class AuditEntry(Base):
+    """Запись журнала аудита: кто, что и как изменил.
+
+    ``diff`` — словарь ``{поле: [было, стало]}``; для созданных записей
+    «было» равно null, для удалённых — «стало».
+    """
+
+    __tablename__ = "audit_log"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(nullable=False)
+    actor_id: Mapped[int | None] = mapped_column(nullable=True)
+    # Филиал библиотекаря; без внешнего ключа — журнал может жить в
+    # отдельной БД
+    branch_id: Mapped[int | None] = mapped_column(nullable=True)
+    action: Mapped[str] = mapped_column(nullable=False)
+    entity: Mapped[str] = mapped_column(nullable=False)
+    entity_id: Mapped[int | None] = mapped_column(nullable=True)
+    diff: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    __table_args__ = (
+        Index("ix_audit_log_entity", "entity", "entity_id"),
+        Index("ix_audit_log_branch", "branch_id", "id"),
+    )
+
+
+# Журнал только дополняется: SQLite отклоняет UPDATE и DELETE
+AUDIT_LOG_TRIGGERS = [
+    f"CREATE TRIGGER audit_log_no_{operation.lower()} "
+    f"BEFORE {operation} ON audit_log "
+    "BEGIN SELECT RAISE(ABORT, 'audit_log is append-only'); END"
+    for operation in ("UPDATE", "DELETE")
+]
+for _trigger in AUDIT_LOG_TRIGGERS:
+    event.listen(
+        AuditEntry.__table__,
+        "after_create",
+        DDL(_trigger).execute_if(dialect="sqlite"),
+    )
@@ -0,0 +1,238 @@
+"""Выборочное профилирование отдельных запросов.
+
+Запрос профилируется, если пришёл с заголовком ``X-Profile``, равным
+``PROFILE_TOKEN``, или попал в долю ``PROFILE_SAMPLE_RATE``. Для него
+фоновый поток раз в ``PROFILE_INTERVAL_SECONDS`` снимает стеки потоков,
+в которых выполняется запрос (цикл событий и потоки пула, где работали
+зависимости и эндпоинт), а сам код запроса не трассируется. Поэтому
+накладные расходы есть только у выбранных запросов.
+
+В ответ добавляется ``Server-Timing``:
+
+- ``auth`` — проверка токена (``get_current_user``);
+- ``db`` — время SQL-запросов и их число;
+- ``serialize`` — оценка по выборкам стеков, попавших в сериализацию;
+- ``app`` — весь запрос до отправки заголовков.
+
+Стеки сохраняются в ``PROFILE_DIR`` в свёрнутом формате (``a;b;c N``)
+для flamegraph.pl, speedscope или inferno; имя файла приходит в
+заголовке ``X-Profile-Id``. Хранятся ``PROFILE_KEEP`` последних файлов.
+Потоковые ответы досэмплируются до конца тела, но в ``Server-Timing``
+попадает только время до заголовков.
+"""
+
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import contextvars
+from datetime import datetime
+import hmac
+import os
+from pathlib import Path
+import random
+import re
+import sys
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+# Кадры, время в которых считается сериализацией ответа
+SERIALIZE_FUNCTIONS = {
+    "serialize_response",
+    "jsonable_encoder",
+    "_encode_chunks",
+    "dumps",
+}
+# Ожидание событий в цикле: в такие моменты запрос ничего не делает
+_IDLE_FUNCTIONS = {"select", "poll", "epoll", "wait"}
+
+
+class RequestProfile:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.threads = {threading.get_ident()}
+        self.stacks = Counter()
+        self.phases = defaultdict(float)
+        self.queries = 0
+        self.started = time.perf_counter()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def join_thread(self):
+        """Отмечает текущий поток как выполняющий этот запрос."""
+        self.threads.add(threading.get_ident())
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in tuple(self.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    stack = collapse(frame)
+                    if stack:
+                        self.stacks[stack] += 1
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+
+    def sampled_seconds(self, functions) -> float:
+        samples = sum(
+            count
+            for stack, count in self.stacks.items()
+            if any(
+                frame.split(" ", 1)[0] in functions
+                for frame in stack.split(";")
+            )
+        )
+        return samples * self.interval
+
+    def server_timing(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        serialize = self.sampled_seconds(SERIALIZE_FUNCTIONS)
+        return ", ".join(
+            [
+                f"auth;dur={self.phases['auth'] * 1e3:.2f}",
+                f'db;dur={self.phases["db"] * 1e3:.2f};'
+                f'desc="{self.queries} queries"',
+                f'serialize;dur={serialize * 1e3:.2f};desc="sampled"',
+                f"app;dur={elapsed * 1e3:.2f}",
+            ]
+        )
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.items()
+        )
+
+
+def collapse(frame):
+    """Стек от внешнего кадра к внутреннему: ``функция (файл:строка);...``.
+
+    Для потока, ожидающего событий, возвращает None.
+    """
+    if frame.f_code.co_name in _IDLE_FUNCTIONS:
+        return None
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+@contextmanager
+def phase(name: str):
+    """Замеряет участок кода профилируемого запроса (для Server-Timing)."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    profile.join_thread()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.phases[name] += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, params, context, many):
+    profile = _current.get()
+    if profile is not None:
+        profile.join_thread()
+        conn.info.setdefault("profile_started", []).append(
+            time.perf_counter()
+        )
+
+
+def _after_cursor_execute(conn, cursor, statement, params, context, many):
+    profile = _current.get()
+    started = conn.info.get("profile_started")
+    if profile is not None and started:
+        profile.phases["db"] += time.perf_counter() - started.pop()
+        profile.queries += 1
+
+
+def install_query_timer():
+    """Подключает учёт времени SQL ко всем движкам (один раз)."""
+    if not event.contains(
+        Engine, "before_cursor_execute", _before_cursor_execute
+    ):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _slug(path: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app,
+        directory,
+        sample_rate: float = 0.0,
+        token: str = "",
+        interval: float = 0.005,
+        keep: int = 500,
+    ):
+        self.app = app
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.token = token
+        self.interval = interval
+        self.keep = keep
+        install_query_timer()
+
+    def _wanted(self, scope) -> bool:
+        if self.token:
+            header = Headers(scope=scope).get("x-profile")
+            if header is not None and hmac.compare_digest(
+                header.encode(), self.token.encode()
+            ):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        profile = RequestProfile(self.interval)
+        name = (
+            f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{scope['method']}-"
+            f"{_slug(scope['path'])}.collapsed"
+        )
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing())
+                headers.append("X-Profile-Id", name)
+            await send(message)
+
+        token = _current.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            profile.stop()
+            await run_in_threadpool(self._save, name, profile.collapsed())
+
+    def _save(self, name: str, collapsed: str):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / name).write_text(collapsed)
+        profiles = sorted(self.directory.glob("*.collapsed"))
+        for path in profiles[: -self.keep] if self.keep > 0 else []:
+            path.unlink(missing_ok=True)
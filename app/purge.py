@@ -0,0 +1,131 @@
+"""Окончательное удаление мягко удалённых книг и читателей.
+
+Строка с меткой ``deleted_at`` старше ``SOFT_DELETE_RETENTION_DAYS`` дней
+удаляется вместе со своей историей: выдачи сначала копируются в
+``archived_loans`` (с названием книги и email читателя), затем удаляются
+выдачи, брони, экземпляры книги и сама строка. Каждая порция из
+``PURGE_BATCH_SIZE`` строк — отдельная короткая транзакция, чтобы не
+держать блокировку SQLite.
+
+Заодно удаляются записи об отозванных токенах, срок которых истёк.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import DateTime, delete, insert, literal, select
+
+from app.config_app import PURGE_BATCH_SIZE, SOFT_DELETE_RETENTION_DAYS
+from app.models import (
+    ArchivedLoan,
+    Book,
+    BorrowedBook,
+    Hold,
+    Item,
+    Reader,
+    RevokedToken,
+)
+
+logger = logging.getLogger(__name__)
+
+# Модель -> колонки выдач и броней, которые на неё ссылаются
+_REFERENCES = {
+    Book: (BorrowedBook.book_id, Hold.book_id),
+    Reader: (BorrowedBook.reader_id, Hold.reader_id),
+}
+
+
+def _purge_batch(conn, model, cutoff, batch_size, now) -> int:
+    ids = conn.scalars(
+        select(model.id)
+        .where(model.deleted_at.is_not(None), model.deleted_at <= cutoff)
+        .order_by(model.deleted_at)
+        .limit(batch_size)
+    ).all()
+    if not ids:
+        return 0
+    loan_column, hold_column = _REFERENCES[model]
+    history = (
+        select(
+            BorrowedBook.id,
+            BorrowedBook.book_id,
+            BorrowedBook.reader_id,
+            Book.title,
+            Book.author,
+            Reader.email,
+            BorrowedBook.borrow_date,
+            BorrowedBook.return_date,
+            literal(now, DateTime),
+        )
+        .join_from(BorrowedBook, Book)
+        .join(Reader)
+        .where(loan_column.in_(ids))
+    )
+    conn.execute(
+        insert(ArchivedLoan).from_select(
+            [
+                "id",
+                "book_id",
+                "reader_id",
+                "title",
+                "author",
+                "reader_email",
+                "borrow_date",
+                "return_date",
+                "archived_at",
+            ],
+            history,
+        )
+    )
+    conn.execute(delete(BorrowedBook).where(loan_column.in_(ids)))
+    conn.execute(delete(Hold).where(hold_column.in_(ids)))
+    if model is Book:
+        conn.execute(delete(Item).where(Item.book_id.in_(ids)))
+    conn.execute(delete(model).where(model.id.in_(ids)))
+    return len(ids)
+
+
+def purge_deleted(
+    engine,
+    older_than: datetime = None,
+    batch_size: int = PURGE_BATCH_SIZE,
+) -> dict:
+    """Удаляет мягко удалённые строки старше ``older_than``.
+
+    Возвращает число удалённых книг, читателей и истёкших отзывов токенов.
+    """
+    now = datetime.utcnow()
+    if older_than is None:
+        older_than = now - timedelta(days=SOFT_DELETE_RETENTION_DAYS)
+    purged = {}
+    for model in _REFERENCES:
+        total = 0
+        while True:
+            with engine.begin() as conn:
+                count = _purge_batch(conn, model, older_than, batch_size, now)
+            total += count
+            if count < batch_size:
+                break
+        purged[model.__tablename__] = total
+    with engine.begin() as conn:
+        expired = conn.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= now)
+        )
+    purged[RevokedToken.__tablename__] = expired.rowcount
+    return purged
+
+
+async def purge_periodically(engine, interval: float):
+    """Фоновая очистка раз в ``interval`` секунд (задача из lifespan)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await run_in_threadpool(purge_deleted, engine)
+        except Exception:
+            # Очистка повторится в следующий раз, приложение продолжает работу
+            logger.exception("Purge of soft-deleted rows failed")
+        else:
+            if any(purged.values()):
+                logger.info("Purged soft-deleted rows: %s", purged)
@@ -0,0 +1,207 @@
+"""Готовые запросы горячих путей (выдача, возврат, чтение, проверки).
+
+Выражения строятся один раз при импорте, а значения передаются
+параметрами (``bindparam``)::
+
+    db.scalars(queries.READY_HOLD, {"book_id": 1, "reader_id": 2}).first()
+
+Так запрос не пересобирается в Python на каждый вызов, а готовый SQL
+берётся из кэша компиляции SQLAlchemy. Сравнение с построением через
+``db.query(...).filter(...)``: ``python -m benchmarks.bench_queries``.
+"""
+
+from sqlalchemy import (
+    String,
+    bindparam,
+    column,
+    func,
+    select,
+    table,
+    update,
+)
+from sqlalchemy.orm import contains_eager
+
+from app.models import (
+    READER_NAME_FTS,
+    Book,
+    BorrowedBook,
+    Branch,
+    Hold,
+    Item,
+    Reader,
+    RevokedToken,
+    User,
+)
+from app.schemas import (
+    BookOut,
+    BorrowedBookWithTitleOut,
+    BranchAvailabilityOut,
+    ReaderOut,
+)
+from app.serialization import schema_columns
+
+OPEN_HOLD_STATUSES = ("waiting", "ready")
+
+# Книги и читатели
+LIVE_BOOKS = select(Book).where(Book.deleted_at.is_(None))
+LIVE_READERS = select(Reader).where(Reader.deleted_at.is_(None))
+# Колонки для быстрой сериализации списков (FAST_JSON_RESPONSES)
+LIVE_BOOK_ROWS = select(*schema_columns(BookOut, Book)).where(
+    Book.deleted_at.is_(None)
+)
+LIVE_READER_ROWS = select(*schema_columns(ReaderOut, Reader)).where(
+    Reader.deleted_at.is_(None)
+)
+# id живой строки: отличает 404 от 412 после условного UPDATE
+LIVE_ID = {
+    model: select(model.id).where(
+        model.id == bindparam("id"), model.deleted_at.is_(None)
+    )
+    for model in (Book, Reader)
+}
+# Свободные экземпляры книги по филиалам: та же книга в другом филиале —
+# строка с тем же ISBN. Выполняется с tenancy.ALL_BRANCHES
+_availability = (
+    select(
+        *schema_columns(
+            BranchAvailabilityOut,
+            Book,
+            branch_name=Branch.name,
+            book_id=Book.id,
+        )
+    )
+    .join_from(Book, Branch)
+    .where(Book.deleted_at.is_(None))
+    .order_by(Book.branch_id)
+)
+AVAILABILITY = {
+    column.key: _availability.where(column == bindparam("value"))
+    for column in (Book.isbn, Book.id)
+}
+BRANCHES = select(Branch).order_by(Branch.id)
+BRANCH_ID_BY_NAME = select(Branch.id).where(Branch.name == bindparam("name"))
+READER_ID_BY_EMAIL = (
+    select(Reader.id).where(Reader.email == bindparam("email")).limit(1)
+)
+# id читателей, в имени которых есть фраза (SQLite FTS5 trigram)
+_reader_name_fts = table(
+    READER_NAME_FTS, column("rowid"), column(READER_NAME_FTS)
+)
+_phrase = bindparam("phrase", type_=String)
+READER_IDS_BY_NAME = select(_reader_name_fts.c.rowid).where(
+    _reader_name_fts.c[READER_NAME_FTS].match(_phrase)
+)
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email")).limit(1)
+# Отозванные токены: проверка совпадения в фильтре и новые отзывы
+REVOKED_TOKEN_ID = select(RevokedToken.id).where(
+    RevokedToken.jti == bindparam("jti")
+)
+REVOKED_SINCE = (
+    select(RevokedToken.id, RevokedToken.jti)
+    .where(
+        RevokedToken.id > bindparam("after_id"),
+        RevokedToken.expires_at > bindparam("now"),
+    )
+    .order_by(RevokedToken.id)
+)
+
+# Выдача и возврат
+READY_HOLD = (
+    select(Hold)
+    .where(
+        Hold.book_id == bindparam("book_id"),
+        Hold.reader_id == bindparam("reader_id"),
+        Hold.status == "ready",
+    )
+    .limit(1)
+)
+ACTIVE_LOAN_COUNT = (
+    select(func.count())
+    .select_from(BorrowedBook)
+    .where(
+        BorrowedBook.reader_id == bindparam("reader_id"),
+        BorrowedBook.return_date.is_(None),
+    )
+)
+ACTIVE_LOAN = (
+    select(BorrowedBook)
+    .where(
+        BorrowedBook.book_id == bindparam("book_id"),
+        BorrowedBook.reader_id == bindparam("reader_id"),
+        BorrowedBook.return_date.is_(None),
+    )
+    .limit(1)
+)
+ACTIVE_LOAN_BY_ITEM = (
+    select(BorrowedBook)
+    .where(
+        BorrowedBook.item_id == bindparam("item_id"),
+        BorrowedBook.return_date.is_(None),
+    )
+    .limit(1)
+)
+# Экземпляры: сканирование штрихкода — один поиск по уникальному индексу
+ITEM_BY_BARCODE = select(Item).where(Item.barcode == bindparam("barcode"))
+AVAILABLE_ITEMS = (
+    select(Item)
+    .where(Item.book_id == bindparam("book_id"), Item.status == "available")
+    .order_by(Item.id)
+    .limit(bindparam("count"))
+)
+# Экземпляр выдаётся, только если его статус не изменился после чтения:
+# из двух одновременных выдач одного экземпляра проходит одна
+TAKE_ITEM = (
+    update(Item)
+    .where(Item.id == bindparam("item_id"), Item.status == "available")
+    .values(status="on_loan")
+    .execution_options(synchronize_session="fetch")
+)
+# Есть ли невозвращённая выдача книги или читателя (перед удалением)
+ACTIVE_LOAN_ID = {
+    column.key: select(BorrowedBook.id)
+    .where(column == bindparam("id"), BorrowedBook.return_date.is_(None))
+    .limit(1)
+    for column in (BorrowedBook.book_id, BorrowedBook.reader_id)
+}
+LOANS_WITH_BOOK = (
+    select(BorrowedBook)
+    .join(BorrowedBook.book)
+    .options(contains_eager(BorrowedBook.book))
+)
+LOAN_ROWS = select(
+    *schema_columns(
+        BorrowedBookWithTitleOut,
+        BorrowedBook,
+        title=Book.title,
+        author=Book.author,
+    )
+).join_from(BorrowedBook, Book)
+# История выдач читателя, новые первыми
+READER_LOANS = LOAN_ROWS.where(
+    BorrowedBook.reader_id == bindparam("reader_id")
+).order_by(BorrowedBook.id.desc())
+LOAN_STATUS_FILTERS = {
+    "active": BorrowedBook.return_date.is_(None),
+    "returned": BorrowedBook.return_date.is_not(None),
+}
+
+# Очередь на книги
+WAITING_HOLDS = (
+    select(Hold)
+    .where(Hold.book_id == bindparam("book_id"), Hold.status == "waiting")
+    .order_by(Hold.created_at, Hold.id)
+    .limit(bindparam("copies"))
+)
+OPEN_HOLD_ID = (
+    select(Hold.id)
+    .where(
+        Hold.book_id == bindparam("book_id"),
+        Hold.reader_id == bindparam("reader_id"),
+        Hold.status.in_(OPEN_HOLD_STATUSES),
+    )
+    .limit(1)
+)
+# Бронь видна в филиале её книги: условие филиала приходит с books
+HOLD_BY_ID = (
+    select(Hold).join_from(Hold, Book).where(Hold.id == bindparam("id"))
+)
@@ -0,0 +1,170 @@
+"""Ограничение частоты запросов (token bucket).
+
+Корзина ведётся на пару (правило, клиент): клиент — это ``sub`` из
+действительного JWT, а без токена — IP-адрес. Правило выбирается по
+префиксу пути, у каждого своя скорость пополнения и ёмкость.
+
+Хранилища:
+    InMemoryBackend — словарь в памяти процесса (один воркер);
+    SQLiteBackend   — общий файл SQLite для нескольких воркеров на одной
+                      машине; проверка выполняется одним UPSERT ... RETURNING.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+import math
+import sqlite3
+import threading
+import time
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.tokens import InvalidToken, decode_token
+
+
+class InMemoryBackend:
+    """Корзины в порядке последнего обращения (LRU).
+
+    При ``max_keys`` корзинах новая вытесняет самую давно не
+    использованную за O(1); клиент вытесненной корзины в худшем случае
+    получит лишний burst.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, now: float):
+        """Списывает токен. Возвращает (разрешено, остаток токенов)."""
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                while len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+                tokens = burst
+            else:
+                tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            return allowed, tokens
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBackend:
+    _TAKE = """
+        INSERT INTO rate_limit_buckets (key, tokens, updated, allowed)
+        VALUES (:key, :burst - 1, :now, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = CASE
+                WHEN min(:burst, tokens + (:now - updated) * :rate) >= 1
+                THEN min(:burst, tokens + (:now - updated) * :rate) - 1
+                ELSE min(:burst, tokens + (:now - updated) * :rate)
+            END,
+            allowed = min(:burst, tokens + (:now - updated) * :rate) >= 1,
+            updated = :now
+        RETURNING allowed, tokens
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        # Счётчики не нужно переживать сбой питания
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("PRAGMA busy_timeout=1000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+            "updated REAL NOT NULL, allowed INTEGER NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, now: float):
+        with self._lock:
+            allowed, tokens = self._conn.execute(
+                self._TAKE,
+                {"key": key, "rate": rate, "burst": burst, "now": now},
+            ).fetchone()
+        return bool(allowed), tokens
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_limit_buckets")
+
+
+def build_backend(store: str):
+    """Пустая строка — память процесса, иначе путь к файлу SQLite."""
+    return SQLiteBackend(store) if store else InMemoryBackend()
+
+
+# Проверка подписи дороже самого лимитера, поэтому результат кэшируется;
+# срок действия токена всё равно проверяет get_current_user
+@lru_cache(maxsize=4096)
+def _token_subject(token: str):
+    try:
+        payload = decode_token(token)
+    except InvalidToken:
+        return None
+    return payload.get("sub")
+
+
+def client_identity(scope) -> str:
+    authorization = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        subject = _token_subject(token)
+        if subject is not None:
+            return f"sub:{subject}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, backend, limits: dict):
+        """``limits``: префикс пути -> (токенов в секунду, ёмкость).
+
+        Ключ ``"*"`` задаёт бюджет для остальных путей.
+        """
+        self.app = app
+        self.backend = backend
+        self.default = limits.get("*")
+        rules = [item for item in limits.items() if item[0] != "*"]
+        # Более длинные префиксы проверяются первыми
+        self.rules = sorted(rules, key=lambda rule: -len(rule[0]))
+
+    def _rule(self, path: str):
+        for prefix, budget in self.rules:
+            if path.startswith(prefix):
+                return prefix, budget
+        return "*", self.default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name, budget = self._rule(scope["path"])
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+        rate, burst = budget
+        allowed, tokens = self.backend.take(
+            f"{name}|{client_identity(scope)}", rate, burst, time.time()
+        )
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+        retry_after = max(1, math.ceil((1 - tokens) / rate))
+        response = JSONResponse(
+            {"detail": "Too Many Requests"},
+            status_code=429,
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
@@ -1,16 +1,41 @@
-from typing import List
+from datetime import datetime
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.dependencies import (
-    get_current_user,  # get_current_user — проверка JWT
+from app import queries
+from app.bookkeeping_app import has_active_loans
+from app.config_app import (
+    FAST_JSON_RESPONSES,
+    READERS_MAX_PAGE_SIZE,
+    READERS_PAGE_SIZE,
 )
+from app.database import insert_ignore
 from app.dependencies import (
+    etag,
+    get_audit,
+    get_current_user,  # get_current_user — проверка JWT
     get_db,
+    get_live,
+    get_read_db,
+    if_match_version,
+    not_found_or_conflict,
+    versioned_update,
 )
-from app.models import Reader
-from app.schemas import ReaderCreate, ReaderOut, ReaderUpdate
+from app.events import publish
+from app.hold_app import cancel_holds, notify_holds, open_holds
+from app.models import BorrowedBook, Hold, Reader
+from app.schemas import (
+    BorrowedBookWithTitleOut,
+    ReaderCreate,
+    ReaderOut,
+    ReaderPatch,
+    ReaderUpdate,
+)
+from app.serialization import json_stream_response, rows_to_dicts
 
 router = APIRouter(prefix="/readers", tags=["readers"])
 
@@ -20,25 +45,99 @@ router = APIRouter(prefix="/readers", tags=["readers"])
 def add_reader(
     reader: ReaderCreate,
     db: Session = Depends(get_db),
+    audit=Depends(get_audit),
     current_user=Depends(get_current_user),
 ):
-    if db.query(Reader).filter(Reader.email == reader.email).first():
+    # Уникальность email проверяет БД (uq_readers_branch_email): при
+    # конфликте INSERT ничего не вставляет и RETURNING пуст
+    new_reader = db.scalar(
+        insert_ignore(db.get_bind(Reader).dialect.name, Reader)
+        .values(
+            name=reader.name,
+            email=reader.email,
+            branch_id=current_user.branch_id,
+        )
+        .returning(Reader)
+    )
+    if new_reader is None:
         raise HTTPException(
             status_code=409, detail="Reader with this email already exists"
         )
-    new_reader = Reader(name=reader.name, email=reader.email)
-    db.add(new_reader)
+    result = ReaderOut.model_validate(new_reader)
     db.commit()
-    db.refresh(new_reader)
-    return new_reader
+    audit.record(
+        current_user.id,
+        "create",
+        "reader",
+        result.id,
+        None,
+        result.model_dump(),
+        branch_id=current_user.branch_id,
+    )
+    return result
+
+
+def link_next_page(request: Request, response: Response, **params):
+    """Заголовок ``Link`` со ссылкой на следующую страницу."""
+    next_url = request.url.include_query_params(**params)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+
+def reader_search(dialect: str, q: str):
+    """Условие поиска: email начинается с ``q`` или имя содержит ``q``.
+
+    Регистр не учитывается. Начало email ищется диапазоном по индексу
+    ``lower(email)``, имя — через FTS5 trigram в SQLite или pg_trgm в
+    PostgreSQL. Фразу короче трёх символов триграммы не покрывают, и
+    имена тогда проверяются перебором.
+    """
+    needle = q.lower()
+    email = func.lower(Reader.email)
+    email_prefix = and_(
+        email >= needle, email < needle[:-1] + chr(ord(needle[-1]) + 1)
+    )
+    if dialect == "sqlite" and len(needle) >= 3:
+        phrase = '"' + needle.replace('"', '""') + '"'
+        name = Reader.id.in_(queries.READER_IDS_BY_NAME.params(phrase=phrase))
+    else:
+        name = func.lower(Reader.name).contains(needle, autoescape=True)
+    return or_(email_prefix, name)
 
 
 # Получение списка читателей (Read)
 @router.get("", response_model=List[ReaderOut])
 def get_readers(
-    db: Session = Depends(get_db), current_user=Depends(get_current_user)
+    request: Request,
+    response: Response,
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    limit: Optional[int] = Query(None, ge=1, le=READERS_MAX_PAGE_SIZE),
+    after_id: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
 ):
-    readers = db.query(Reader).all()
+    """Список живых читателей.
+
+    Без параметров — все читатели. С ``q``, ``limit`` или ``after_id`` —
+    страница по возрастанию id после ``after_id`` не длиннее ``limit``;
+    ссылка на следующую страницу — в заголовке ``Link``.
+    """
+    if q is None and limit is None and after_id is None:
+        if FAST_JSON_RESPONSES:
+            return json_stream_response(
+                db, queries.LIVE_READER_ROWS, Reader.id, ReaderOut
+            )
+        return db.scalars(queries.LIVE_READERS).all()
+
+    limit = limit or READERS_PAGE_SIZE
+    stmt = queries.LIVE_READERS
+    if q:
+        stmt = stmt.where(reader_search(db.get_bind(Reader).dialect.name, q))
+    if after_id is not None:
+        stmt = stmt.where(Reader.id > after_id)
+    # Страница ограничена limit, поэтому обычный response_model
+    readers = db.scalars(stmt.order_by(Reader.id).limit(limit)).all()
+    if len(readers) == limit:
+        link_next_page(request, response, after_id=readers[-1].id, limit=limit)
     return readers
 
 
@@ -46,43 +145,143 @@ def get_readers(
 @router.get("/{reader_id}", response_model=ReaderOut)
 def get_reader(
     reader_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user=Depends(get_current_user),
 ):
-    reader = db.query(Reader).get(reader_id)
+    reader = get_live(db, Reader, reader_id)
     if not reader:
         raise HTTPException(status_code=404, detail="Reader not found")
+    response.headers["ETag"] = etag(reader.version)
     return reader
 
 
+# История выдач читателя: текущие и прошлые книги
+@router.get(
+    "/{reader_id}/loans", response_model=List[BorrowedBookWithTitleOut]
+)
+def get_reader_loans(
+    reader_id: int,
+    request: Request,
+    response: Response,
+    status: Optional[Literal["active", "returned"]] = None,
+    limit: int = Query(READERS_PAGE_SIZE, ge=1, le=READERS_MAX_PAGE_SIZE),
+    before_id: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    """Выдачи читателя от новых к старым, страница после ``before_id``.
+
+    ``status=active`` — книги на руках, ``returned`` — возвращённые.
+    Строки выдач читаются из индекса ``ix_borrowed_books_reader_history``
+    и соединяются с ``books`` по первичному ключу.
+    """
+    if db.scalar(queries.LIVE_ID[Reader], {"id": reader_id}) is None:
+        raise HTTPException(status_code=404, detail="Reader not found")
+    stmt = queries.READER_LOANS
+    if status is not None:
+        stmt = stmt.where(queries.LOAN_STATUS_FILTERS[status])
+    if before_id is not None:
+        stmt = stmt.where(BorrowedBook.id < before_id)
+    rows = db.execute(stmt.limit(limit), {"reader_id": reader_id}).all()
+    loans = rows_to_dicts(rows, BorrowedBookWithTitleOut)
+    if len(loans) == limit:
+        link_next_page(
+            request, response, before_id=loans[-1]["id"], limit=limit
+        )
+    return loans
+
+
+def _update_reader(
+    db: Session,
+    reader_id: int,
+    values: dict,
+    expected_version: Optional[int],
+    response: Response,
+    audit,
+    actor,
+) -> ReaderOut:
+    """Меняет только переданные колонки одним UPDATE ... RETURNING.
+
+    Тот же запрос возвращает прежние значения этих колонок для журнала
+    аудита.
+    """
+    stmt = versioned_update(Reader, reader_id, values, expected_version)
+    try:
+        row = db.execute(stmt).first()
+    except IntegrityError:
+        # Email уже у другого читателя филиала (uq_readers_branch_email)
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Email already in use")
+    if row is None:
+        raise not_found_or_conflict(db, Reader, reader_id, "Reader")
+    reader, before = row[0], dict(zip(values, row[1:]))
+    result = ReaderOut.model_validate(reader)
+    db.commit()
+    audit.record(
+        actor.id,
+        "update",
+        "reader",
+        reader_id,
+        before,
+        {field: getattr(result, field) for field in before},
+        branch_id=actor.branch_id,
+    )
+    response.headers["ETag"] = etag(result.version)
+    return result
+
+
 # Обновление читателя (Update)
 @router.put("/{reader_id}", response_model=ReaderOut)
 def update_reader(
     reader_id: int,
     reader_update: ReaderUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
     db: Session = Depends(get_db),
+    audit=Depends(get_audit),
     current_user=Depends(get_current_user),
 ):
-    reader = db.query(Reader).get(reader_id)
-    if not reader:
-        raise HTTPException(status_code=404, detail="Reader not found")
-
-    if reader_update.email:
-        existing = (
-            db.query(Reader)
-            .filter(Reader.email == reader_update.email)
-            .first()
-        )
-        if existing is not None and existing.id != reader_id:
-            raise HTTPException(status_code=409, detail="Email already in use")
-        reader.email = reader_update.email
+    # Пустые значения в PUT означают «не менять»
+    values = {
+        field: value
+        for field, value in reader_update.model_dump().items()
+        if value
+    }
+    return _update_reader(
+        db,
+        reader_id,
+        values,
+        expected_version,
+        response,
+        audit,
+        current_user,
+    )
 
-    if reader_update.name:
-        reader.name = reader_update.name
 
-    db.commit()
-    db.refresh(reader)
-    return reader
+# Частичное обновление читателя: меняются только переданные поля
+@router.patch("/{reader_id}", response_model=ReaderOut)
+def patch_reader(
+    reader_id: int,
+    reader_update: ReaderPatch,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+    db: Session = Depends(get_db),
+    audit=Depends(get_audit),
+    current_user=Depends(get_current_user),
+):
+    values = reader_update.model_dump(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    return _update_reader(
+        db,
+        reader_id,
+        values,
+        expected_version,
+        response,
+        audit,
+        current_user,
+    )
 
 
 # Удаление читателя (Delete)
@@ -90,11 +289,31 @@ def update_reader(
 def delete_reader(
     reader_id: int,
     db: Session = Depends(get_db),
+    audit=Depends(get_audit),
     current_user=Depends(get_current_user),
 ):
-    reader = db.query(Reader).get(reader_id)
+    reader = get_live(db, Reader, reader_id)
     if not reader:
         raise HTTPException(status_code=404, detail="Reader not found")
-    db.delete(reader)
+    if has_active_loans(db, "reader_id", reader_id):
+        raise HTTPException(status_code=409, detail="Reader has books on loan")
+    # Строка остаётся ради истории выдач, её удалит фоновая очистка
+    deleted_at = datetime.utcnow()
+    reader.deleted_at = deleted_at
+    notified, changes = cancel_holds(
+        db, open_holds(db, Hold.reader_id == reader_id)
+    )
     db.commit()
+    notify_holds(notified)
+    for change in changes:
+        publish(change)
+    audit.record(
+        current_user.id,
+        "delete",
+        "reader",
+        reader_id,
+        {"deleted_at": None},
+        {"deleted_at": deleted_at},
+        branch_id=current_user.branch_id,
+    )
     return None
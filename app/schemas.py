@@ -1,11 +1,14 @@
 import datetime
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel, EmailStr, Field
 
 
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
+    branch_id: Optional[int] = Field(
+        None, description="ID филиала (по умолчанию — филиал регистрирующего)"
+    )
 
 
 class UserLogin(BaseModel):
@@ -16,6 +19,13 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str
+    # Срок жизни токена доступа в секундах
+    expires_in: int
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class BookBase(BaseModel):
@@ -38,8 +48,19 @@ class BookUpdate(BookBase):
     pass
 
 
+class BookPatch(BaseModel):
+    # Поля без Optional: явный null для NOT NULL колонок отклоняется
+    title: str = Field(None, description="Название книги")
+    author: str = Field(None, description="Автор книги")
+    year: Optional[int] = Field(None, description="Год публикации")
+    isbn: Optional[str] = Field(None, description="ISBN книги")
+    copies: int = Field(None, ge=0, description="Количество экземпляров")
+    genre: Optional[str] = Field(None, description="Жанр")
+
+
 class BookOut(BookBase):
     id: int
+    version: int
 
     class Config:
         from_attributes = True
@@ -59,8 +80,14 @@ class ReaderUpdate(BaseModel):
     email: Optional[EmailStr] = Field(None, description="Email читателя")
 
 
+class ReaderPatch(BaseModel):
+    name: str = Field(None, description="Имя читателя")
+    email: EmailStr = Field(None, description="Email читателя")
+
+
 class ReaderOut(ReaderBase):
     id: int
+    version: int
 
     class Config:
         from_attributes = True
@@ -80,6 +107,7 @@ class BorrowedBookOut(BaseModel):
     id: int
     book_id: int
     reader_id: int
+    item_id: Optional[int] = None
     borrow_date: Optional[datetime.datetime]
     return_date: Optional[datetime.datetime]
 
@@ -98,3 +126,78 @@ class BorrowedBookWithTitleOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ItemCreate(BaseModel):
+    book_id: int = Field(..., description="ID книги")
+    barcode: Optional[str] = Field(
+        None, min_length=1, description="Штрихкод (по умолчанию — новый)"
+    )
+
+
+class ItemStatusUpdate(BaseModel):
+    # on_loan ставится только выдачей и снимается возвратом
+    status: Literal["available", "damaged", "lost", "withdrawn"]
+
+
+class ItemBorrowRequest(BaseModel):
+    reader_id: int = Field(..., description="ID читателя")
+
+
+class ItemOut(BaseModel):
+    id: int
+    barcode: str
+    book_id: int
+    status: str
+
+    class Config:
+        from_attributes = True
+
+
+class BranchCreate(BaseModel):
+    name: str = Field(..., min_length=1, description="Название филиала")
+
+
+class BranchOut(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
+
+
+class BranchAvailabilityOut(BaseModel):
+    branch_id: int
+    branch_name: str
+    book_id: int
+    copies: int
+
+
+class HoldCreate(BaseModel):
+    book_id: int = Field(..., description="ID книги")
+    reader_id: int = Field(..., description="ID читателя")
+
+
+class HoldOut(BaseModel):
+    id: int
+    book_id: int
+    reader_id: int
+    created_at: datetime.datetime
+    status: str
+    ready_at: Optional[datetime.datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class AuditEntryOut(BaseModel):
+    id: int
+    created_at: datetime.datetime
+    actor_id: Optional[int]
+    action: str
+    entity: str
+    entity_id: Optional[int]
+    diff: dict
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,479 @@
+"""Синтетические данные для нагрузочных тестов и воспроизведения проблем.
+
+Генерирует книги (жанры и годы издания с перекосом к популярным жанрам и
+новым книгам), их экземпляры, читателей и историю выдач за ``--days``
+дней. Популярность книг и активность читателей распределены по Ципфу
+(``--book-skew``, ``--reader-skew``): немногие книги и читатели дают
+большую часть выдач. Выдачи последних недель остаются на руках, если
+у книги есть свободный экземпляр, а у читателя меньше трёх книг;
+``copies`` и статусы экземпляров соответствуют открытым выдачам.
+
+Одинаковые ``--seed`` и ``--until`` дают одинаковые данные. Строки
+вставляются пачками по ``--batch-size`` через executemany с явными id,
+неуникальные индексы и поиск по имени читателя (FTS5 или pg_trgm)
+перестраиваются один раз после загрузки. Данные добавляются к уже
+существующим, строки библиотекарей не создаются.
+
+Команда (1 млн книг, 200 тыс. читателей, 10 млн выдач):
+    python -m app.seed_app --books 1000000 --readers 200000 --loans 10000000
+"""
+
+import argparse
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import itertools
+import random
+import time
+
+from sqlalchemy import bindparam, func, select, text, update
+
+from app.database import engine
+from app.models import (
+    READER_NAME_FTS,
+    READER_NAME_SEARCH_DDL,
+    Book,
+    BorrowedBook,
+    Branch,
+    Item,
+    Reader,
+)
+
+BATCH_SIZE = 50_000
+# Как в проверке выдачи (bookkeeping_app.check_can_borrow)
+MAX_OPEN_LOANS = 3
+# Срок выдачи, дней: от, до и самый частый
+LOAN_DAYS = (1, 30, 14)
+# Жанр и его вес
+GENRES = {
+    "Fiction": 30,
+    "Mystery": 12,
+    "Fantasy": 10,
+    "Romance": 10,
+    "Science Fiction": 8,
+    "Biography": 7,
+    "History": 7,
+    "Children": 6,
+    "Science": 5,
+    "Poetry": 3,
+    "Reference": 2,
+}
+# Вероятности 1, 2, ... экземпляров книги
+COPIES_WEIGHTS = (50, 25, 12, 8, 5)
+# Средний возраст книги, лет
+MEAN_BOOK_AGE = 15
+OLDEST_YEAR = 1800
+FIRST_NAMES = (
+    "Anna Boris Chen Daria Emil Fatima Georg Hana Ivan Julia Kofi Lena "
+    "Marco Nina Oleg Priya Rosa Sergei Tomas Vera"
+).split()
+LAST_NAMES = (
+    "Abbott Berg Costa Dubois Eriksen Fischer Garcia Hoffman Ivanova "
+    "Jensen Kowalski Larsen Moreau Novak Orlov Petrov Rossi Smirnova "
+    "Tanaka Weber"
+).split()
+TITLE_WORDS = (
+    "Silent Winter River Garden Shadow Empire Letters Night Glass Journey "
+    "Island Memory Storm Crown Secret House Light Road Ocean Clockwork"
+).split()
+
+# Таблицы, индексы которых строятся после загрузки
+LOADED_TABLES = (
+    Book.__table__,
+    Item.__table__,
+    Reader.__table__,
+    BorrowedBook.__table__,
+)
+# Поиск по имени: что удалить до загрузки и выполнить после неё
+FTS_TRIGGERS = [f"{READER_NAME_FTS}_{suffix}" for suffix in ("ai", "ad", "au")]
+SEARCH_DROP = {
+    "sqlite": [f"DROP TRIGGER IF EXISTS {name}" for name in FTS_TRIGGERS],
+    "postgresql": ["DROP INDEX IF EXISTS ix_readers_name_trgm"],
+}
+SEARCH_REBUILD = {
+    "sqlite": [
+        f"INSERT INTO {READER_NAME_FTS}({READER_NAME_FTS}) VALUES ('rebuild')",
+        *(
+            statement
+            for statement in READER_NAME_SEARCH_DDL["sqlite"]
+            if statement.startswith("CREATE TRIGGER")
+        ),
+    ],
+    "postgresql": [
+        statement
+        for statement in READER_NAME_SEARCH_DDL["postgresql"]
+        if statement.startswith("CREATE INDEX")
+    ],
+}
+
+
+def isbn13(number: int) -> str:
+    """ISBN-13 с префиксом 978 и правильной контрольной цифрой."""
+    digits = f"978{number:09d}"
+    total = sum(
+        int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits)
+    )
+    return f"{digits}{(10 - total % 10) % 10}"
+
+
+def zipf_cum_weights(count: int, exponent: float) -> array:
+    """Накопленные веса 1/rank**exponent для ``random.choices``."""
+    return array(
+        "d",
+        itertools.accumulate(
+            rank**-exponent for rank in range(1, count + 1)
+        ),
+    )
+
+
+def _next_id(conn, table) -> int:
+    return (conn.scalar(select(func.max(table.c.id))) or 0) + 1
+
+
+def _batches(count: int, size: int):
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+
+@contextmanager
+def deferred_indexes(conn):
+    """Удаляет неуникальные индексы на время загрузки и строит заново.
+
+    Уникальные индексы остаются: на них держатся ограничения.
+    """
+    dialect = conn.dialect.name
+    indexes = [
+        index
+        for table in LOADED_TABLES
+        for index in table.indexes
+        if not index.unique
+    ]
+    for index in indexes:
+        # Не drop(checkfirst=True): отражение не видит индексы по выражениям
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    for statement in SEARCH_DROP.get(dialect, []):
+        conn.execute(text(statement))
+    conn.commit()
+    try:
+        yield
+    finally:
+        for index in indexes:
+            index.create(conn)
+        for statement in SEARCH_REBUILD.get(dialect, []):
+            conn.execute(text(statement))
+        conn.commit()
+
+
+def _ensure_branches(conn, branches: int):
+    existing = set(conn.scalars(select(Branch.id)))
+    missing = [
+        {"id": branch_id, "name": f"Branch {branch_id}"}
+        for branch_id in range(1, branches + 1)
+        if branch_id not in existing
+    ]
+    if missing:
+        conn.execute(Branch.__table__.insert(), missing)
+
+
+def _load_books(conn, rng, books, branches, batch_size, until):
+    """Вставляет книги и их экземпляры.
+
+    Возвращает id первой книги, id первого экземпляра каждой книги и
+    число экземпляров; книга с индексом i принадлежит филиалу
+    ``i % branches + 1``.
+    """
+    first_book = _next_id(conn, Book.__table__)
+    next_item = _next_id(conn, Item.__table__)
+    first_items = array("q")
+    copies = array("B")
+    genres = list(GENRES)
+    for chunk in _batches(books, batch_size):
+        book_rows = []
+        item_rows = []
+        picked_genres = rng.choices(genres, GENRES.values(), k=len(chunk))
+        picked_copies = rng.choices(
+            range(1, len(COPIES_WEIGHTS) + 1), COPIES_WEIGHTS, k=len(chunk)
+        )
+        for i, genre, count in zip(chunk, picked_genres, picked_copies):
+            book_id = first_book + i
+            age = int(rng.expovariate(1 / MEAN_BOOK_AGE))
+            book_rows.append(
+                {
+                    "id": book_id,
+                    "title": (
+                        f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)}"
+                    ),
+                    "author": (
+                        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+                    ),
+                    "year": max(until.year - age, OLDEST_YEAR),
+                    "isbn": isbn13(book_id),
+                    "copies": count,
+                    "genre": genre,
+                    "branch_id": i % branches + 1,
+                }
+            )
+            first_items.append(next_item)
+            copies.append(count)
+            item_rows.extend(
+                {
+                    "id": item_id,
+                    "barcode": f"S{item_id:011d}",
+                    "book_id": book_id,
+                    "status": "available",
+                }
+                for item_id in range(next_item, next_item + count)
+            )
+            next_item += count
+        conn.execute(Book.__table__.insert(), book_rows)
+        conn.execute(Item.__table__.insert(), item_rows)
+        conn.commit()
+    return first_book, first_items, copies
+
+
+def _load_readers(conn, rng, readers, branches, batch_size) -> int:
+    """Вставляет читателей; читатель i — в филиале ``i % branches + 1``."""
+    first_reader = _next_id(conn, Reader.__table__)
+    for chunk in _batches(readers, batch_size):
+        rows = [
+            {
+                "id": first_reader + i,
+                "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "email": f"reader{first_reader + i}@example.com",
+                "branch_id": i % branches + 1,
+            }
+            for i in chunk
+        ]
+        conn.execute(Reader.__table__.insert(), rows)
+        conn.commit()
+    return first_reader
+
+
+def _load_loans(conn, rng, loans, options, books, readers):
+    """Вставляет выдачи по времени; возвращает открытые выдачи по книгам.
+
+    Книга выбирается по популярности, читатель — по активности среди
+    читателей филиала книги.
+    """
+    first_book, first_items, copies = books
+    first_reader, per_branch, branches = readers
+    until = options["until"]
+    started = until - timedelta(days=options["days"])
+    step = options["days"] * 86400 / loans
+    # Популярные книги и активные читатели разбросаны по id
+    book_order = array("q", range(len(copies)))
+    rng.shuffle(book_order)
+    book_weights = zipf_cum_weights(len(copies), options["book_skew"])
+    reader_order = array("q", range(per_branch))
+    rng.shuffle(reader_order)
+    reader_weights = zipf_cum_weights(per_branch, options["reader_skew"])
+    open_by_book = Counter()
+    open_by_reader = Counter()
+    for chunk in _batches(loans, options["batch_size"]):
+        book_ranks = rng.choices(
+            range(len(copies)), cum_weights=book_weights, k=len(chunk)
+        )
+        reader_ranks = rng.choices(
+            range(per_branch), cum_weights=reader_weights, k=len(chunk)
+        )
+        rows = []
+        for n, book_rank, reader_rank in zip(chunk, book_ranks, reader_ranks):
+            i = book_order[book_rank]
+            branch = i % branches
+            reader_id = (
+                first_reader + reader_order[reader_rank] * branches + branch
+            )
+            borrowed = started + timedelta(seconds=n * step)
+            returned = borrowed + timedelta(days=rng.triangular(*LOAN_DAYS))
+            item_id = first_items[i] + rng.randrange(copies[i])
+            if returned > until:
+                if (
+                    open_by_book[i] < copies[i]
+                    and open_by_reader[reader_id] < MAX_OPEN_LOANS
+                ):
+                    # Ещё на руках: занимает следующий свободный экземпляр
+                    item_id = first_items[i] + open_by_book[i]
+                    open_by_book[i] += 1
+                    open_by_reader[reader_id] += 1
+                    returned = None
+                else:
+                    returned = until
+            rows.append(
+                {
+                    "book_id": first_book + i,
+                    "reader_id": reader_id,
+                    "item_id": item_id,
+                    "borrow_date": borrowed,
+                    "return_date": returned,
+                    "branch_id": branch + 1,
+                }
+            )
+        conn.execute(BorrowedBook.__table__.insert(), rows)
+        conn.commit()
+    return open_by_book
+
+
+def _apply_open_loans(conn, open_by_book, first_book, first_items):
+    """Экземпляры открытых выдач — on_loan, ``copies`` — свободные."""
+    if not open_by_book:
+        return
+    items = Item.__table__
+    books = Book.__table__
+    conn.execute(
+        update(items)
+        .where(items.c.id == bindparam("item_id"))
+        .values(status="on_loan"),
+        [
+            {"item_id": first_items[i] + offset}
+            for i, taken in open_by_book.items()
+            for offset in range(taken)
+        ],
+    )
+    conn.execute(
+        update(books)
+        .where(books.c.id == bindparam("book_id"))
+        .values(copies=books.c.copies - bindparam("taken")),
+        [
+            {"book_id": first_book + i, "taken": taken}
+            for i, taken in open_by_book.items()
+        ],
+    )
+    conn.commit()
+
+
+def seed(
+    target,
+    books: int,
+    readers: int,
+    loans: int,
+    branches: int = 1,
+    seed: int = 0,
+    days: int = 730,
+    until: datetime | None = None,
+    book_skew: float = 0.8,
+    reader_skew: float = 0.5,
+    batch_size: int = BATCH_SIZE,
+) -> dict:
+    """Наполняет БД ``target``; возвращает число вставленных строк.
+
+    ``until`` — момент последней выдачи (по умолчанию начало текущих
+    суток UTC), от него отсчитываются ``days`` дней истории.
+    """
+    if readers < branches:
+        raise ValueError("Every branch needs at least one reader")
+    if loans and not books:
+        raise ValueError("Loans need at least one book")
+    if until is None:
+        until = datetime.utcnow().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+    rng = random.Random(seed)
+    options = {
+        "until": until,
+        "days": days,
+        "book_skew": book_skew,
+        "reader_skew": reader_skew,
+        "batch_size": batch_size,
+    }
+    with target.connect() as conn:
+        dialect = conn.dialect.name
+        if dialect == "sqlite":
+            # Сгенерированные данные не жалко: fsync на каждый commit
+            # только замедлил бы загрузку
+            conn.execute(text("PRAGMA synchronous=OFF"))
+        _ensure_branches(conn, branches)
+        with deferred_indexes(conn):
+            loaded_books = _load_books(
+                conn, rng, books, branches, batch_size, until
+            )
+            first_reader = _load_readers(
+                conn, rng, readers, branches, batch_size
+            )
+            open_by_book = (
+                _load_loans(
+                    conn,
+                    rng,
+                    loans,
+                    options,
+                    loaded_books,
+                    (first_reader, readers // branches, branches),
+                )
+                if loans
+                else Counter()
+            )
+            _apply_open_loans(
+                conn, open_by_book, loaded_books[0], loaded_books[1]
+            )
+        if dialect == "postgresql":
+            # id вставлены явно: последовательности догоняют их вручную
+            for table in ("books", "items", "readers"):
+                conn.execute(
+                    text(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', "
+                        f"'id'), (SELECT max(id) FROM {table}))"
+                    )
+                )
+        conn.execute(text("ANALYZE"))
+        if dialect == "sqlite":
+            conn.execute(text("PRAGMA synchronous=FULL"))
+        conn.commit()
+    return {
+        "books": books,
+        "items": sum(loaded_books[2]),
+        "readers": readers,
+        "borrowed_books": loans,
+        "open_loans": sum(open_by_book.values()),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate library data")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--readers", type=int, default=20_000)
+    parser.add_argument("--loans", type=int, default=1_000_000)
+    parser.add_argument("--branches", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=730, help="дней истории")
+    parser.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        help="момент последней выдачи (ISO 8601, по умолчанию сегодня)",
+    )
+    parser.add_argument(
+        "--book-skew", type=float, default=0.8, help="показатель Ципфа"
+    )
+    parser.add_argument("--reader-skew", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Наполнение БД из DATABASE_URL синтетическими данными."""
+    args = parse_args(argv)
+    started = time.perf_counter()
+    try:
+        counts = seed(
+            engine,
+            books=args.books,
+            readers=args.readers,
+            loans=args.loans,
+            branches=args.branches,
+            seed=args.seed,
+            days=args.days,
+            until=args.until,
+            book_skew=args.book_skew,
+            reader_skew=args.reader_skew,
+            batch_size=args.batch_size,
+        )
+    except ValueError as error:
+        raise SystemExit(str(error))
+    elapsed = time.perf_counter() - started
+    print(
+        ", ".join(f"{table}: {count}" for table, count in counts.items())
+        + f" за {elapsed:.1f} с"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Запуск приложения в production: несколько воркеров uvicorn.
+
+Пример: python -m app.server_app --workers 4 --port 8000
+
+uvloop и httptools используются, если установлены (uvicorn[standard]).
+По SIGTERM uvicorn перестаёт принимать соединения, ждёт завершения
+текущих запросов (не дольше --graceful-timeout) и выполняет lifespan
+shutdown, где закрываются пулы соединений.
+"""
+
+import argparse
+from importlib.util import find_spec
+import os
+
+import uvicorn
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def build_options(args) -> dict:
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers,
+        "loop": "uvloop" if find_spec("uvloop") else "asyncio",
+        "http": "httptools" if find_spec("httptools") else "h11",
+        "lifespan": "on",
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "timeout_keep_alive": args.keep_alive,
+        "proxy_headers": True,
+        "log_level": args.log_level,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Library API server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.getenv("PORT", "8000"))
+    )
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="сколько секунд ждать текущие запросы после SIGTERM",
+    )
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Основная функция запуска сервера."""
+    # Приложение передаётся строкой, чтобы каждый воркер импортировал его сам
+    uvicorn.run("app.main:app", **build_options(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Филиалы: ограничение запросов сессии филиалом библиотекаря.
+
+После аутентификации в ``session.info["branch_id"]`` записывается филиал
+библиотекаря (``set_branch``). Каждый ORM-запрос сессии — SELECT, а
+также UPDATE и DELETE через ``update(Model)``/``delete(Model)`` —
+получает условие ``branch_id = :branch_id`` для книг, читателей и
+выдач, так что роутерам не нужно добавлять его вручную. Вместе с
+индексами, где ``branch_id`` идёт первым, стоимость запроса зависит от
+размера филиала, а не от общего числа строк.
+
+Запрос по всем филиалам (наличие книги в других филиалах) выполняется с
+``execution_options(**ALL_BRANCHES)``. Экземпляры и брони ограничиваются
+через свою книгу.
+"""
+
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from app.models import Book, BorrowedBook, Reader
+
+BRANCH_SCOPED = (Book, Reader, BorrowedBook)
+ALL_BRANCHES = {"all_branches": True}
+
+
+def set_branch(db: Session, branch_id: int):
+    db.info["branch_id"] = branch_id
+
+
+def current_branch(db: Session) -> Optional[int]:
+    return db.info.get("branch_id")
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_to_branch(state):
+    branch_id = state.session.info.get("branch_id")
+    if (
+        branch_id is None
+        or state.execution_options.get("all_branches")
+        or state.is_column_load
+        or state.is_relationship_load
+        or not (state.is_select or state.is_update or state.is_delete)
+    ):
+        return
+    state.statement = state.statement.options(
+        *(
+            with_loader_criteria(
+                model,
+                lambda cls: cls.branch_id == branch_id,
+                include_aliases=True,
+            )
+            for model in BRANCH_SCOPED
+        )
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_branch(session, flush_context, instances):
+    # Новые книги, читатели и выдачи попадают в филиал сессии
+    branch_id = session.info.get("branch_id")
+    if branch_id is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, BRANCH_SCOPED) and obj.branch_id is None:
+            obj.branch_id = branch_id
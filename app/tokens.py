@@ -0,0 +1,207 @@
+"""Токены доступа, refresh-токены, ключи подписи и отзыв токенов.
+
+Токен доступа живёт ``ACCESS_TOKEN_EXPIRE_MINUTES`` минут, refresh-токен —
+``REFRESH_TOKEN_EXPIRE_DAYS`` дней; ``POST /librarian/refresh`` меняет
+refresh-токен на новую пару, а старый отзывает. В заголовке токена —
+``kid`` ключа подписи, поэтому ключ можно сменить, не разлогинивая всех
+(``SIGNING_KEYS``, ``SIGNING_KID``).
+
+Отозванные ``jti`` хранятся в ``revoked_tokens``, а в памяти процесса —
+в фильтре Блума. Ложноотрицательных ответов у фильтра нет, поэтому
+проверка неотозванного токена обходится без запроса к БД, а БД
+спрашивается только при совпадении. Отзывы из других воркеров фильтр
+подтягивает раз в ``REVOCATION_SYNC_SECONDS`` секунд одним запросом по
+возрастанию id.
+
+python-jose (с криптографией) и passlib (bcrypt) импортируются только
+здесь и только внутри функций: они заметно удлиняют старт процесса, а
+нужны лишь при первом запросе с токеном или паролем (``python -X
+importtime``, ``benchmarks.bench_startup``). Остальные модули работают с
+токенами и паролями через функции этого модуля.
+"""
+
+from datetime import datetime, timedelta
+import hashlib
+import math
+import threading
+import time
+import uuid
+
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.config_app import (
+    ALGORITHM,
+    REVOCATION_FILTER_BITS,
+    REVOCATION_FILTER_HASHES,
+    REVOCATION_SYNC_SECONDS,
+    SIGNING_KEYS,
+    SIGNING_KID,
+)
+from app.database import insert_ignore
+from app.models import RevokedToken
+
+# kid токенов, выданных до появления ротации ключей
+LEGACY_KID = "default"
+
+
+class InvalidToken(Exception):
+    """Подпись, срок или ключ токена не прошли проверку."""
+
+
+def hash_password(password: str) -> str:
+    from passlib.hash import bcrypt
+
+    return bcrypt.hash(password)
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    from passlib.hash import bcrypt
+
+    return bcrypt.verify(password, password_hash)
+
+
+def check_signing_keys():
+    """Проверка при старте: ключ подписи задан явно.
+
+    Иначе токены подписывались бы строкой, известной каждому, кто видел
+    исходники.
+    """
+    if not SIGNING_KEYS:
+        raise RuntimeError("Set SIGNING_KEYS or SECRET_KEY")
+    if SIGNING_KID not in SIGNING_KEYS:
+        raise RuntimeError(
+            f"SIGNING_KID {SIGNING_KID!r} is not in SIGNING_KEYS"
+        )
+
+
+def issue_token(data: dict, token_type: str, expires_delta: timedelta) -> str:
+    """Подписывает ``data`` текущим ключом; ``token_type`` — access/refresh."""
+    from jose import jwt
+
+    claims = dict(
+        data,
+        typ=token_type,
+        jti=uuid.uuid4().hex,
+        exp=datetime.utcnow() + expires_delta,
+    )
+    return jwt.encode(
+        claims,
+        SIGNING_KEYS[SIGNING_KID],
+        algorithm=ALGORITHM,
+        headers={"kid": SIGNING_KID},
+    )
+
+
+def decode_token(token: str) -> dict:
+    """Поля токена после проверки подписи и срока (иначе ``InvalidToken``)."""
+    from jose import JWTError, jwt
+
+    try:
+        kid = jwt.get_unverified_header(token).get("kid", LEGACY_KID)
+        key = SIGNING_KEYS.get(kid)
+        if key is None:
+            raise InvalidToken(f"Unknown signing key {kid!r}")
+        return jwt.decode(token, key, algorithms=[ALGORITHM])
+    except JWTError as exc:
+        raise InvalidToken(str(exc)) from exc
+
+
+class BloomFilter:
+    """Множество строк без ложноотрицательных ответов.
+
+    ``hashes`` позиций получаются из одного blake2b двойным хэшированием.
+    """
+
+    def __init__(self, bits: int, hashes: int):
+        self.size = bits
+        self.hashes = hashes
+        self.count = 0
+        self._bits = bytearray((bits + 7) // 8)
+
+    @property
+    def capacity(self) -> int:
+        """Сколько ключей фильтр вмещает при оптимальном числе хэшей."""
+        return int(self.size * math.log(2) / self.hashes)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class RevocationList:
+    """Отозванные токены: фильтр Блума в памяти и таблица в БД."""
+
+    def __init__(self, bits: int, hashes: int, sync_seconds: float):
+        self.bits = bits
+        self.hashes = hashes
+        self.sync_seconds = sync_seconds
+        self.filter = BloomFilter(bits, hashes)
+        self._last_id = 0
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def revoke(self, db: Session, payload: dict) -> bool:
+        """Отзывает токен до конца его срока; False — уже был отозван."""
+        table = RevokedToken.__table__
+        dialect = db.get_bind(RevokedToken).dialect.name
+        result = db.execute(
+            insert_ignore(dialect, table).values(
+                jti=payload["jti"],
+                expires_at=datetime.utcfromtimestamp(payload["exp"]),
+            )
+        )
+        with self._lock:
+            self.filter.add(payload["jti"])
+        return result.rowcount == 1
+
+    def sync(self, db: Session):
+        """Добавляет в фильтр отзывы других процессов (не чаще периода)."""
+        now = time.monotonic()
+        if (
+            self._synced_at is not None
+            and now - self._synced_at < self.sync_seconds
+        ):
+            return
+        # Синхронизирует один поток, остальные не ждут
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._synced_at = now
+            if self.filter.count >= self.filter.capacity:
+                # Истёкшие отзывы не удалить из фильтра — собираем заново
+                self.filter = BloomFilter(self.bits, self.hashes)
+                self._last_id = 0
+            rows = db.execute(
+                queries.REVOKED_SINCE,
+                {"after_id": self._last_id, "now": datetime.utcnow()},
+            ).all()
+            for row_id, jti in rows:
+                self.filter.add(jti)
+                self._last_id = row_id
+        finally:
+            self._lock.release()
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        if jti not in self.filter:
+            return False
+        # Совпадение может быть ложным: проверяем по БД
+        return db.scalar(queries.REVOKED_TOKEN_ID, {"jti": jti}) is not None
+
+
+revocations = RevocationList(
+    REVOCATION_FILTER_BITS, REVOCATION_FILTER_HASHES, REVOCATION_SYNC_SECONDS
+)
@@ -0,0 +1,76 @@
+"""Стоимость записи в журнал аудита для запроса.
+
+Сравнивается синхронная запись каждой строки своей транзакцией (так
+аудит выглядел бы без буфера) с ``AuditWriter.record``, который только
+кладёт запись в буфер, и фоновым сбросом пачками. Журнал пишется во
+временный файл SQLite в режиме WAL, как в приложении.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_audit --entries 20000
+"""
+
+import argparse
+from datetime import datetime
+import os
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+from app.audit import AuditWriter, diff
+from app.database import make_engine
+from app.models import AuditEntry
+
+BEFORE = {"title": "Old title", "copies": 2}
+AFTER = {"title": "New title", "copies": 3}
+
+
+def synchronous(engine, entries):
+    started = time.perf_counter()
+    for entity_id in range(entries):
+        with engine.begin() as conn:
+            conn.execute(
+                insert(AuditEntry),
+                {
+                    "created_at": datetime.utcnow(),
+                    "actor_id": 1,
+                    "action": "update",
+                    "entity": "book",
+                    "entity_id": entity_id,
+                    "diff": diff(BEFORE, AFTER),
+                },
+            )
+    return time.perf_counter() - started, 0.0
+
+
+def buffered(engine, entries):
+    writer = AuditWriter(engine)
+    writer.start()
+    started = time.perf_counter()
+    for entity_id in range(entries):
+        writer.record(1, "update", "book", entity_id, BEFORE, AFTER)
+    in_requests = time.perf_counter() - started
+    writer.stop()
+    return in_requests, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for name, run in (("synchronous", synchronous), ("buffered", buffered)):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(f"sqlite:///{os.path.join(tmp, 'audit.db')}")
+            AuditEntry.__table__.create(engine)
+            in_requests, total = run(engine, args.entries)
+            engine.dispose()
+        per_entry = in_requests / args.entries * 1e6
+        line = f"{name:>12}: {per_entry:8.2f} µs в запросе"
+        if total:
+            line += f", всё записано за {total:.2f} с"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
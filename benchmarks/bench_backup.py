@@ -0,0 +1,127 @@
+"""Влияние онлайн-копии базы на выдачу и возврат книг.
+
+Сервер обслуживает поток выдач и возвратов, а рядом снимается копия
+``app.backup_app.backup``: целиком за один шаг (снимок в режиме WAL) и
+порциями по ``--pages`` страниц. Для каждого режима печатаются время копии
+и задержки запросов (p50/p99/max) во время копирования; ``idle`` — те же
+запросы без копии.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_backup --books 200000 --pages 1024
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+from sqlalchemy import create_engine, insert
+
+from app.backup_app import backup
+from app.models import Reader
+from benchmarks.common import (
+    auth_headers,
+    seed_books,
+    start_server,
+    stop_server,
+)
+
+
+def traffic(base_url, stop, latencies):
+    """Выдаёт и сразу возвращает книги, пока не выставлен ``stop``."""
+    with httpx.Client(base_url=base_url, headers=auth_headers()) as client:
+        n = 0
+        while not stop.is_set():
+            n += 1
+            # У книг с id, кратным 7, экземпляров нет (см. seed_books)
+            loan = {"book_id": n % 6 + 2, "reader_id": n % 50 + 1}
+            for path in ("/borrow", "/borrow/return"):
+                started = time.perf_counter()
+                client.post(path, json=loan)
+                latencies.append(time.perf_counter() - started)
+
+
+def measure(base_url, run, warmup=0.5):
+    stop = threading.Event()
+    latencies = []
+    worker = threading.Thread(
+        target=traffic, args=(base_url, stop, latencies)
+    )
+    worker.start()
+    time.sleep(warmup)
+    del latencies[:]
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worker.join()
+    return elapsed, sorted(latencies)
+
+
+def report(name, elapsed, latencies):
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(
+        f"{name:>14}: копия {elapsed:6.2f} с, запросов {len(latencies):6}, "
+        f"p50 {statistics.median(latencies) * 1e3:6.2f} мс, "
+        f"p99 {p99 * 1e3:7.2f} мс, max {latencies[-1] * 1e3:7.2f} мс"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, default=200_000)
+    parser.add_argument("--pages", type=int, default=1024)
+    parser.add_argument("--sleep", type=float, default=0.01)
+    parser.add_argument("--idle", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "library.db")
+        seed_books(db_path, args.books)
+        engine = create_engine(f"sqlite:///{db_path}")
+        with engine.begin() as conn:
+            conn.execute(
+                insert(Reader),
+                [
+                    {"name": f"Reader {i}", "email": f"r{i}@example.com"}
+                    for i in range(50)
+                ],
+            )
+        engine.dispose()
+        size = os.path.getsize(db_path) / 2**20
+        print(f"База {size:.1f} МиБ, порция {args.pages} страниц")
+
+        server, base_url = start_server(db_path)
+        backup_dir = os.path.join(tmp, "backups")
+        try:
+            modes = (
+                ("idle", lambda: time.sleep(args.idle)),
+                ("single step", lambda: backup(db_path, backup_dir, pages=0)),
+                (
+                    "stepped",
+                    lambda: backup(
+                        db_path, backup_dir, pages=args.pages, sleep=args.sleep
+                    ),
+                ),
+                (
+                    "stepped + gzip",
+                    lambda: backup(
+                        db_path,
+                        backup_dir,
+                        compress=True,
+                        pages=args.pages,
+                        sleep=args.sleep,
+                    ),
+                ),
+            )
+            for name, run in modes:
+                report(name, *measure(base_url, run))
+        finally:
+            stop_server(server)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Запросы одного филиала при росте числа филиалов в общей базе.
+
+Во временные SQLite-базы вставляется 1, 10 и 100 филиалов (``--branches``)
+по ``--per-branch`` книг и читателей в каждом, строки филиалов
+перемешаны. Сессия ограничена филиалом 1 (``app.tenancy``); для каждой
+базы печатаются медианы страницы книг по ключу, подсчёта живых книг
+филиала и поиска читателя по email. Благодаря индексам с ``branch_id``
+первым время не должно расти вместе с общим числом строк.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_branches --per-branch 10000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import bindparam, create_engine, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.models import Base, Book, Branch, Reader
+from app.tenancy import set_branch
+
+PAGE = 50
+BATCH = 50_000
+
+
+def seed(engine, branches, per_branch, rng):
+    Base.metadata.create_all(engine)
+    # Филиалы вперемешку, как если бы все работали одновременно
+    owners = [b + 1 for b in range(branches) for _ in range(per_branch)]
+    rng.shuffle(owners)
+    with engine.begin() as conn:
+        # Филиал 1 (Main) создаётся вместе со схемой
+        if branches > 1:
+            conn.execute(
+                insert(Branch),
+                [{"name": f"Branch {b + 1}"} for b in range(1, branches)],
+            )
+        for start in range(0, len(owners), BATCH):
+            chunk = range(start, min(start + BATCH, len(owners)))
+            conn.execute(
+                insert(Book),
+                [
+                    {
+                        "title": f"Book {i}",
+                        "author": "A",
+                        "copies": 1,
+                        "branch_id": owners[i],
+                    }
+                    for i in chunk
+                ],
+            )
+            conn.execute(
+                insert(Reader),
+                [
+                    {
+                        "name": f"Reader {i}",
+                        "email": f"r{i}@example.com",
+                        "branch_id": owners[i],
+                    }
+                    for i in chunk
+                ],
+            )
+        conn.execute(text("ANALYZE"))
+    return [i for i, owner in enumerate(owners) if owner == 1]
+
+
+def timed(db, stmt, params_list):
+    times = []
+    for params in params_list:
+        started = time.perf_counter()
+        db.execute(stmt, params).all()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--per-branch", type=int, default=10_000)
+    parser.add_argument(
+        "--branches", type=int, nargs="+", default=[1, 10, 100]
+    )
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(5)
+
+    print(f"{args.per_branch} books and readers per branch (ms):")
+    for branches in args.branches:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(
+                f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            )
+            own = seed(engine, branches, args.per_branch, rng)
+            with Session(engine) as db:
+                set_branch(db, 1)
+                ids = db.scalars(select(Book.id).order_by(Book.id)).all()
+                pages = [
+                    {"after_id": rng.choice(ids)} for _ in range(args.lookups)
+                ]
+                page = (
+                    queries.LIVE_BOOKS.where(Book.id > bindparam("after_id"))
+                    .order_by(Book.id)
+                    .limit(PAGE)
+                )
+                count = select(func.count()).select_from(
+                    queries.LIVE_BOOKS.subquery()
+                )
+                emails = [
+                    {"email": f"r{rng.choice(own)}@example.com"}
+                    for _ in range(args.lookups)
+                ]
+                results = (
+                    timed(db, page, pages),
+                    timed(db, count, [{}] * 5),
+                    timed(db, queries.READER_ID_BY_EMAIL, emails),
+                )
+            print(
+                f"  {branches:>4} branches "
+                f"({branches * args.per_branch:>9} rows): "
+                f"page {results[0]:7.3f}, count {results[1]:7.3f}, "
+                f"email {results[2]:7.3f}"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
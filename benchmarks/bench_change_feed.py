@@ -0,0 +1,85 @@
+"""Шина событий под тысячами простаивающих подписчиков в одном воркере.
+
+Каждый подписчик — корутина sse_stream с keep-alive, как у
+GET /events/books. Замеряется память на подписчика и время, за которое
+событие из другого потока доходит до всех подписчиков его топика.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_change_feed --subscribers 5000
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from app.change_feed_app import sse_stream
+from app.events import EventBus
+
+
+async def consume(stream, received, expected, done):
+    async for chunk in stream:
+        if chunk.startswith(b"event:"):
+            received[0] += 1
+            if received[0] == expected:
+                done.set()
+
+
+async def scenario(subscribers, books):
+    bus = EventBus()
+    received = [0]
+    done = asyncio.Event()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    expected = sum(
+        1 for n in range(subscribers) if n % 2 == 0 or n % books == 1
+    )
+    tasks = []
+    for n in range(subscribers):
+        # Половина следит за конкретной книгой, половина — за всеми
+        topic = f"book:{n % books}" if n % 2 else "books"
+        stream = sse_stream(bus.subscribe(topic), heartbeat=15)
+        tasks.append(
+            asyncio.create_task(
+                consume(stream, received, expected, done)
+            )
+        )
+    await asyncio.sleep(0.1)
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / (
+        subscribers
+    )
+    tracemalloc.stop()
+
+    # Событие по book:1 получают все подписчики "books" и свои по book:1
+    started = time.perf_counter()
+    threading.Thread(
+        target=bus.publish,
+        args=(["books", "book:1"], {"action": "borrowed", "book_id": 1}),
+    ).start()
+    await asyncio.wait_for(done.wait(), 30)
+    fan_out = time.perf_counter() - started
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return per_subscriber, fan_out, received[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--books", type=int, default=1000)
+    args = parser.parse_args()
+    per_subscriber, fan_out, delivered = asyncio.run(
+        scenario(args.subscribers, args.books)
+    )
+    print(
+        f"{args.subscribers} subscribers: "
+        f"{per_subscriber / 1024:.1f} KiB each, "
+        f"{delivered} deliveries in {fan_out * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Байты в сети, время до первого байта и RSS сервера для GET /books.
+
+Для каждого режима поднимается отдельный процесс сервера над одной и той же
+временной базой, чтобы пиковая память (VmHWM) не смешивалась между режимами.
+
+Запуск из корня репозитория (только Linux, нужен /proc):
+    python -m benchmarks.bench_compression --rows 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import (
+    auth_headers,
+    seed_books,
+    start_server,
+    stop_server,
+)
+
+MODES = (
+    # (название, FAST_JSON_RESPONSES, Accept-Encoding)
+    ("response_model", "0", "identity"),
+    ("response_model+gzip", "0", "gzip"),
+    ("stream", "1", "identity"),
+    ("stream+gzip", "1", "gzip"),
+    ("stream+br", "1", "br"),
+)
+
+
+def memory_kb(pid, field):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+def run_mode(db_path, fast, encoding):
+    server, base_url = start_server(
+        db_path, ["--workers", "1"], FAST_JSON_RESPONSES=fast
+    )
+    url = f"{base_url}/books"
+    headers = {**auth_headers(), "Accept-Encoding": encoding}
+    try:
+        # Прогрев, чтобы импорты и пул соединений не попали в замер
+        httpx.get(url, headers={**headers, "Accept-Encoding": "identity"})
+        rss_before = memory_kb(server.pid, "VmRSS")
+        started = time.perf_counter()
+        first_byte = None
+        wire_bytes = 0
+        with httpx.stream("GET", url, headers=headers, timeout=None) as resp:
+            for chunk in resp.iter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+                wire_bytes += len(chunk)
+        total = time.perf_counter() - started
+        peak = memory_kb(server.pid, "VmHWM")
+    finally:
+        stop_server(server)
+    return wire_bytes, first_byte, total, peak - rss_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed_books(db_path, args.rows)
+        print(f"GET /books, {args.rows} rows")
+        for name, fast, encoding in MODES:
+            wire, ttfb, total, rss = run_mode(db_path, fast, encoding)
+            print(
+                f"{name:>20}: {wire / 1024:9.0f} KiB on wire, "
+                f"TTFB {ttfb * 1000:7.1f} ms, total {total * 1000:7.1f} ms, "
+                f"peak RSS +{rss / 1024:6.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
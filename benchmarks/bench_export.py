@@ -0,0 +1,75 @@
+"""Время, размер и пиковая память выгрузки книг в разных форматах.
+
+Для сравнения приведён JSON-массив, собранный целиком, как его получают
+аналитики через ``GET /books`` без потоковой отдачи. Пиковая память
+считается tracemalloc (Python-объекты и буферы pyarrow сюда не входят
+полностью, но рост с размером таблицы виден).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_export --rows 200000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, select
+
+from app.export_app import iter_export, pyarrow
+from app.models import Book
+from app.serialization import dumps
+
+from benchmarks.common import seed_books
+
+
+def json_array(conn):
+    rows = conn.execute(select(Book.__table__)).mappings().all()
+    yield dumps([dict(row) for row in rows])
+
+
+def measure(engine, produce):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = 0
+    with engine.connect() as conn:
+        for chunk in produce(conn):
+            size += len(chunk)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    formats = ["csv"] + (["arrow", "parquet"] if pyarrow else [])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.db")
+        seed_books(path, args.rows)
+        engine = create_engine(f"sqlite:///{path}")
+        runs = [("json (целиком)", json_array)] + [
+            (
+                name,
+                lambda conn, name=name: iter_export(
+                    conn, "books", name, chunk_size=args.chunk_size
+                ),
+            )
+            for name in formats
+        ]
+        for label, produce in runs:
+            elapsed, size, peak = measure(engine, produce)
+            print(
+                f"{label:>15}: {elapsed:6.2f} с, {size / 2**20:7.1f} МБ, "
+                f"пик памяти {peak / 2**20:7.1f} МБ"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
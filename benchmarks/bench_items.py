@@ -0,0 +1,110 @@
+"""Экземпляры книг: перенос copies в items и сканирование штрихкода.
+
+Во временной SQLite-базе создаётся ``--books`` книг со случайным числом
+``copies`` (без экземпляров, как до миграции), затем выполняется SQL
+заполнения из миграции ``add items`` одним ``INSERT ... SELECT``.
+После этого замеряется поиск экземпляра по штрихкоду и свободного
+экземпляра книги (запросы ``app.queries``) и печатаются их планы.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_items --books 200000
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, select, text
+
+from app import queries
+from app.models import Base, Book, Item
+
+MIGRATION = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "app",
+    "alembic",
+    "versions",
+    "b2f7c4e81d36_add_items.py",
+)
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("add_items", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed(conn, stmt, params_list):
+    times = []
+    for params in params_list:
+        started = time.perf_counter()
+        conn.execute(stmt, params).all()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1e6
+
+
+def plan(conn, stmt, params):
+    compiled = stmt.compile(conn.engine)
+    values = compiled.construct_params(params)
+    rows = conn.exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {compiled}",
+        tuple(values[name] for name in compiled.positiontup),
+    )
+    return [row[-1] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--books", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+    rng = random.Random(3)
+    migration = load_migration()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                insert(Book),
+                [
+                    {"title": f"Book {i}", "author": "A", "copies": i % 9}
+                    for i in range(args.books)
+                ],
+            )
+            started = time.perf_counter()
+            conn.execute(text(migration.BACKFILL_AVAILABLE))
+            backfill = time.perf_counter() - started
+            items = conn.scalar(select(Item.id).order_by(Item.id.desc()))
+        print(
+            f"backfill: {items} items for {args.books} books "
+            f"in {backfill:.2f} s"
+        )
+
+        with engine.connect() as conn:
+            scans = [
+                {"barcode": f"B{rng.randrange(args.books)}-1"}
+                for _ in range(args.lookups)
+            ]
+            shelves = [
+                {"book_id": rng.randrange(args.books) + 1, "count": 1}
+                for _ in range(args.lookups)
+            ]
+            for name, stmt, params in (
+                ("barcode scan", queries.ITEM_BY_BARCODE, scans),
+                ("available item", queries.AVAILABLE_ITEMS, shelves),
+            ):
+                median = timed(conn, stmt, params)
+                print(f"{name:>15}: {median:7.1f} µs")
+                for step in plan(conn, stmt, params[0]):
+                    print(f"{'':>17}{step}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
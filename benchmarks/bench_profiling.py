@@ -0,0 +1,75 @@
+"""Цена профилирования запросов: задержка GET /books при разной доле выборки.
+
+Для каждого режима поднимается отдельный сервер с ``PROFILE_SAMPLE_RATE``
+(0 — профилирование выключено, 0.01 — как в проде, 1 — каждый запрос)
+и печатаются медиана и p99 задержки и число сохранённых профилей.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_profiling --rows 1000 --requests 500
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import (
+    auth_headers,
+    seed_books,
+    start_server,
+    stop_server,
+)
+
+RATES = ("0", "0.01", "1")
+
+
+def run_rate(db_path, profile_dir, rate, requests):
+    server, base_url = start_server(
+        db_path,
+        ["--workers", "1"],
+        PROFILE_SAMPLE_RATE=rate,
+        PROFILE_DIR=profile_dir,
+    )
+    latencies = []
+    try:
+        with httpx.Client(base_url=base_url, headers=auth_headers()) as client:
+            for _ in range(20):
+                client.get("/books")
+            for _ in range(requests):
+                started = time.perf_counter()
+                client.get("/books")
+                latencies.append(time.perf_counter() - started)
+    finally:
+        stop_server(server)
+    saved = len(os.listdir(profile_dir)) if os.path.isdir(profile_dir) else 0
+    return latencies, saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed_books(db_path, args.rows)
+        print(f"GET /books, {args.rows} rows, {args.requests} requests")
+        for rate in RATES:
+            profile_dir = os.path.join(tmp, f"profiles-{rate}")
+            latencies, saved = run_rate(
+                db_path, profile_dir, rate, args.requests
+            )
+            p50 = statistics.median(latencies) * 1e3
+            p99 = statistics.quantiles(latencies, n=100)[98] * 1e3
+            print(
+                f"sample rate {rate:>5}: p50 {p50:7.2f} ms, "
+                f"p99 {p99:7.2f} ms, profiles saved: {saved}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Накладные расходы Python на запросы выдачи и возврата книги.
+
+Сравниваются запросы, которые строятся заново на каждый вызов
+(``db.query(...).filter(...)``, как было в эндпоинтах), и готовые
+выражения из ``app.queries`` с параметрами. БД в памяти и почти пустая,
+поэтому время — в основном построение выражения, ключ кэша компиляции и
+разбор результата, а не работа SQLite.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_queries --iterations 5000
+"""
+
+import argparse
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import queries
+from app.models import Base, Book, BorrowedBook, Hold, Reader
+
+BOOKS = 100
+
+
+def built_per_call(db, book_id, reader_id):
+    """Запросы выдачи и возврата в прежнем виде."""
+    db.query(Hold).filter(
+        Hold.book_id == book_id,
+        Hold.reader_id == reader_id,
+        Hold.status == "ready",
+    ).first()
+    db.query(BorrowedBook).filter(
+        BorrowedBook.reader_id == reader_id,
+        BorrowedBook.return_date.is_(None),
+    ).count()
+    db.query(BorrowedBook).filter(
+        BorrowedBook.book_id == book_id,
+        BorrowedBook.reader_id == reader_id,
+        BorrowedBook.return_date.is_(None),
+    ).first()
+    db.query(Hold).filter(
+        Hold.book_id == book_id, Hold.status == "waiting"
+    ).order_by(Hold.created_at, Hold.id).limit(1).all()
+
+
+def prepared(db, book_id, reader_id):
+    """Те же запросы из app.queries."""
+    loan = {"book_id": book_id, "reader_id": reader_id}
+    db.scalars(queries.READY_HOLD, loan).first()
+    db.scalar(queries.ACTIVE_LOAN_COUNT, {"reader_id": reader_id})
+    db.scalars(queries.ACTIVE_LOAN, loan).first()
+    db.scalars(
+        queries.WAITING_HOLDS, {"book_id": book_id, "copies": 1}
+    ).all()
+
+
+def measure(db, run, iterations):
+    for n in range(200):
+        run(db, n % BOOKS + 1, n % BOOKS + 1)
+    started = time.perf_counter()
+    for n in range(iterations):
+        run(db, n % BOOKS + 1, n % BOOKS + 1)
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Book),
+            [{"title": f"Book {i}", "author": "A"} for i in range(BOOKS)],
+        )
+        conn.execute(
+            insert(Reader),
+            [
+                {"name": f"Reader {i}", "email": f"r{i}@example.com"}
+                for i in range(BOOKS)
+            ],
+        )
+
+    with Session(engine) as db:
+        results = {
+            name: measure(db, run, args.iterations)
+            for name, run in (
+                ("built per call", built_per_call),
+                ("prepared", prepared),
+            )
+        }
+    for name, seconds in results.items():
+        print(f"{name:>15}: {seconds * 1e6:8.1f} µs на 4 запроса")
+    speedup = results["built per call"] / results["prepared"]
+    print(f"{'':>15}  в {speedup:.1f} раза быстрее")
+
+
+if __name__ == "__main__":
+    main()
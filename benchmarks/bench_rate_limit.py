@@ -0,0 +1,74 @@
+"""Накладные расходы RateLimitMiddleware на один запрос.
+
+Middleware вызывается напрямую поверх пустого ASGI-приложения, так что
+замер не включает HTTP-сервер и роутинг FastAPI.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_rate_limit --requests 100000
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# Ключ подписи обязателен, а config_app читает его при импорте app;
+# серверы бенчмарков получают его через окружение
+os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+
+from app.librarian_db_management_app import create_access_token
+from app.rate_limit import InMemoryBackend, RateLimitMiddleware, SQLiteBackend
+
+LIMITS = {"/librarian/login": (5 / 60, 5), "*": (1e9, 1e9)}
+
+
+async def noop_app(scope, receive, send):
+    pass
+
+
+def make_scope(headers):
+    return {
+        "type": "http",
+        "path": "/books",
+        "headers": headers,
+        "client": ("10.0.0.1", 50000),
+    }
+
+
+async def run(app, scope, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(scope, None, None)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "1"})
+    anonymous = make_scope([])
+    authorized = make_scope(
+        [(b"authorization", f"Bearer {token}".encode("latin-1"))]
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = (
+            ("memory", InMemoryBackend()),
+            ("sqlite", SQLiteBackend(os.path.join(tmp, "limits.db"))),
+        )
+        baseline = asyncio.run(run(noop_app, anonymous, args.requests))
+        print(f"{'no middleware':>22}: {baseline:6.2f} µs/request")
+        for name, backend in backends:
+            app = RateLimitMiddleware(noop_app, backend, LIMITS)
+            for label, scope in (("ip", anonymous), ("jwt", authorized)):
+                cost = asyncio.run(run(app, scope, args.requests))
+                print(
+                    f"{name + ' / ' + label:>22}: {cost:6.2f} µs/request "
+                    f"(+{cost - baseline:.2f})"
+                )
+
+
+if __name__ == "__main__":
+    main()
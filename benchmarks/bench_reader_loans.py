@@ -0,0 +1,115 @@
+"""История выдач одного читателя при росте таблицы borrowed_books.
+
+Во временную SQLite-базу вставляются книги, читатели и ``--loans`` выдач
+(каждая третья не возвращена). Запрос ``GET /readers/{id}/loans``
+выполняется с индексом ``ix_borrowed_books_reader_history`` и без него;
+печатаются медианное время страницы и план запроса.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_reader_loans --loans 1000000
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, text
+
+from app import queries
+from app.models import Base, BorrowedBook, Reader
+from benchmarks.common import seed_books
+
+BATCH = 50_000
+INDEX = "ix_borrowed_books_reader_history"
+
+
+def seed_loans(engine, books, readers, loans, rng):
+    start = datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Reader),
+            [
+                {"name": f"Reader {i}", "email": f"r{i}@example.com"}
+                for i in range(readers)
+            ],
+        )
+        for first in range(0, loans, BATCH):
+            rows = []
+            for i in range(first, min(first + BATCH, loans)):
+                borrowed = start + timedelta(minutes=i)
+                rows.append(
+                    {
+                        "book_id": rng.randrange(books) + 1,
+                        "reader_id": rng.randrange(readers) + 1,
+                        "borrow_date": borrowed,
+                        "return_date": (
+                            None if i % 3 == 0 else borrowed + timedelta(7)
+                        ),
+                    }
+                )
+            conn.execute(insert(BorrowedBook), rows)
+
+
+def measure(engine, statements, reader_ids):
+    times = []
+    with engine.connect() as conn:
+        for reader_id in reader_ids:
+            for stmt in statements:
+                started = time.perf_counter()
+                conn.execute(stmt, {"reader_id": reader_id}).all()
+                times.append(time.perf_counter() - started)
+        sql = statements[0].params(reader_id=reader_ids[0]).compile(
+            engine, compile_kwargs={"literal_binds": True}
+        )
+        plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return statistics.median(times) * 1e3, [row[-1] for row in plan]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--loans", type=int, default=1_000_000)
+    parser.add_argument("--readers", type=int, default=100_000)
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed_books(path, args.books)
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        seed_loans(engine, args.books, args.readers, args.loans, rng)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        print(f"{args.loans} loans, {args.readers} readers")
+
+        statements = [
+            queries.READER_LOANS.where(condition).limit(50)
+            for condition in queries.LOAN_STATUS_FILTERS.values()
+        ]
+        reader_ids = [
+            rng.randrange(args.readers) + 1 for _ in range(args.lookups)
+        ]
+        indexed, plan = measure(engine, statements, reader_ids)
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX {INDEX}"))
+        # Новые соединения: в кэше драйвера остались планы со старой схемой
+        engine.dispose()
+        scan, scan_plan = measure(engine, statements, reader_ids[:5])
+
+        print(f"with {INDEX}: {indexed:8.3f} ms")
+        for step in plan:
+            print(f"    {step}")
+        print(f"without index: {scan:8.3f} ms")
+        for step in scan_plan:
+            print(f"    {step}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
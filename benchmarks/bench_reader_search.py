@@ -0,0 +1,118 @@
+"""Поиск и постраничный список читателей на большой таблице.
+
+Во временную SQLite-базу вставляется ``--rows`` читателей (по умолчанию
+миллион; FTS-индекс имён заполняется триггером при вставке). Сравниваются:
+
+- поиск ``reader_search`` (индекс ``lower(email)`` и FTS5 trigram) и тот
+  же поиск перебором (``lower(name) LIKE '%q%' OR lower(email) LIKE 'q%'``);
+- страница в глубине списка по ключу (``id > after_id``) и через OFFSET.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_reader_search --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, insert, or_
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.models import Base, Reader
+from app.reader_db_management_app import reader_search
+
+PAGE = 50
+BATCH = 50_000
+SYLLABLES = ("al", "bo", "ca", "de", "el", "fi", "go", "ha", "iv", "jo")
+
+
+def fake_name(rng):
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(3)).title()
+        for _ in range(2)
+    )
+
+
+def seed_readers(engine, rows, rng):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, rows, BATCH):
+            conn.execute(
+                insert(Reader),
+                [
+                    {
+                        "name": f"{fake_name(rng)} {i}",
+                        "email": f"reader{i}@example.com",
+                    }
+                    for i in range(start, min(start + BATCH, rows))
+                ],
+            )
+
+
+def naive_search(q):
+    needle = q.lower()
+    return or_(
+        func.lower(Reader.name).contains(needle, autoescape=True),
+        func.lower(Reader.email).startswith(needle, autoescape=True),
+    )
+
+
+def timed(db, stmt, repeats):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        db.scalars(stmt).all()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        started = time.perf_counter()
+        seed_readers(engine, args.rows, rng)
+        print(
+            f"{args.rows} readers seeded in "
+            f"{time.perf_counter() - started:.1f} s"
+        )
+        middle = args.rows // 2
+        searches = (
+            f"reader{middle}",  # начало email
+            f"{middle}",  # подстрока имени
+            fake_name(rng).split()[0].lower(),  # частое слово в именах
+        )
+        with Session(engine) as db:
+            print("search (first page, ms):")
+            for q in searches:
+                page = queries.LIVE_READERS.order_by(Reader.id).limit(PAGE)
+                indexed = timed(
+                    db, page.where(reader_search("sqlite", q)), args.repeats
+                )
+                scan = timed(db, page.where(naive_search(q)), args.repeats)
+                print(
+                    f"  q={q!r:<20} indexed {indexed:8.2f}, "
+                    f"scan {scan:8.2f}"
+                )
+
+            print(f"page of {PAGE} at reader {middle} (ms):")
+            listing = queries.LIVE_READERS.order_by(Reader.id).limit(PAGE)
+            keyset = timed(
+                db, listing.where(Reader.id > middle), args.repeats
+            )
+            offset = timed(db, listing.offset(middle), args.repeats)
+            print(f"  after_id {keyset:8.2f}, offset {offset:8.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Проверка отзыва токена: фильтр Блума в памяти против запроса к БД.
+
+Во временную SQLite-базу записывается ``--revoked`` отозванных токенов,
+список отзывов (``app.tokens.RevocationList``) загружает их в фильтр.
+Для ``--checks`` неотозванных jti замеряется медиана проверки фильтром
+(к БД уходят только ложные совпадения) и поиском по таблице на каждый
+запрос, а также доля ложных совпадений и время загрузки фильтра.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_revocation --revoked 100000
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.config_app import REVOCATION_FILTER_BITS, REVOCATION_FILTER_HASHES
+from app.models import Base, RevokedToken
+from app.tokens import RevocationList
+
+BATCH = 50_000
+
+
+def median_us(check, keys):
+    times = []
+    for key in keys:
+        started = time.perf_counter()
+        check(key)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--revoked", type=int, default=100_000)
+    parser.add_argument("--checks", type=int, default=20_000)
+    parser.add_argument("--bits", type=int, default=REVOCATION_FILTER_BITS)
+    parser.add_argument(
+        "--hashes", type=int, default=REVOCATION_FILTER_HASHES
+    )
+    args = parser.parse_args()
+    expires = datetime.utcnow() + timedelta(days=1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            for start in range(0, args.revoked, BATCH):
+                conn.execute(
+                    insert(RevokedToken),
+                    [
+                        {"jti": uuid.uuid4().hex, "expires_at": expires}
+                        for _ in range(min(BATCH, args.revoked - start))
+                    ],
+                )
+
+        with Session(engine) as db:
+            revocations = RevocationList(args.bits, args.hashes, 0)
+            started = time.perf_counter()
+            revocations.sync(db)
+            loaded = time.perf_counter() - started
+            keys = [uuid.uuid4().hex for _ in range(args.checks)]
+            false_positives = sum(key in revocations.filter for key in keys)
+            in_filter = median_us(
+                lambda key: revocations.is_revoked(db, key), keys
+            )
+            in_db = median_us(
+                lambda key: db.scalar(queries.REVOKED_TOKEN_ID, {"jti": key}),
+                keys,
+            )
+        print(
+            f"{args.revoked} revoked tokens, filter of {args.bits} bits "
+            f"({args.bits // 8 // 1024} KiB), {args.hashes} hashes"
+        )
+        print(f"  load into filter: {loaded * 1e3:8.1f} ms")
+        print(
+            f"  false positives:  {false_positives / args.checks:8.3%} "
+            f"(checked in the database)"
+        )
+        print(f"  filter check:     {in_filter:8.2f} µs")
+        print(f"  database lookup:  {in_db:8.2f} µs")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
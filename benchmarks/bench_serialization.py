@@ -0,0 +1,98 @@
+"""Сравнение стоимости сериализации списка книг на одну строку.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_serialization --rows 10000
+"""
+
+import argparse
+import json
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base, Book
+from app.schemas import BookOut
+from app.serialization import dumps, rows_to_dicts, schema_columns
+
+books_adapter = TypeAdapter(List[BookOut])
+
+
+def response_model_path(session):
+    # То же, что делает FastAPI: ORM -> from_attributes -> json.dumps
+    books = session.query(Book).all()
+    validated = books_adapter.validate_python(books, from_attributes=True)
+    content = books_adapter.dump_python(validated, mode="json")
+    body = json.dumps(content, ensure_ascii=False, separators=(",", ":"))
+    session.expunge_all()
+    return body.encode("utf-8")
+
+
+def type_adapter_path(session):
+    rows = session.execute(select(*schema_columns(BookOut, Book)))
+    return books_adapter.dump_json(
+        books_adapter.validate_python(rows_to_dicts(rows, BookOut))
+    )
+
+
+def fast_path(session):
+    rows = session.execute(select(*schema_columns(BookOut, Book)))
+    return dumps(rows_to_dicts(rows, BookOut))
+
+
+def measure(func, session, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func(session)
+        best = min(best, time.perf_counter() - started)
+    return best, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Book),
+            [
+                {
+                    "title": f"Book {i}",
+                    "author": f"Author {i % 500}",
+                    "year": 1900 + i % 120,
+                    "isbn": f"isbn-{i}",
+                    "copies": i % 7,
+                    "genre": "Fiction",
+                }
+                for i in range(args.rows)
+            ],
+        )
+
+    with Session(engine) as session:
+        for name, func in (
+            ("response_model", response_model_path),
+            ("type_adapter", type_adapter_path),
+            ("fast (orjson)", fast_path),
+        ):
+            best, size = measure(func, session, args.repeat)
+            per_row = best / args.rows * 1e6
+            print(
+                f"{name:>15}: {best * 1000:8.1f} ms, "
+                f"{per_row:6.2f} µs/row, {size} bytes"
+            )
+
+
+if __name__ == "__main__":
+    main()
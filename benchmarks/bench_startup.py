@@ -0,0 +1,102 @@
+"""Время холодного старта: импорт приложения и прогрев в lifespan.
+
+Каждый замер — отдельный процесс ``python -c "import app.main"``:
+печатается медиана времени импорта и прогрева (``warm_up``: маппинги
+SQLAlchemy и пул соединений), а по одному прогону с ``-X importtime`` —
+самые дорогие модули. Модули из ``DEFERRED`` (криптография, pyarrow)
+при старте загружаться не должны.
+
+Для регрессии в CI: ``--budget-ms`` — код возврата 1, если медиана
+импорта больше бюджета или загрузился отложенный модуль.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_startup --runs 10 --budget-ms 1500
+"""
+
+import argparse
+from collections import Counter
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Нужны только при входе, проверке токена или выгрузке в Arrow/Parquet
+DEFERRED = ("jose", "passlib", "pyarrow", "cryptography", "ecdsa", "rsa")
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from app.database import warm_up
+warm_up(connections=1)
+warmed = time.perf_counter()
+loaded = [name for name in {deferred!r} if name in sys.modules]
+print(imported - started, warmed - imported, ",".join(loaded))
+"""
+
+
+def run_probe(env):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(deferred=DEFERRED)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    imported, warmed = float(output[0]), float(output[1])
+    loaded = output[2].split(",") if len(output) > 2 else []
+    return imported, warmed, loaded
+
+
+def heaviest_packages(env, top):
+    """Собственное время импорта по пакетам верхнего уровня."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    totals = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        totals[name.strip().split(".")[0]] += int(self_us)
+    return totals.most_common(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--budget-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+        )
+        probes = [run_probe(env) for _ in range(args.runs)]
+        packages = heaviest_packages(env, args.top)
+
+    imported = statistics.median(probe[0] for probe in probes) * 1e3
+    warmed = statistics.median(probe[1] for probe in probes) * 1e3
+    loaded = sorted({name for probe in probes for name in probe[2]})
+    print(f"import app.main: {imported:7.1f} мс (медиана из {args.runs})")
+    print(f"warm_up:         {warmed:7.1f} мс")
+    print("Собственное время импорта по пакетам:")
+    for name, self_us in packages:
+        print(f"  {name:<24} {self_us / 1e3:7.1f} мс")
+    if loaded:
+        print(f"Отложенные модули загружены при старте: {', '.join(loaded)}")
+
+    if args.budget_ms and (imported > args.budget_ms or loaded):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Рост пропускной способности с числом воркеров.
+
+Сервер запускается через app.server_app с разным --workers, нагрузку дают
+несколько клиентских процессов (GET /books/{id} с авторизацией),
+результат — запросов в секунду.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_workers --workers 1 2 4 --duration 10
+"""
+
+import argparse
+import asyncio
+from multiprocessing import Pool
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import (
+    auth_headers,
+    seed_books,
+    start_server,
+    stop_server,
+)
+
+BOOKS = 10_000
+
+
+async def _load(base_url, headers, duration, concurrency):
+    done = 0
+    deadline = time.perf_counter() + duration
+
+    async def user(client):
+        nonlocal done
+        while time.perf_counter() < deadline:
+            book_id = random.randint(1, BOOKS)
+            response = await client.get(f"/books/{book_id}")
+            response.raise_for_status()
+            done += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=30
+    ) as client:
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+    return done
+
+
+def client_process(args):
+    return asyncio.run(_load(*args))
+
+
+def measure(db_path, workers, clients, concurrency, duration):
+    server, base_url = start_server(db_path, ["--workers", str(workers)])
+    try:
+        # Прогрев: импорт приложения и пулы соединений в каждом воркере
+        client_process((base_url, auth_headers(), 1, 4))
+        with Pool(clients) as pool:
+            counts = pool.map(
+                client_process,
+                [(base_url, auth_headers(), duration, concurrency)] * clients,
+            )
+    finally:
+        stop_server(server)
+    return sum(counts) / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed_books(db_path, BOOKS)
+        baseline = None
+        for workers in args.workers:
+            rps = measure(
+                db_path,
+                workers,
+                args.clients,
+                args.concurrency,
+                args.duration,
+            )
+            baseline = baseline or rps
+            print(
+                f"workers={workers:<3} {rps:8.0f} req/s "
+                f"(x{rps / baseline:.2f})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Общие помощники для бенчмарков: наполнение временной БД и запуск сервера."""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy import create_engine, insert
+
+# Ключ подписи обязателен, а config_app читает его при импорте app;
+# серверы бенчмарков получают его через окружение
+os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+
+from app.librarian_db_management_app import create_access_token
+from app.models import Base, Book, Item, User, item_rows
+
+
+def seed_books(path, rows):
+    """Создаёт схему, одного библиотекаря (id=1) и ``rows`` книг.
+
+    У каждой книги столько экземпляров (items), сколько у неё ``copies``.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User), [{"email": "bench@example.com", "password_hash": ""}]
+        )
+        conn.execute(
+            insert(Book),
+            [
+                {
+                    "title": f"Book {i}",
+                    "author": f"Author {i % 500}",
+                    "year": 1900 + i % 120,
+                    "isbn": f"isbn-{i}",
+                    "copies": i % 7,
+                    "genre": "Fiction",
+                }
+                for i in range(rows)
+            ],
+        )
+        conn.execute(
+            insert(Item),
+            [row for i in range(rows) for row in item_rows(i + 1, i % 7)],
+        )
+    engine.dispose()
+
+
+def auth_headers():
+    token = create_access_token({"sub": "1"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path, args=(), **env):
+    """Запускает сервер над ``db_path``; возвращает (процесс, базовый URL)."""
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "app.server_app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            *args,
+        ],
+        env=dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{db_path}",
+            RATE_LIMIT_ENABLED="0",
+            **env,
+        ),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            httpx.get(f"{base_url}/docs")
+            break
+        except httpx.TransportError:
+            time.sleep(0.1)
+    return server, base_url
+
+
+def stop_server(server):
+    server.terminate()
+    server.wait()
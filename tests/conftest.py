@@ -1,43 +1,112 @@
+import os
+import sqlite3
+
+# Без ключа подписи приложение не стартует; config_app читает его при
+# импорте, поэтому ключ задаётся до импорта app
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
 from fastapi.testclient import TestClient
-from passlib.hash import bcrypt
 import pytest
-
-# Фикстура для создания тестовой БД в памяти и добавления первого пользователя
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.dialects import registry
+from sqlalchemy.dialects.sqlite.pysqlite import SQLiteDialect_pysqlite
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
-from app.database import get_db
-from app.main import app
-from app.models import Base, User
-
-
-@pytest.fixture(scope="module")
-def db_engine():
-    print("\n=== Запуск фикстуры db_engine ===")
-    engine = create_engine("sqlite:///test.db")
-    try:
-        Base.metadata.create_all(engine)
-    except Exception as e:
-        print("Ошибка при создании таблиц:", repr(e))
-        raise
-    print("Таблицы созданы:", Base.metadata.tables.keys())
-    inspector = inspect(engine)
-    print("Таблицы в БД:", inspector.get_table_names())
-
-    # Добавляем первого пользователя
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    password_hash = bcrypt.hash("qwe123")
-    session.add(
-        User(email="first_librarian@library.com", password_hash=password_hash)
+from app.audit import AuditWriter
+from app.database import get_db, make_engine
+from app.idempotency import IdempotencyStore
+from app.main import app, rate_limit_backend
+from app.models import AuditEntry, Base, IdempotencyKey, User
+
+# bcrypt("qwe123") с 4 раундами: хэш не считается при каждом запуске,
+# а вход в тестах проверяет его за доли миллисекунды
+LIBRARIAN_EMAIL = "first_librarian@library.com"
+LIBRARIAN_PASSWORD_HASH = (
+    "$2b$04$qyJicuCsmSDtktGRVniZIeADkRrl30zpJ8OURdnxm7qfiDa//GkYC"
+)
+
+
+class SavepointDialect(SQLiteDialect_pysqlite):
+    """pysqlite, у которого транзакции — точки сохранения.
+
+    Фикстура ``db_engine`` открывает на время теста внешнюю транзакцию,
+    поэтому commit сессий и ``engine.begin()`` только освобождает точку
+    сохранения, а после теста всё откатывается.
+    """
+
+    supports_statement_cache = True
+
+    def do_begin(self, dbapi_connection):
+        dbapi_connection.cursor().execute("SAVEPOINT app")
+
+    def do_commit(self, dbapi_connection):
+        dbapi_connection.cursor().execute("RELEASE app")
+
+    def do_rollback(self, dbapi_connection):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("ROLLBACK TO app")
+        except sqlite3.OperationalError:
+            # Откат без открытой точки сохранения (первое подключение)
+            return
+        cursor.execute("RELEASE app")
+
+
+registry.register("sqlite.savepoint", __name__, "SavepointDialect")
+
+
+def side_engine(path, *tables):
+    """Отдельная файловая БД с таблицами ``tables``."""
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=tables)
+    return engine
+
+
+# Одна БД в памяти на процесс: файлов нет, и воркеры pytest-xdist
+# не мешают друг другу
+@pytest.fixture(scope="session")
+def shared_engine():
+    engine = create_engine(
+        "sqlite+savepoint://",
+        poolclass=StaticPool,
+        pool_reset_on_return=None,
+        connect_args={"check_same_thread": False},
     )
-    session.commit()
-    session.close()
 
+    @event.listens_for(engine, "connect")
+    def _manual_transactions(dbapi_connection, connection_record):
+        # BEGIN/COMMIT выдаёт только SavepointDialect и фикстура теста
+        dbapi_connection.isolation_level = None
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            {
+                "email": LIBRARIAN_EMAIL,
+                "password_hash": LIBRARIAN_PASSWORD_HASH,
+                "is_admin": True,
+            },
+        )
     yield engine
+    engine.dispose()
+
+
+# Движок БД теста: всё, что тест записал, откатывается после него
+@pytest.fixture
+def db_engine(shared_engine):
+    connection = shared_engine.raw_connection()
+    connection.cursor().execute("BEGIN")
+    yield shared_engine
+    connection.cursor().execute("ROLLBACK")
+    connection.close()
+
 
-    print("\n=== Завершение фикстуры db_engine ===")
-    Base.metadata.drop_all(engine)
+# Тесты логинятся чаще, чем разрешает лимит на /librarian/login
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    rate_limit_backend.clear()
 
 
 # Фикстура для тестовой сессии БД
@@ -51,7 +120,7 @@ def db_session(db_engine):
 
 # Фикстура для тестового клиента FastAPI с переопределением get_db
 @pytest.fixture
-def client(db_engine):
+def client(db_engine, tmp_path):
     def override_get_db():
         try:
             Session = sessionmaker(bind=db_engine)
@@ -60,8 +129,24 @@ def client(db_engine):
         finally:
             session.close()
 
+    # Журнал и ключи идемпотентности пишутся своими транзакциями, в том
+    # числе из разных потоков, а у db_engine одна транзакция теста на
+    # всех, поэтому им нужны отдельные БД (как при AUDIT_DATABASE_URL)
+    audit_engine = side_engine(tmp_path / "audit.db", AuditEntry.__table__)
+    idempotency_engine = side_engine(
+        tmp_path / "idempotency.db", IdempotencyKey.__table__
+    )
+    state = app.state.idempotency_store, app.state.audit_log
     app.dependency_overrides[get_db] = override_get_db
-    return TestClient(app)
+    app.state.idempotency_store = IdempotencyStore(idempotency_engine)
+    app.state.audit_log = AuditWriter(audit_engine)
+    yield TestClient(app)
+    # Другие тесты запускают lifespan приложения, и он не должен
+    # останавливать журнал или закрывать движки теста
+    app.dependency_overrides.pop(get_db, None)
+    app.state.idempotency_store, app.state.audit_log = state
+    audit_engine.dispose()
+    idempotency_engine.dispose()
 
 
 # Фикстура для авторизованного клиента
@@ -70,7 +155,7 @@ def auth_client(client):
     response = client.post(
         "/librarian/login",
         data={
-            "username": "first_librarian@library.com",
+            "username": LIBRARIAN_EMAIL,
             "password": "qwe123",
         },
     )
@@ -67,7 +67,13 @@ def test_full_workflow(auth_client, db_session):
     assert updated_book["year"] == update_data["year"]
     assert updated_book["copies"] == update_data["copies"]
 
-    # 8. Удаление книги
+    # 8. Книгу на руках удалить нельзя; после возврата — можно
+    response = auth_client.delete(f"/books/{book_id}")
+    assert response.status_code == 409
+    response = auth_client.post(
+        "/borrow/return", json={"book_id": book_id, "reader_id": reader_id}
+    )
+    assert response.status_code == 200
     response = auth_client.delete(f"/books/{book_id}")
     assert response.status_code == 204
 
@@ -200,3 +206,36 @@ def test_update_reader_email_conflict(auth_client, db_session):
     )
     assert response.status_code == 409
     assert response.json()["detail"] == "Email already in use"
+
+    # Читатель не изменился, а свой же email конфликтом не считается
+    db_session.refresh(reader2)
+    assert reader2.email == "two@example.com"
+    response = auth_client.put(
+        f"/readers/{reader2.id}", json={"email": "two@example.com"}
+    )
+    assert response.status_code == 200
+
+
+def test_duplicate_isbn_conflicts(auth_client, db_session):
+    payload = {"title": "First", "author": "Author", "isbn": "dup-1"}
+    assert auth_client.post("/books", json=payload).status_code == 200
+    response = auth_client.post("/books", json={**payload, "title": "Copy"})
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Book with this ISBN already exists"
+
+    other = auth_client.post(
+        "/books", json={"title": "Other", "author": "Author", "isbn": "dup-2"}
+    ).json()
+    response = auth_client.patch(
+        f"/books/{other['id']}", json={"isbn": "dup-1"}
+    )
+    assert response.status_code == 409
+    assert response.json()["detail"] == "ISBN already in use"
+    assert auth_client.get(f"/books/{other['id']}").json()["isbn"] == "dup-2"
+
+
+def test_register_duplicate_librarian(auth_client):
+    payload = {"email": "first_librarian@library.com", "password": "x"}
+    response = auth_client.post("/librarian/register", json=payload)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "User with this email already exists"
@@ -0,0 +1,144 @@
+from datetime import datetime
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.exc import DatabaseError
+
+from app.audit import AuditWriter, diff
+from app.models import AUDIT_LOG_TRIGGERS, AuditEntry, User
+
+
+def test_diff_keeps_only_changed_fields():
+    moment = datetime(2024, 1, 2, 3, 4, 5)
+    assert diff({"a": 1, "b": 2}, {"a": 1, "b": 3}) == {"b": [2, 3]}
+    assert diff(None, {"at": moment}) == {"at": [None, moment.isoformat()]}
+    assert diff({"a": 1}, None) == {"a": [1, None]}
+
+
+@pytest.fixture
+def audit_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_writer_flushes_buffer_in_one_batch(audit_engine):
+    writer = AuditWriter(audit_engine, batch_size=100, flush_interval=60)
+    AuditEntry.__table__.create(audit_engine)
+    inserts = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.startswith("INSERT"):
+            inserts.append(statement)
+
+    event.listen(audit_engine, "before_cursor_execute", record)
+    for entity_id in range(3):
+        writer.record(1, "create", "book", entity_id, None, {"n": entity_id})
+    assert writer.pending() == 3
+
+    assert writer.flush() == 3
+    assert writer.pending() == 0
+    assert len(inserts) == 1
+    with audit_engine.connect() as conn:
+        rows = conn.execute(text("SELECT entity_id FROM audit_log")).all()
+    assert [row[0] for row in rows] == [0, 1, 2]
+
+
+def test_background_writer_and_append_only_table(audit_engine):
+    writer = AuditWriter(audit_engine, batch_size=1, flush_interval=60)
+    writer.start()
+    try:
+        writer.record(1, "create", "reader", 7, None, {"name": "A"})
+        deadline = time.monotonic() + 5
+        while writer.pending() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.pending() == 0
+    finally:
+        writer.stop()
+
+    with audit_engine.begin() as conn:
+        assert conn.execute(text("SELECT count(*) FROM audit_log")).scalar()
+    with pytest.raises(DatabaseError, match="append-only"):
+        with audit_engine.begin() as conn:
+            conn.execute(text("DELETE FROM audit_log"))
+
+
+def test_writer_upgrades_old_audit_file(audit_engine, tmp_path):
+    with audit_engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE audit_log (id INTEGER PRIMARY KEY, "
+                "created_at DATETIME NOT NULL, actor_id INTEGER, "
+                "action VARCHAR NOT NULL, entity VARCHAR NOT NULL, "
+                "entity_id INTEGER, diff JSON NOT NULL)"
+            )
+        )
+        for trigger in AUDIT_LOG_TRIGGERS:
+            conn.execute(text(trigger))
+        conn.execute(
+            text(
+                "INSERT INTO audit_log VALUES "
+                "(1, '2026-01-01', 5, 'create', 'book', 1, '{}')"
+            )
+        )
+    users_engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    User.__table__.create(users_engine)
+    with users_engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            {
+                "id": 5,
+                "email": "north@library.com",
+                "password_hash": "-",
+                "branch_id": 3,
+            },
+        )
+    writer = AuditWriter(audit_engine, batch_size=100, flush_interval=60)
+    writer.start(users_engine)
+    writer.record(1, "create", "book", 2, None, {"n": 1}, branch_id=2)
+    writer.stop()
+    users_engine.dispose()
+    with audit_engine.connect() as conn:
+        branches = conn.scalars(
+            text("SELECT branch_id FROM audit_log ORDER BY id")
+        ).all()
+        assert branches == [3, 2]
+        names = conn.scalars(
+            text(
+                "SELECT name FROM sqlite_master "
+                "WHERE name IN ('ix_audit_log_branch', 'audit_log_no_update')"
+            )
+        ).all()
+        assert sorted(names) == ["audit_log_no_update", "ix_audit_log_branch"]
+    with pytest.raises(DatabaseError, match="append-only"):
+        with audit_engine.begin() as conn:
+            conn.execute(text("UPDATE audit_log SET branch_id = 1"))
+
+
+def test_mutations_are_exported(auth_client):
+    book_id = auth_client.post(
+        "/books", json={"title": "Audited", "author": "A", "copies": 2}
+    ).json()["id"]
+    auth_client.patch(f"/books/{book_id}", json={"copies": 3})
+    auth_client.delete(f"/books/{book_id}")
+
+    response = auth_client.get(
+        "/audit", params={"entity": "book", "entity_id": book_id}
+    )
+    assert response.status_code == 200
+    entries = response.json()
+    assert [entry["action"] for entry in entries] == [
+        "create",
+        "update",
+        "delete",
+    ]
+    assert all(entry["actor_id"] is not None for entry in entries)
+    assert entries[0]["diff"]["title"] == [None, "Audited"]
+    assert entries[1]["diff"] == {"copies": [2, 3]}
+    assert entries[2]["diff"]["deleted_at"][0] is None
+
+    since = auth_client.get(
+        "/audit", params={"since_id": entries[1]["id"], "entity": "book"}
+    ).json()
+    assert [entry["id"] for entry in since][0] == entries[2]["id"]
@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from fastapi import HTTPException
 from jose import jwt
 import pytest
@@ -5,6 +7,7 @@ import pytest
 from app.config_app import ALGORITHM, SECRET_KEY
 from app.dependencies import get_current_user
 from app.models import User
+from app.tokens import issue_token
 
 
 def test_register(auth_client):
@@ -29,7 +32,7 @@ def test_unauthenticated_access(client):
 
 
 def create_token(sub_value: str) -> str:
-    return jwt.encode({"sub": sub_value}, SECRET_KEY, algorithm=ALGORITHM)
+    return issue_token({"sub": sub_value}, "access", timedelta(minutes=5))
 
 
 def test_get_current_user_success(db_session):
@@ -93,6 +96,18 @@ def test_get_current_user_invalid_token(db_session):
     assert exc_info.value.status_code == 401
 
 
+def test_get_current_user_rejects_token_without_jti(db_session):
+    user = User(email="legacy@example.com", password_hash="fakehashedpassword")
+    db_session.add(user)
+    db_session.commit()
+
+    # Так выглядели недельные токены до появления отзыва
+    token = jwt.encode({"sub": str(user.id)}, SECRET_KEY, algorithm=ALGORITHM)
+    with pytest.raises(HTTPException) as exc_info:
+        get_current_user(db=db_session, token=token)
+    assert exc_info.value.status_code == 401
+
+
 def test_get_current_user_not_found(db_session):
     token = create_token("999999")  # Предположим, такого пользователя нет
     with pytest.raises(HTTPException) as exc_info:
@@ -0,0 +1,83 @@
+import gzip
+import sqlite3
+
+import pytest
+from sqlalchemy import insert
+
+from app import backup_app
+from app.backup_app import BackupError, backup, restore, verify
+from app.database import make_engine
+from app.models import Base, Book, User
+
+
+@pytest.fixture
+def library_db(tmp_path):
+    """Файловая БД в режиме WAL с несколькими книгами."""
+    path = tmp_path / "library.db"
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "a@x.io", "password_hash": ""}])
+        conn.execute(
+            insert(Book),
+            [{"title": f"Book {i}", "author": "A"} for i in range(50)],
+        )
+    yield path
+    engine.dispose()
+
+
+def add_book(path, title):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(
+            "INSERT INTO books (title, author, copies, version) "
+            "VALUES (?, 'A', 1, 1)",
+            (title,),
+        )
+    conn.close()
+
+
+def test_backup_is_verified_and_rotated(library_db, tmp_path):
+    backups = tmp_path / "backups"
+    paths = [
+        backup(library_db, backups, compress=compress, pages=1, keep=2)
+        for compress in (False, True, True)
+    ]
+    assert [path.exists() for path in paths] == [False, True, True]
+    assert paths[-1].name.endswith(".db.gz")
+    assert not list(backups.glob("*.part"))
+
+    restored = tmp_path / "check.db"
+    restored.write_bytes(gzip.decompress(paths[-1].read_bytes()))
+    assert verify(restored)["books"] == 50
+
+
+def test_restore_replaces_data_and_checks_counts(library_db, tmp_path):
+    copy = backup(library_db, tmp_path / "backups", pages=0)
+    add_book(library_db, "Written after backup")
+    assert verify(library_db)["books"] == 51
+
+    counts = restore(copy, library_db)
+
+    assert counts["books"] == 50
+    assert verify(library_db) == counts
+
+
+def test_restore_rejects_broken_backup(library_db, tmp_path):
+    broken = tmp_path / "library-broken.db.gz"
+    broken.write_bytes(gzip.compress(b"not a database" * 100))
+    with pytest.raises(BackupError):
+        restore(broken, library_db)
+    assert verify(library_db)["books"] == 50
+
+
+def test_command_uses_configured_database(monkeypatch, library_db, tmp_path):
+    monkeypatch.setattr(
+        backup_app, "engine", make_engine(f"sqlite:///{library_db}")
+    )
+    backups = tmp_path / "backups"
+    backup_app.main(["backup", "--dir", str(backups), "--compress"])
+    (copy,) = backups.glob("library-*.db.gz")
+    add_book(library_db, "Lost on restore")
+    backup_app.main(["restore", str(copy)])
+    assert verify(library_db)["books"] == 50
@@ -0,0 +1,173 @@
+import pytest
+from sqlalchemy import select
+
+from app.models import Branch, Hold, User
+
+MAIN_EMAIL = "first_librarian@library.com"
+NORTH_EMAIL = "north@library.com"
+
+
+@pytest.fixture
+def north(auth_client, db_session):
+    """Заголовки библиотекаря второго филиала (пароль как у первого)."""
+    password_hash = db_session.scalar(
+        select(User.password_hash).where(User.email == MAIN_EMAIL)
+    )
+    branch = Branch(name="North")
+    db_session.add(branch)
+    db_session.flush()
+    db_session.add(
+        User(
+            email=NORTH_EMAIL, password_hash=password_hash, branch_id=branch.id
+        )
+    )
+    db_session.commit()
+    response = auth_client.post(
+        "/librarian/login",
+        data={"username": NORTH_EMAIL, "password": "qwe123"},
+    )
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def add_book(client, headers=None, **fields):
+    payload = {"title": "Shared", "author": "Author", **fields}
+    response = client.post("/books", json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_branches_do_not_see_each_other(auth_client, north):
+    book_id = add_book(auth_client)
+    titles = [b["title"] for b in auth_client.get("/books").json()]
+    assert "Shared" in titles
+    north_titles = [
+        b["title"] for b in auth_client.get("/books", headers=north).json()
+    ]
+    assert "Shared" not in north_titles
+    response = auth_client.get(f"/books/{book_id}", headers=north)
+    assert response.status_code == 404
+    response = auth_client.patch(
+        f"/books/{book_id}", json={"copies": 0}, headers=north
+    )
+    assert response.status_code == 404
+    assert auth_client.get(f"/books/{book_id}").json()["copies"] == 1
+
+
+def test_reader_email_is_unique_per_branch(auth_client, north):
+    payload = {"name": "Twin", "email": "twin@example.com"}
+    assert auth_client.post("/readers", json=payload).status_code == 201
+    assert auth_client.post("/readers", json=payload).status_code == 409
+    response = auth_client.post("/readers", json=payload, headers=north)
+    assert response.status_code == 201
+    names = [r["name"] for r in auth_client.get("/readers").json()]
+    assert names.count("Twin") == 1
+
+
+def test_cannot_lend_to_reader_of_another_branch(auth_client, north):
+    book_id = add_book(auth_client)
+    reader = auth_client.post(
+        "/readers",
+        json={"name": "Far", "email": "far@example.com"},
+        headers=north,
+    ).json()
+    response = auth_client.post(
+        "/borrow", json={"book_id": book_id, "reader_id": reader["id"]}
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Reader not found"
+
+
+def test_holds_of_another_branch_are_hidden(auth_client, db_session, north):
+    book_id = add_book(auth_client, copies=0)
+    reader = auth_client.post(
+        "/readers", json={"name": "Waiting", "email": "waiting@example.com"}
+    ).json()
+    hold_id = auth_client.post(
+        "/holds", json={"book_id": book_id, "reader_id": reader["id"]}
+    ).json()["id"]
+    db_session.get(Hold, hold_id).status = "ready"
+    db_session.commit()
+
+    for path in (f"/holds/{hold_id}", f"/holds/{hold_id}/wait?timeout=0"):
+        assert auth_client.get(path, headers=north).status_code == 404
+    response = auth_client.delete(f"/holds/{hold_id}", headers=north)
+    assert response.status_code == 404
+    assert auth_client.get(f"/holds/{hold_id}").json()["status"] == "ready"
+    assert auth_client.delete(f"/holds/{hold_id}").status_code == 204
+    assert auth_client.get(f"/books/{book_id}").json()["copies"] == 1
+
+
+def test_audit_log_contains_only_own_branch(auth_client, north):
+    auth_client.post(
+        "/readers", json={"name": "Private", "email": "private@example.com"}
+    )
+    add_book(auth_client, headers=north, title="Theirs")
+    mine = auth_client.get("/audit").json()
+    theirs = auth_client.get("/audit", headers=north).json()
+    assert [e["entity"] for e in mine] == ["reader"]
+    assert [e["entity"] for e in theirs] == ["book"]
+    assert "private@example.com" not in str(theirs)
+
+
+def test_availability_across_branches(auth_client, north):
+    book_id = add_book(auth_client, isbn="978-1", copies=2)
+    add_book(auth_client, headers=north, isbn="978-1", copies=5)
+    add_book(auth_client, headers=north, isbn="978-2", copies=7)
+    response = auth_client.get(f"/books/{book_id}/availability")
+    assert response.status_code == 200
+    assert [(b["branch_name"], b["copies"]) for b in response.json()] == [
+        ("Main", 2),
+        ("North", 5),
+    ]
+
+
+def test_branch_management(auth_client):
+    response = auth_client.post("/branches", json={"name": "South"})
+    assert response.status_code == 201
+    response = auth_client.post("/branches", json={"name": "South"})
+    assert response.status_code == 409
+    names = [b["name"] for b in auth_client.get("/branches").json()]
+    assert names[0] == "Main" and "South" in names
+    response = auth_client.post(
+        "/librarian/register",
+        json={"email": "lost@library.com", "password": "x", "branch_id": 999},
+    )
+    assert response.status_code == 404
+
+
+def test_only_admin_works_across_branches(auth_client, db_session, north):
+    north_id = db_session.scalar(
+        select(Branch.id).where(Branch.name == "North")
+    )
+    spy = {"email": "spy@library.com", "password": "x", "branch_id": 1}
+    response = auth_client.post("/librarian/register", json=spy, headers=north)
+    assert response.status_code == 403
+    response = auth_client.post(
+        "/branches", json={"name": "Rogue"}, headers=north
+    )
+    assert response.status_code == 403
+    # В свой филиал библиотекарь регистрирует, администратор — в любой
+    colleague = {"email": "colleague@library.com", "password": "x"}
+    response = auth_client.post(
+        "/librarian/register", json=colleague, headers=north
+    )
+    assert response.status_code == 200
+    spy["branch_id"] = north_id
+    assert auth_client.post("/librarian/register", json=spy).status_code == 200
+    branches = db_session.execute(
+        select(User.email, User.branch_id).where(
+            User.email.in_(["spy@library.com", "colleague@library.com"])
+        )
+    ).all()
+    assert sorted(branches) == [
+        ("colleague@library.com", north_id),
+        ("spy@library.com", north_id),
+    ]
+
+
+def test_export_contains_only_own_branch(auth_client, north):
+    add_book(auth_client, title="Mine")
+    add_book(auth_client, headers=north, title="Theirs")
+    body = auth_client.get("/export/books").text
+    assert "Mine" in body and "Theirs" not in body
@@ -0,0 +1,95 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+import pytest
+
+from app.compression import CompressionMiddleware, choose_encoding
+
+BODY = "library " * 500
+
+
+@pytest.fixture
+def compressed_client():
+    demo = FastAPI()
+    demo.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @demo.get("/large")
+    def large():
+        return PlainTextResponse(BODY)
+
+    @demo.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @demo.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"[", b'"a"', b",", b'"b"', b"]"]))
+
+    @demo.get("/events")
+    def events():
+        return StreamingResponse(
+            iter([b"data: " + BODY.encode() + b"\n\n"]),
+            media_type="text/event-stream",
+        )
+
+    return TestClient(demo)
+
+
+def test_large_response_is_gzipped(compressed_client):
+    response = compressed_client.get(
+        "/large", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.text == BODY
+
+
+def test_small_response_is_not_compressed(compressed_client):
+    response = compressed_client.get(
+        "/small", headers={"Accept-Encoding": "gzip"}
+    )
+    assert "content-encoding" not in response.headers
+    assert response.text == "tiny"
+
+
+def test_identity_when_not_accepted(compressed_client):
+    response = compressed_client.get(
+        "/large", headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in response.headers
+
+
+def test_streaming_response_is_compressed(compressed_client):
+    with compressed_client.stream(
+        "GET", "/stream", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == b'["a","b"]'
+
+
+def test_event_stream_is_not_compressed(compressed_client):
+    response = compressed_client.get(
+        "/events", headers={"Accept-Encoding": "gzip"}
+    )
+    assert "content-encoding" not in response.headers
+    assert response.text == f"data: {BODY}\n\n"
+
+
+def test_brotli_preferred_when_available(compressed_client):
+    pytest.importorskip("brotli")
+    response = compressed_client.get(
+        "/large", headers={"Accept-Encoding": "gzip, br"}
+    )
+    assert response.headers["content-encoding"] == "br"
+    assert response.text == BODY
+
+
+def test_choose_encoding_respects_quality():
+    assert choose_encoding("gzip;q=1.0, br;q=0") == "gzip"
+    assert choose_encoding("br;q=0, gzip;q=0") is None
+    assert choose_encoding("") is None
+    assert choose_encoding("*") in ("br", "gzip")
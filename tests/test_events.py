@@ -0,0 +1,128 @@
+import asyncio
+import threading
+
+import pytest
+
+from app import events
+from app.change_feed_app import feed_topics, sse_stream
+from app.events import EventBus, book_change
+from app.models import Book, Reader
+
+
+def test_publish_reaches_only_matching_topics():
+    async def scenario():
+        bus = EventBus()
+        by_book = bus.subscribe("book:1")
+        by_genre = bus.subscribe("genre:Poetry", "book:1")
+        other = bus.subscribe("book:2")
+        bus.publish(["books", "book:1", "genre:Poetry"], {"n": 1})
+        # Подписчик на два совпавших топика получает событие один раз
+        assert await by_book.get(1) == {"n": 1}
+        assert await by_genre.get(1) == {"n": 1}
+        assert await by_genre.get(0.05) is None
+        assert await other.get(0.05) is None
+        for subscription in (by_book, by_genre, other):
+            subscription.close()
+        assert bus.subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_publish_from_worker_thread():
+    async def scenario():
+        bus = EventBus()
+        with bus.subscribe("books") as subscription:
+            thread = threading.Thread(
+                target=bus.publish, args=(["books"], {"n": 1})
+            )
+            thread.start()
+            assert await subscription.get(1) == {"n": 1}
+            thread.join()
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_drops_oldest_events():
+    async def scenario():
+        bus = EventBus()
+        with bus.subscribe("books", maxsize=2) as subscription:
+            for n in range(3):
+                bus.publish(["books"], {"n": n})
+            await asyncio.sleep(0)
+            assert subscription.dropped == 1
+            assert (await subscription.get(1))["n"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_sse_stream_formats_events_and_heartbeats():
+    async def scenario():
+        bus = EventBus()
+        subscription = bus.subscribe("books")
+        stream = sse_stream(subscription, heartbeat=0.05)
+        assert await stream.__anext__() == b"retry: 3000\n\n"
+        assert await stream.__anext__() == b": keep-alive\n\n"
+        bus.publish(["books"], {"action": "borrowed", "book_id": 7})
+        chunk = await stream.__anext__()
+        assert chunk.startswith(b"event: borrowed\ndata: ")
+        await stream.aclose()
+        assert bus.subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_feed_topics():
+    assert feed_topics(1, None, None) == ["branch:1:books"]
+    assert feed_topics(1, [1], ["Poetry"]) == [
+        "branch:1:book:1",
+        "branch:1:genre:Poetry",
+    ]
+
+
+def test_feed_gets_only_own_branch_changes():
+    async def scenario():
+        bus = EventBus()
+        book = Book(id=1, branch_id=1, genre="Poetry", copies=2)
+        own = bus.subscribe(*feed_topics(1, None, None))
+        other = bus.subscribe(*feed_topics(2, [1], ["Poetry"]))
+        bus.publish(*book_change("updated", book))
+        assert (await own.get(1))["book_id"] == 1
+        assert await other.get(0.05) is None
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def published(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        events.bus, "publish", lambda topics, event: calls.append(event)
+    )
+    return calls
+
+
+def test_book_operations_publish_changes(
+    auth_client, db_session, published
+):
+    response = auth_client.post(
+        "/books",
+        json={"title": "Feed", "author": "A", "copies": 1, "genre": "Feed"},
+    )
+    book_id = response.json()["id"]
+    reader = Reader(name="Feed Reader", email="feed@example.com")
+    db_session.add(reader)
+    db_session.commit()
+    borrow = {"book_id": book_id, "reader_id": reader.id}
+    auth_client.post("/borrow", json=borrow)
+    auth_client.post("/borrow/return", json=borrow)
+    auth_client.put(f"/books/{book_id}", json={"title": "F", "author": "A"})
+    auth_client.delete(f"/books/{book_id}")
+
+    assert [(e["action"], e["copies"]) for e in published] == [
+        ("created", 1),
+        ("borrowed", 0),
+        ("returned", 1),
+        ("updated", 1),
+        ("deleted", 1),
+    ]
+    assert db_session.query(Book).get(book_id).deleted_at is not None
@@ -0,0 +1,100 @@
+import csv
+from datetime import datetime, timedelta
+import io
+import time
+
+import pytest
+
+from app import export_app
+from app.models import Book, BorrowedBook, Reader
+
+
+@pytest.fixture
+def loans(db_session):
+    """Три выдачи одной книги: id выдач по возрастанию."""
+    book = Book(title="Exported", author="Author", copies=3)
+    reader = Reader(name="Analyst", email=f"export{time.time_ns()}@x.io")
+    db_session.add_all([book, reader])
+    db_session.commit()
+    long_ago = datetime.utcnow() - timedelta(days=30)
+    rows = [
+        BorrowedBook(book_id=book.id, reader_id=reader.id, borrow_date=date)
+        for date in (long_ago, long_ago, datetime.utcnow())
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return [row.id for row in rows]
+
+
+def test_csv_endpoint_streams_table(auth_client, loans):
+    response = auth_client.get("/export/borrowed_books")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "borrowed_books.csv" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert {int(row["id"]) for row in rows} >= set(loans)
+
+
+def test_incremental_export_by_id_and_time(auth_client, loans):
+    by_id = auth_client.get(
+        "/export/borrowed_books", params={"since_id": loans[0]}
+    )
+    ids = [int(row["id"]) for row in csv.DictReader(io.StringIO(by_id.text))]
+    assert ids == loans[1:]
+
+    since = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    recent = auth_client.get("/export/borrowed_books", params={"since": since})
+    rows = list(csv.DictReader(io.StringIO(recent.text)))
+    assert loans[-1] in [int(row["id"]) for row in rows]
+    assert loans[0] not in [int(row["id"]) for row in rows]
+
+
+def test_unknown_table_and_format(auth_client):
+    assert auth_client.get("/export/users").status_code == 404
+    response = auth_client.get("/export/books", params={"format": "xlsx"})
+    assert response.status_code == 422
+
+
+def test_export_reads_in_chunks(db_engine, loans):
+    with db_engine.connect() as conn:
+        chunks = list(
+            export_app.iter_export(conn, "borrowed_books", chunk_size=1)
+        )
+    # Заголовок идёт с первой порцией, затем по порции на строку
+    assert len(chunks) >= len(loans) + 1
+    assert chunks[0].startswith(b"id,book_id,reader_id")
+
+
+def test_columnar_formats(auth_client, db_engine, loans):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    response = auth_client.get(
+        "/export/borrowed_books", params={"format": "arrow"}
+    )
+    table = pyarrow.ipc.open_stream(response.content).read_all()
+    assert set(loans) <= set(table.column("id").to_pylist())
+    assert table.schema.field("borrow_date").type == pyarrow.timestamp("us")
+
+    with db_engine.connect() as conn:
+        data = b"".join(
+            export_app.iter_export(
+                conn,
+                "borrowed_books",
+                "parquet",
+                since_id=loans[0],
+                chunk_size=1,
+            )
+        )
+    parquet = pyarrow.parquet.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.read().column("id").to_pylist() == loans[1:]
+
+
+def test_command_writes_file(monkeypatch, db_engine, loans, tmp_path):
+    monkeypatch.setattr(export_app, "engine", db_engine)
+    output = tmp_path / "books.csv"
+    export_app.main(["books", "-o", str(output)])
+    rows = list(csv.DictReader(output.open()))
+    assert "Exported" in [row["title"] for row in rows]
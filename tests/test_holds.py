@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from app.models import Book, BorrowedBook, Reader
+
+
+@pytest.fixture
+def lent_book(db_session):
+    """Единственный экземпляр книги на руках у первого читателя."""
+    readers = [
+        Reader(name=f"Hold Reader {i}", email=f"hold{i}_{time.time_ns()}@x.io")
+        for i in range(3)
+    ]
+    book = Book(title="Popular", author="Author", copies=0)
+    db_session.add_all([book, *readers])
+    db_session.commit()
+    db_session.add(BorrowedBook(book_id=book.id, reader_id=readers[0].id))
+    db_session.commit()
+    return book.id, [reader.id for reader in readers]
+
+
+def place(auth_client, book_id, reader_id):
+    return auth_client.post(
+        "/holds", json={"book_id": book_id, "reader_id": reader_id}
+    )
+
+
+def give_back(auth_client, book_id, reader_id):
+    return auth_client.post(
+        "/borrow/return", json={"book_id": book_id, "reader_id": reader_id}
+    )
+
+
+def test_place_hold_rules(auth_client, lent_book, db_session):
+    book_id, (_, reader_id, _) = lent_book
+    response = place(auth_client, book_id, reader_id)
+    assert response.status_code == 201
+    assert response.json()["status"] == "waiting"
+    assert place(auth_client, book_id, reader_id).status_code == 409
+
+    available = Book(title="On shelf", author="Author", copies=2)
+    db_session.add(available)
+    db_session.commit()
+    assert place(auth_client, available.id, reader_id).status_code == 400
+
+
+def test_return_assigns_copy_to_first_in_queue(
+    auth_client, lent_book, db_session
+):
+    book_id, (owner, first, second) = lent_book
+    first_hold = place(auth_client, book_id, first).json()["id"]
+    second_hold = place(auth_client, book_id, second).json()["id"]
+
+    assert give_back(auth_client, book_id, owner).status_code == 200
+
+    assert auth_client.get(f"/holds/{first_hold}").json()["status"] == "ready"
+    assert auth_client.get(f"/holds/{second_hold}").json()["status"] == (
+        "waiting"
+    )
+    # Экземпляр закреплён и не попадает в свободные
+    assert auth_client.get(f"/books/{book_id}").json()["copies"] == 0
+    response = auth_client.post(
+        "/borrow", json={"book_id": book_id, "reader_id": second}
+    )
+    assert response.status_code == 400
+
+    response = auth_client.post(
+        "/borrow", json={"book_id": book_id, "reader_id": first}
+    )
+    assert response.status_code == 200
+    assert auth_client.get(f"/holds/{first_hold}").json()["status"] == (
+        "fulfilled"
+    )
+
+
+def test_cancel_ready_hold_passes_copy_on(auth_client, lent_book):
+    book_id, (owner, first, second) = lent_book
+    first_hold = place(auth_client, book_id, first).json()["id"]
+    second_hold = place(auth_client, book_id, second).json()["id"]
+    give_back(auth_client, book_id, owner)
+
+    assert auth_client.delete(f"/holds/{first_hold}").status_code == 204
+    assert auth_client.get(f"/holds/{second_hold}").json()["status"] == (
+        "ready"
+    )
+    assert auth_client.delete(f"/holds/{first_hold}").status_code == 400
+
+
+def test_wait_times_out_while_waiting(auth_client, lent_book):
+    book_id, (_, first, _) = lent_book
+    hold_id = place(auth_client, book_id, first).json()["id"]
+    response = auth_client.get(f"/holds/{hold_id}/wait?timeout=0.1")
+    assert response.status_code == 200
+    assert response.json()["status"] == "waiting"
+
+
+def test_wait_returns_when_copy_is_assigned(auth_client, lent_book):
+    book_id, (owner, first, _) = lent_book
+    hold_id = place(auth_client, book_id, first).json()["id"]
+
+    def return_later():
+        time.sleep(0.3)
+        give_back(auth_client, book_id, owner)
+
+    returner = threading.Thread(target=return_later)
+    started = time.monotonic()
+    returner.start()
+    response = auth_client.get(f"/holds/{hold_id}/wait?timeout=10")
+    returner.join()
+
+    assert response.json()["status"] == "ready"
+    assert time.monotonic() - started < 5
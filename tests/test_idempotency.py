@@ -0,0 +1,196 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import uuid
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import select, update
+
+from app import idempotency
+from app.database import make_engine
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.models import Book, BorrowedBook, IdempotencyKey, Item, Reader
+
+
+def key_headers():
+    return {"Idempotency-Key": str(uuid.uuid4())}
+
+
+@pytest.fixture
+def book_and_reader(db_session):
+    suffix = uuid.uuid4().hex[:8]
+    book = Book(title="Retry", author="Author", copies=2)
+    reader = Reader(name="Retry Reader", email=f"retry{suffix}@example.com")
+    db_session.add_all([book, reader])
+    db_session.commit()
+    return book, reader
+
+
+@pytest.fixture
+def store(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+    IdempotencyKey.__table__.create(engine)
+    yield IdempotencyStore(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def demo_client(store, monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_WAIT_SECONDS", 0.3)
+    demo = FastAPI()
+    demo.state.idempotency_store = store
+    demo.state.leases = []
+    demo.add_middleware(IdempotencyMiddleware, paths=["/things", "/slow"])
+
+    @demo.post("/things", status_code=201)
+    def create_thing(response: Response):
+        response.headers["ETag"] = '"1"'
+        response.headers["Location"] = "/things/1"
+        response.headers.append("Link", '</things/2>; rel="next"')
+        response.headers.append("Link", '</things>; rel="collection"')
+        return {"id": 1}
+
+    @demo.post("/slow")
+    async def slow():
+        # Запрос идёт дольше нескольких продлений захвата
+        await asyncio.sleep(1)
+        with store.engine.connect() as conn:
+            rows = conn.execute(select(idempotency.table)).all()
+        demo.state.leases = [
+            row.expires_at > datetime.utcnow() for row in rows
+        ]
+        return {}
+
+    return TestClient(demo)
+
+
+def test_retry_replays_first_response(auth_client, db_session):
+    headers = key_headers()
+    payload = {"title": "Once", "author": "Author", "isbn": "idem-1"}
+    first = auth_client.post("/books", json=payload, headers=headers)
+    retry = auth_client.post("/books", json=payload, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert db_session.query(Book).filter(Book.isbn == "idem-1").count() == 1
+
+
+def test_borrow_retry_does_not_decrement_twice(
+    auth_client, db_session, book_and_reader
+):
+    book, reader = book_and_reader
+    headers = key_headers()
+    payload = {"book_id": book.id, "reader_id": reader.id}
+    for _ in range(3):
+        assert auth_client.post("/borrow", json=payload, headers=headers)
+    db_session.refresh(book)
+    assert book.copies == 1
+    loans = db_session.query(BorrowedBook).filter_by(reader_id=reader.id)
+    assert loans.count() == 1
+
+
+def test_concurrent_duplicates_wait_for_first(
+    auth_client, db_session, book_and_reader
+):
+    book, reader = book_and_reader
+    headers = key_headers()
+    payload = {"book_id": book.id, "reader_id": reader.id}
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(
+            pool.map(
+                lambda _: auth_client.post(
+                    "/borrow", json=payload, headers=headers
+                ),
+                range(4),
+            )
+        )
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.json()["id"] for r in responses}) == 1
+    db_session.refresh(book)
+    assert book.copies == 1
+
+
+def test_scanner_retry_lends_item_once(
+    auth_client, db_session, book_and_reader
+):
+    book, reader = book_and_reader
+    item = Item(book_id=book.id, barcode=f"SCAN-{uuid.uuid4().hex[:8]}")
+    db_session.add(item)
+    db_session.commit()
+    path = f"/items/{item.barcode}"
+    headers = key_headers()
+    payload = {"reader_id": reader.id}
+    first = auth_client.post(f"{path}/borrow", json=payload, headers=headers)
+    retry = auth_client.post(f"{path}/borrow", json=payload, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    headers = key_headers()
+    for _ in range(2):
+        response = auth_client.post(f"{path}/return", headers=headers)
+        assert response.status_code == 200
+    assert response.headers["idempotent-replayed"] == "true"
+    loans = db_session.query(BorrowedBook).filter_by(item_id=item.id)
+    assert loans.count() == 1
+
+
+def test_key_reused_with_other_body_is_rejected(auth_client):
+    headers = key_headers()
+    auth_client.post(
+        "/books", json={"title": "A", "author": "B"}, headers=headers
+    )
+    response = auth_client.post(
+        "/books", json={"title": "Other", "author": "B"}, headers=headers
+    )
+    assert response.status_code == 422
+
+
+def test_client_errors_are_replayed(auth_client):
+    headers = key_headers()
+    payload = {"book_id": 987654, "reader_id": 987654}
+    first = auth_client.post("/borrow", json=payload, headers=headers)
+    retry = auth_client.post("/borrow", json=payload, headers=headers)
+    assert first.status_code == retry.status_code == 404
+    assert retry.headers["idempotent-replayed"] == "true"
+
+
+def test_expired_key_runs_again(auth_client, db_session, monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_TTL_SECONDS", -1)
+    headers = key_headers()
+    payload = {"title": "Expired", "author": "Author"}
+    auth_client.post("/books", json=payload, headers=headers)
+    retry = auth_client.post("/books", json=payload, headers=headers)
+    assert "idempotent-replayed" not in retry.headers
+    assert db_session.query(Book).filter(Book.title == "Expired").count() == 2
+
+
+def test_replay_keeps_response_headers(demo_client):
+    headers = key_headers()
+    first = demo_client.post("/things", headers=headers)
+    retry = demo_client.post("/things", headers=headers)
+
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.status_code == first.status_code == 201
+    assert retry.headers["etag"] == '"1"'
+    assert retry.headers["location"] == "/things/1"
+    assert retry.headers.get_list("link") == first.headers.get_list("link")
+    assert retry.json() == {"id": 1}
+
+
+def test_long_request_keeps_its_claim(demo_client):
+    assert demo_client.post("/slow", headers=key_headers()).status_code == 200
+    assert demo_client.app.state.leases == [True]
+
+
+def test_abandoned_claim_is_taken_after_lease(store):
+    assert store.claim("client|key", "f")[0] == "claimed"
+    assert store.claim("client|key", "f")[0] == "in_progress"
+    # Воркер упал и перестал продлевать захват
+    with store.engine.begin() as conn:
+        conn.execute(
+            update(idempotency.table).values(expires_at=datetime.utcnow())
+        )
+    assert store.claim("client|key", "f")[0] == "claimed"
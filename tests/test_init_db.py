@@ -38,7 +38,9 @@ def test_add_first_librarian_if_needed_creates_user(temp_db_path):
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 email VARCHAR NOT NULL UNIQUE,
                 password_hash VARCHAR NOT NULL,
-                is_librarian BOOLEAN DEFAULT 0
+                is_librarian BOOLEAN DEFAULT 0,
+                is_admin BOOLEAN NOT NULL DEFAULT 0,
+                branch_id INTEGER NOT NULL DEFAULT 1
             )
         """
             )
@@ -60,6 +62,7 @@ def test_add_first_librarian_if_needed_creates_user(temp_db_path):
 
     assert user is not None
     assert bcrypt.verify("qwe123", user.password_hash)
+    assert user.is_admin
 
 
 def test_add_first_librarian_if_needed_skips_if_users_exist(temp_db_path):
@@ -73,7 +76,9 @@ def test_add_first_librarian_if_needed_skips_if_users_exist(temp_db_path):
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 email VARCHAR NOT NULL UNIQUE,
                 password_hash VARCHAR NOT NULL,
-                is_librarian BOOLEAN DEFAULT 0
+                is_librarian BOOLEAN DEFAULT 0,
+                is_admin BOOLEAN NOT NULL DEFAULT 0,
+                branch_id INTEGER NOT NULL DEFAULT 1
             )
         """
             )
@@ -0,0 +1,163 @@
+import time
+
+from fastapi import HTTPException
+import pytest
+from sqlalchemy import func, select, text
+
+from app.bookkeeping_app import lend
+from app.models import Book, BorrowedBook, Item, Reader
+
+
+@pytest.fixture
+def shelf(db_session):
+    """Книга с двумя экземплярами и читатель: (book_id, reader_id)."""
+    book = Book(title="Barcoded", author="Author", copies=2)
+    reader = Reader(name="Scanner", email=f"scan{time.time_ns()}@x.io")
+    db_session.add_all([book, reader])
+    db_session.commit()
+    return book.id, reader.id
+
+
+def barcodes(db_session, book_id, status="available"):
+    return db_session.scalars(
+        select(Item.barcode)
+        .where(Item.book_id == book_id, Item.status == status)
+        .order_by(Item.id)
+    ).all()
+
+
+def copies(auth_client, book_id):
+    return auth_client.get(f"/books/{book_id}").json()["copies"]
+
+
+def test_new_book_gets_items_for_its_copies(auth_client, db_session):
+    response = auth_client.post(
+        "/books", json={"title": "Fresh", "author": "A", "copies": 3}
+    )
+    assert len(barcodes(db_session, response.json()["id"])) == 3
+
+
+def test_borrow_and_return_by_barcode(auth_client, db_session, shelf):
+    book_id, reader_id = shelf
+    barcode = barcodes(db_session, book_id)[0]
+
+    response = auth_client.post(
+        f"/items/{barcode}/borrow", json={"reader_id": reader_id}
+    )
+    assert response.status_code == 200
+    item = auth_client.get(f"/items/{barcode}").json()
+    assert response.json()["item_id"] == item["id"]
+    assert item["status"] == "on_loan"
+    assert copies(auth_client, book_id) == 1
+    again = auth_client.post(
+        f"/items/{barcode}/borrow", json={"reader_id": reader_id}
+    )
+    assert again.status_code == 400
+
+    assert auth_client.post(f"/items/{barcode}/return").status_code == 200
+    assert auth_client.get(f"/items/{barcode}").json()["status"] == (
+        "available"
+    )
+    assert copies(auth_client, book_id) == 2
+    assert auth_client.post(f"/items/{barcode}/return").status_code == 400
+    assert auth_client.get("/items/NOPE").status_code == 404
+
+
+def test_item_taken_after_read_is_not_lent_twice(db_session, shelf):
+    book_id, reader_id = shelf
+    item = db_session.scalars(
+        select(Item).where(Item.book_id == book_id).order_by(Item.id)
+    ).first()
+    book = db_session.get(Book, book_id)
+    # Другой запрос выдал экземпляр, пока этот держал прочитанную строку
+    db_session.execute(
+        text("UPDATE items SET status = 'on_loan' WHERE id = :id"),
+        {"id": item.id},
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        lend(db_session, book, reader_id, item, None)
+    assert exc_info.value.status_code == 409
+    assert db_session.get(Book, book_id).copies == 2
+    db_session.rollback()
+
+
+def test_borrow_by_book_id_takes_an_item(auth_client, db_session, shelf):
+    book_id, reader_id = shelf
+    response = auth_client.post(
+        "/borrow", json={"book_id": book_id, "reader_id": reader_id}
+    )
+    loan = db_session.get(BorrowedBook, response.json()["id"])
+    assert db_session.get(Item, loan.item_id).status == "on_loan"
+    assert len(barcodes(db_session, book_id)) == 1
+
+    auth_client.post(
+        "/borrow/return", json={"book_id": book_id, "reader_id": reader_id}
+    )
+    assert len(barcodes(db_session, book_id)) == 2
+
+
+def test_add_item_and_change_status(auth_client, db_session, shelf):
+    book_id, reader_id = shelf
+    response = auth_client.post(
+        "/items", json={"book_id": book_id, "barcode": "LIB-0001"}
+    )
+    assert response.status_code == 201
+    assert copies(auth_client, book_id) == 3
+    duplicate = auth_client.post(
+        "/items", json={"book_id": book_id, "barcode": "LIB-0001"}
+    )
+    assert duplicate.status_code == 409
+
+    damaged = auth_client.patch("/items/LIB-0001", json={"status": "damaged"})
+    assert damaged.json()["status"] == "damaged"
+    assert copies(auth_client, book_id) == 2
+    auth_client.patch("/items/LIB-0001", json={"status": "available"})
+    assert copies(auth_client, book_id) == 3
+
+    auth_client.post("/items/LIB-0001/borrow", json={"reader_id": reader_id})
+    lost = auth_client.patch("/items/LIB-0001", json={"status": "lost"})
+    assert lost.status_code == 409
+
+
+def test_item_reserved_for_hold_cannot_leave_shelf(
+    auth_client, db_session, shelf
+):
+    book_id, reader_id = shelf
+    first, second = barcodes(db_session, book_id)
+    auth_client.post(f"/items/{first}/borrow", json={"reader_id": reader_id})
+    auth_client.post(f"/items/{second}/borrow", json={"reader_id": reader_id})
+    other = Reader(name="Waiting", email=f"wait{time.time_ns()}@x.io")
+    db_session.add(other)
+    db_session.commit()
+    hold = {"book_id": book_id, "reader_id": other.id}
+    assert auth_client.post("/holds", json=hold).status_code == 201
+
+    auth_client.post(f"/items/{first}/return")
+    assert copies(auth_client, book_id) == 0
+    response = auth_client.patch(f"/items/{first}", json={"status": "lost"})
+    assert response.status_code == 409
+    # Закреплённый экземпляр может взять только читатель с бронью
+    response = auth_client.post(
+        f"/items/{first}/borrow", json={"reader_id": reader_id}
+    )
+    assert response.status_code == 400
+    response = auth_client.post(
+        f"/items/{first}/borrow", json={"reader_id": other.id}
+    )
+    assert response.status_code == 200
+
+
+def test_copies_update_adds_or_withdraws_items(
+    auth_client, db_session, shelf
+):
+    book_id, _ = shelf
+    auth_client.patch(f"/books/{book_id}", json={"copies": 4})
+    assert len(barcodes(db_session, book_id)) == 4
+    auth_client.patch(f"/books/{book_id}", json={"copies": 1})
+    assert len(barcodes(db_session, book_id)) == 1
+    withdrawn = db_session.scalar(
+        select(func.count())
+        .select_from(Item)
+        .where(Item.book_id == book_id, Item.status == "withdrawn")
+    )
+    assert withdrawn == 3
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from app.models import Book, Reader
+
+
+def book(copies):
+    return {"title": "Versioned", "author": "Author", "copies": copies}
+
+
+@pytest.fixture
+def book_id(db_session):
+    book = Book(title="Versioned", author="Author", copies=1)
+    db_session.add(book)
+    db_session.commit()
+    return book.id
+
+
+@pytest.fixture
+def reader_id(db_session):
+    reader = Reader(name="Versioned", email=f"v{time.time_ns()}@x.io")
+    db_session.add(reader)
+    db_session.commit()
+    return reader.id
+
+
+def test_get_returns_etag(auth_client, book_id, reader_id):
+    response = auth_client.get(f"/books/{book_id}")
+    assert response.headers["ETag"] == '"1"'
+    assert response.json()["version"] == 1
+    assert auth_client.get(f"/readers/{reader_id}").headers["ETag"] == '"1"'
+
+
+def test_matching_if_match_updates_and_bumps_version(auth_client, book_id):
+    etag = auth_client.get(f"/books/{book_id}").headers["ETag"]
+    response = auth_client.put(
+        f"/books/{book_id}", json=book(3), headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["copies"] == 3
+    assert response.json()["version"] == 2
+    assert response.headers["ETag"] == '"2"'
+
+
+def test_stale_if_match_is_rejected(auth_client, book_id):
+    headers = {"If-Match": '"1"'}
+    first = auth_client.put(
+        f"/books/{book_id}", json=book(5), headers=headers
+    )
+    assert first.status_code == 200
+    second = auth_client.put(
+        f"/books/{book_id}", json=book(7), headers=headers
+    )
+    assert second.status_code == 412
+    assert auth_client.get(f"/books/{book_id}").json()["copies"] == 5
+
+
+def test_reader_update_honours_if_match(auth_client, reader_id):
+    url = f"/readers/{reader_id}"
+    ok = auth_client.put(url, json={"name": "A"}, headers={"If-Match": "1"})
+    assert ok.status_code == 200
+    assert ok.headers["ETag"] == '"2"'
+    stale = auth_client.put(
+        url, json={"name": "B"}, headers={"If-Match": 'W/"1"'}
+    )
+    assert stale.status_code == 412
+    assert auth_client.get(url).json()["name"] == "A"
+
+
+def test_missing_and_malformed(auth_client, book_id):
+    missing = auth_client.put(
+        "/books/999999", json=book(1), headers={"If-Match": '"1"'}
+    )
+    assert missing.status_code == 404
+    malformed = auth_client.put(
+        f"/books/{book_id}", json=book(1), headers={"If-Match": "abc"}
+    )
+    assert malformed.status_code == 400
+
+
+def test_without_if_match_update_is_unconditional(auth_client, book_id):
+    for copies in (2, 4):
+        response = auth_client.put(f"/books/{book_id}", json=book(copies))
+        assert response.status_code == 200
+    assert auth_client.get(f"/books/{book_id}").json()["version"] == 3
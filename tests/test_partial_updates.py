@@ -0,0 +1,104 @@
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Book, Reader
+
+
+@pytest.fixture
+def book_id(db_session):
+    book = Book(title="Patchable", author="Author", year=2001, copies=0)
+    db_session.add(book)
+    db_session.commit()
+    return book.id
+
+
+@pytest.fixture
+def book_statements(db_engine):
+    """SQL-запросы к таблице books, выполненные внутри теста."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "books" in statement.split("WHERE")[0]:
+            # По виду запроса: UPDATE может начинаться с WITH
+            if context.isinsert:
+                statements.append("INSERT")
+            elif context.isupdate:
+                statements.append("UPDATE")
+            else:
+                statements.append(statement.split()[0])
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(db_engine, "before_cursor_execute", record)
+
+
+def test_patch_touches_only_given_fields(auth_client, book_id):
+    response = auth_client.patch(f"/books/{book_id}", json={"year": 2020})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["title"], body["year"], body["copies"]) == (
+        "Patchable",
+        2020,
+        0,
+    )
+    assert body["version"] == 2
+    assert response.headers["ETag"] == '"2"'
+
+
+def test_patch_is_single_statement(auth_client, book_id, book_statements):
+    response = auth_client.patch(
+        f"/books/{book_id}", json={"author": "Other"}
+    )
+    assert response.status_code == 200
+    # Прежние значения для журнала аудита возвращает тот же UPDATE ...
+    # RETURNING, отдельных SELECT нет ни до, ни после
+    assert book_statements == ["UPDATE"]
+
+
+def test_create_book_is_single_statement(auth_client, book_statements):
+    response = auth_client.post(
+        "/books", json={"title": "New", "author": "Author"}
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+    assert book_statements == ["INSERT"]
+
+
+def test_patch_validation(auth_client, book_id):
+    url = f"/books/{book_id}"
+    assert auth_client.patch(url, json={}).status_code == 400
+    assert auth_client.patch(url, json={"title": None}).status_code == 422
+    assert auth_client.patch(url, json={"copies": -1}).status_code == 422
+    assert (
+        auth_client.patch("/books/999999", json={"year": 1}).status_code
+        == 404
+    )
+    stale = auth_client.patch(
+        url, json={"year": 1}, headers={"If-Match": '"7"'}
+    )
+    assert stale.status_code == 412
+
+
+def test_patch_reader(auth_client, db_session):
+    suffix = time.time_ns()
+    readers = [
+        Reader(name=f"Patch {i}", email=f"patch{i}_{suffix}@x.io")
+        for i in range(2)
+    ]
+    db_session.add_all(readers)
+    db_session.commit()
+    first, second = readers
+
+    response = auth_client.patch(
+        f"/readers/{first.id}", json={"name": "Renamed"}
+    )
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert response.json()["email"] == first.email
+
+    taken = auth_client.patch(
+        f"/readers/{first.id}", json={"email": second.email}
+    )
+    assert taken.status_code == 409
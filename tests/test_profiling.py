@@ -0,0 +1,80 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.profiling import ProfilingMiddleware, phase
+
+TOKEN = "secret-profile-token"
+
+
+def make_client(directory, **options):
+    demo = FastAPI()
+    demo.add_middleware(
+        ProfilingMiddleware, directory=directory, interval=0.001, **options
+    )
+    engine = create_engine("sqlite://")
+
+    @demo.get("/slow")
+    def slow_endpoint():
+        with phase("auth"):
+            time.sleep(0.01)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        time.sleep(0.05)
+        return {"ok": True}
+
+    return TestClient(demo)
+
+
+@pytest.fixture
+def profiled(tmp_path):
+    return make_client(tmp_path, token=TOKEN)
+
+
+def timings(response):
+    parts = {}
+    for metric in response.headers["server-timing"].split(", "):
+        name, *params = metric.split(";")
+        parts[name] = dict(param.split("=", 1) for param in params)
+    return parts
+
+
+def test_token_header_enables_profile(profiled, tmp_path):
+    response = profiled.get("/slow", headers={"X-Profile": TOKEN})
+    assert response.status_code == 200
+    parts = timings(response)
+    assert set(parts) == {"auth", "db", "serialize", "app"}
+    assert float(parts["auth"]["dur"]) >= 10
+    assert parts["db"]["desc"] == '"1 queries"'
+    assert float(parts["app"]["dur"]) >= 60
+
+    saved = tmp_path / response.headers["x-profile-id"]
+    collapsed = saved.read_text()
+    assert "slow_endpoint" in collapsed
+    count = collapsed.splitlines()[0].rsplit(" ", 1)[1]
+    assert int(count) > 0
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile": "wrong"}])
+def test_request_without_valid_token_is_not_profiled(
+    profiled, tmp_path, headers
+):
+    response = profiled.get("/slow", headers=headers)
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+    assert not list(tmp_path.iterdir())
+
+
+def test_sample_rate_profiles_without_header(tmp_path):
+    client = make_client(tmp_path, sample_rate=1.0)
+    response = client.get("/slow")
+    assert "x-profile-id" in response.headers
+
+
+def test_old_profiles_are_rotated(tmp_path):
+    client = make_client(tmp_path, sample_rate=1.0, keep=2)
+    names = [client.get("/slow").headers["x-profile-id"] for _ in range(3)]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(names[1:])
@@ -0,0 +1,95 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+import pytest
+
+from app.config_app import ALGORITHM, SECRET_KEY
+from app.rate_limit import (
+    InMemoryBackend,
+    RateLimitMiddleware,
+    SQLiteBackend,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryBackend()
+    return SQLiteBackend(str(tmp_path / "limits.db"))
+
+
+def test_bucket_spends_burst_then_refills(backend):
+    results = [backend.take("k", 1.0, 3, 100.0)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+    # Через две секунды накопилось два токена
+    assert backend.take("k", 1.0, 3, 102.0) == (True, 1.0)
+    assert backend.take("other", 1.0, 3, 102.0)[0] is True
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = InMemoryBackend(max_keys=3)
+    for key in ("a", "b", "c"):
+        backend.take(key, 1.0, 1, 100.0)
+    backend.take("a", 1.0, 1, 100.0)
+    # Все корзины активны, но их число не превышает max_keys
+    backend.take("d", 1.0, 1, 100.0)
+    assert list(backend._buckets) == ["c", "a", "d"]
+    assert backend.take("a", 1.0, 1, 100.0)[0] is False
+
+
+def test_sqlite_backend_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "limits.db")
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+    assert first.take("k", 0.1, 1, 100.0)[0] is True
+    assert second.take("k", 0.1, 1, 100.0)[0] is False
+
+
+def make_client(limits):
+    demo = FastAPI()
+    demo.add_middleware(
+        RateLimitMiddleware, backend=InMemoryBackend(), limits=limits
+    )
+
+    @demo.get("/items")
+    def items():
+        return []
+
+    @demo.get("/free")
+    def free():
+        return []
+
+    return TestClient(demo)
+
+
+def bearer(sub):
+    token = jwt.encode({"sub": sub}, SECRET_KEY, algorithm=ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_middleware_returns_429_with_retry_after():
+    client = make_client({"/items": (0.5, 1)})
+    assert client.get("/items").status_code == 200
+    response = client.get("/items")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+    # Путь без правила и без бюджета по умолчанию не ограничивается
+    assert client.get("/free").status_code == 200
+
+
+def test_middleware_keys_by_jwt_subject():
+    client = make_client({"*": (0.01, 1)})
+    assert client.get("/items", headers=bearer("1")).status_code == 200
+    assert client.get("/items", headers=bearer("1")).status_code == 429
+    assert client.get("/items", headers=bearer("2")).status_code == 200
+    # Без токена ключом служит IP клиента
+    assert client.get("/items").status_code == 200
+    assert client.get("/items").status_code == 429
+
+
+def test_login_has_tighter_budget(client):
+    form = {"username": "nobody@example.com", "password": "wrong"}
+    statuses = [
+        client.post("/librarian/login", data=form).status_code
+        for _ in range(6)
+    ]
+    assert statuses == [401] * 5 + [429]
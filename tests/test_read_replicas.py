@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.database import RoutingSession, on_primary
+from app.dependencies import _authenticate
+from app.models import Base, Book, RevokedToken, User
+from app.tokens import RevocationList, issue_token
+
+
+@pytest.fixture
+def primary_and_replica(tmp_path, monkeypatch):
+    # Вторая SQLite-база изображает реплику с отстающими данными
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, title in ((primary, "Primary"), (replica, "Replica")):
+        Base.metadata.create_all(engine)
+        with sessionmaker(bind=engine)() as session:
+            session.add(Book(title=title, author="Author", copies=1))
+            session.commit()
+    monkeypatch.setattr(database, "replica_engines", [replica])
+    monkeypatch.setattr(database, "_last_write_at", {})
+    Session = sessionmaker(class_=RoutingSession, bind=primary)
+    yield Session
+    primary.dispose()
+    replica.dispose()
+
+
+def first_title(session):
+    return session.query(Book).order_by(Book.id).first().title
+
+
+def test_read_only_session_uses_replica(primary_and_replica):
+    with primary_and_replica() as session:
+        session.info["read_only"] = True
+        assert first_title(session) == "Replica"
+
+
+def test_regular_session_uses_primary(primary_and_replica):
+    with primary_and_replica() as session:
+        assert first_title(session) == "Primary"
+
+
+def test_session_reads_own_writes(primary_and_replica):
+    with primary_and_replica() as session:
+        session.info["read_only"] = True
+        session.add(Book(title="New", author="Author", copies=1))
+        session.flush()
+        assert first_title(session) == "Primary"
+
+
+def test_actor_reads_primary_after_commit(primary_and_replica):
+    with primary_and_replica() as session:
+        session.info["actor"] = 1
+        session.add(Book(title="New", author="Author", copies=1))
+        session.commit()
+
+    with primary_and_replica() as session:
+        session.info.update(read_only=True, actor=1)
+        assert first_title(session) == "Primary"
+
+    with primary_and_replica() as session:
+        session.info.update(read_only=True, actor=2)
+        assert first_title(session) == "Replica"
+
+
+def test_revocations_are_checked_on_primary(primary_and_replica):
+    revocations = RevocationList(bits=4096, hashes=5, sync_seconds=0)
+    with primary_and_replica() as session:
+        session.add(
+            RevokedToken(
+                jti="logged-out",
+                expires_at=datetime.utcnow() + timedelta(hours=1),
+            )
+        )
+        session.commit()
+
+    with primary_and_replica() as session:
+        session.info["read_only"] = True
+        with on_primary(session):
+            revocations.sync(session)
+            assert revocations.is_revoked(session, "logged-out")
+        assert session.info["read_only"]
+        assert first_title(session) == "Replica"
+
+
+def test_new_librarian_is_authenticated_on_primary(primary_and_replica):
+    with primary_and_replica() as session:
+        user = User(email="new@library.com", password_hash="x")
+        session.add(user)
+        session.commit()
+        token = issue_token(
+            {"sub": str(user.id)}, "access", timedelta(minutes=5)
+        )
+
+    # На реплике библиотекаря ещё нет
+    with primary_and_replica() as session:
+        session.info["read_only"] = True
+        assert _authenticate(session, token).email == "new@library.com"
+        assert session.info["read_only"]
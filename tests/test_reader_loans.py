@@ -0,0 +1,114 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Book, BorrowedBook, Reader
+
+
+@pytest.fixture
+def history(db_session):
+    """Читатель с двумя возвращёнными и одной невозвращённой книгой."""
+    reader = Reader(name="History", email="history@example.com")
+    other = Reader(name="Other", email="other@example.com")
+    books = [Book(title=f"Book {i}", author="Author") for i in range(3)]
+    db_session.add_all([reader, other, *books])
+    db_session.flush()
+    returned = datetime(2026, 1, 1)
+    db_session.add_all(
+        [
+            BorrowedBook(
+                book_id=books[0].id, reader_id=reader.id, return_date=returned
+            ),
+            BorrowedBook(
+                book_id=books[1].id, reader_id=reader.id, return_date=returned
+            ),
+            BorrowedBook(book_id=books[2].id, reader_id=reader.id),
+            BorrowedBook(book_id=books[0].id, reader_id=other.id),
+        ]
+    )
+    db_session.commit()
+    return reader.id
+
+
+def titles(response):
+    assert response.status_code == 200
+    return [loan["title"] for loan in response.json()]
+
+
+def test_loans_newest_first_with_titles(auth_client, history):
+    response = auth_client.get(f"/readers/{history}/loans")
+    assert titles(response) == ["Book 2", "Book 1", "Book 0"]
+    assert {loan["reader_id"] for loan in response.json()} == {history}
+    assert "link" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "status, expected",
+    [("active", ["Book 2"]), ("returned", ["Book 1", "Book 0"])],
+)
+def test_status_filter(auth_client, history, status, expected):
+    response = auth_client.get(
+        f"/readers/{history}/loans", params={"status": status}
+    )
+    assert titles(response) == expected
+
+
+def test_pages_follow_link(auth_client, history):
+    first = auth_client.get(f"/readers/{history}/loans?limit=2")
+    assert titles(first) == ["Book 2", "Book 1"]
+    before_id = first.json()[-1]["id"]
+    assert f"before_id={before_id}" in first.headers["link"]
+
+    second = auth_client.get(
+        f"/readers/{history}/loans",
+        params={"limit": 2, "before_id": before_id},
+    )
+    assert titles(second) == ["Book 0"]
+
+
+def test_unknown_reader_and_status(auth_client, history):
+    assert auth_client.get("/readers/999999/loans").status_code == 404
+    response = auth_client.get(f"/readers/{history}/loans?status=lost")
+    assert response.status_code == 422
+
+
+def test_history_is_read_from_index_in_order(
+    auth_client, db_engine, db_session, history
+):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "ORDER BY borrowed_books.id" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        for params in (
+            {},
+            {"status": "active"},
+            {"status": "returned", "before_id": 3},
+        ):
+            response = auth_client.get(
+                f"/readers/{history}/loans", params=params
+            )
+            assert response.status_code == 200
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+
+    assert len(statements) == 3
+    conn = db_session.connection()
+    for statement, parameters in statements:
+        # План запроса в том виде, в каком его выполнил эндпоинт (с
+        # условием филиала): строки выдач — из индекса в нужном порядке
+        plan = [
+            row[-1]
+            for row in conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+        ]
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+        assert any(
+            "COVERING INDEX ix_borrowed_books_reader_history" in step
+            for step in plan
+        ), plan
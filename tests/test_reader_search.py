@@ -0,0 +1,69 @@
+import pytest
+
+from app.models import Reader
+
+NAMES = [
+    ("Alice Smith", "alice@example.com"),
+    ("Bob Alison", "bob@example.com"),
+    ("Carl Stone", "CARL@example.com"),
+    ("Dana White", "dana@example.com"),
+]
+
+
+@pytest.fixture
+def readers(db_session):
+    rows = [Reader(name=name, email=email) for name, email in NAMES]
+    db_session.add_all(rows)
+    db_session.commit()
+    return {row.name: row.id for row in rows}
+
+
+def names(response):
+    assert response.status_code == 200
+    return [reader["name"] for reader in response.json()]
+
+
+@pytest.mark.parametrize(
+    "q, expected",
+    [
+        ("ali", ["Alice Smith", "Bob Alison"]),  # триграммы имени
+        ("ALI", ["Alice Smith", "Bob Alison"]),
+        ("carl@", ["Carl Stone"]),  # начало email без учёта регистра
+        ("st", ["Carl Stone"]),  # короче триграммы — перебор имён
+        ("ample.com", []),  # email ищется только по началу
+        ("100%", []),
+    ],
+)
+def test_search_by_name_or_email_prefix(auth_client, readers, q, expected):
+    assert names(auth_client.get("/readers", params={"q": q})) == expected
+
+
+def test_search_follows_renames_and_deletion(auth_client, readers):
+    reader_id = readers["Dana White"]
+    auth_client.patch(f"/readers/{reader_id}", json={"name": "Dana Black"})
+    assert names(auth_client.get("/readers", params={"q": "white"})) == []
+    assert names(auth_client.get("/readers", params={"q": "black"})) == [
+        "Dana Black"
+    ]
+
+    auth_client.delete(f"/readers/{reader_id}")
+    assert names(auth_client.get("/readers", params={"q": "black"})) == []
+
+
+def test_keyset_pages_cover_all_readers(auth_client, readers):
+    seen = []
+    params = {"limit": 3}
+    while True:
+        response = auth_client.get("/readers", params=params)
+        seen += names(response)
+        if "link" not in response.headers:
+            break
+        assert len(response.json()) == 3
+        params = {"limit": 3, "after_id": response.json()[-1]["id"]}
+        assert f"after_id={params['after_id']}" in response.headers["link"]
+    assert seen == [name for name, _ in NAMES]
+
+
+def test_page_size_is_bounded(auth_client):
+    assert auth_client.get("/readers?limit=0").status_code == 422
+    assert auth_client.get("/readers?limit=100000").status_code == 422
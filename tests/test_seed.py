@@ -0,0 +1,154 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select, text
+
+from app import seed_app
+from app.database import make_engine
+from app.models import Base, Book, BorrowedBook, Item, Reader
+from app.seed_app import isbn13, seed
+
+UNTIL = datetime(2026, 1, 1)
+
+
+def make_db(path):
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def seeded(tmp_path):
+    """Файловая БД с данными двух филиалов."""
+    engine = make_db(tmp_path / "seed.db")
+    counts = seed(
+        engine, books=300, readers=60, loans=5000, branches=2, until=UNTIL
+    )
+    yield engine, counts
+    engine.dispose()
+
+
+def schema_objects(conn):
+    return conn.scalars(
+        text(
+            "SELECT name FROM sqlite_master "
+            "WHERE type IN ('index', 'trigger') ORDER BY name"
+        )
+    ).all()
+
+
+def test_isbn_check_digit():
+    assert isbn13(30640615) == "9780306406157"
+
+
+def test_seed_is_reproducible(seeded, tmp_path):
+    engine, _ = seeded
+    other = make_db(tmp_path / "other.db")
+    seed(other, books=300, readers=60, loans=5000, branches=2, until=UNTIL)
+    query = select(BorrowedBook.__table__).order_by(BorrowedBook.id)
+    with engine.connect() as first, other.connect() as second:
+        assert first.execute(query).all() == second.execute(query).all()
+    other.dispose()
+
+
+def test_open_loans_match_copies_and_items(seeded):
+    engine, counts = seeded
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count(BorrowedBook.id))) == 5000
+        open_loans = conn.scalar(
+            select(func.count(BorrowedBook.id)).where(
+                BorrowedBook.return_date.is_(None)
+            )
+        )
+        assert open_loans == counts["open_loans"] > 0
+        on_loan = conn.scalar(
+            select(func.count(Item.id)).where(Item.status == "on_loan")
+        )
+        assert on_loan == open_loans
+        available = conn.scalar(
+            select(func.count(Item.id)).where(Item.status == "available")
+        )
+        assert conn.scalar(select(func.sum(Book.copies))) == available
+        most_open = conn.scalar(
+            select(func.count(BorrowedBook.id))
+            .where(BorrowedBook.return_date.is_(None))
+            .group_by(BorrowedBook.reader_id)
+            .order_by(func.count(BorrowedBook.id).desc())
+            .limit(1)
+        )
+        assert most_open <= 3
+        # Выдача, книга и читатель — из одного филиала
+        mismatched = conn.scalar(
+            select(func.count(BorrowedBook.id))
+            .join(Book, Book.id == BorrowedBook.book_id)
+            .join(Reader, Reader.id == BorrowedBook.reader_id)
+            .where(
+                (Book.branch_id != BorrowedBook.branch_id)
+                | (Reader.branch_id != BorrowedBook.branch_id)
+            )
+        )
+        assert mismatched == 0
+
+
+def test_loans_are_skewed_to_popular_books(seeded):
+    engine, _ = seeded
+    with engine.connect() as conn:
+        per_book = conn.scalars(
+            select(func.count(BorrowedBook.id))
+            .group_by(BorrowedBook.book_id)
+            .order_by(func.count(BorrowedBook.id).desc())
+        ).all()
+    # Десятая часть книг получает больше трети выдач
+    assert sum(per_book[:30]) > 5000 / 3
+
+
+def test_indexes_and_name_search_are_rebuilt(tmp_path):
+    engine = make_db(tmp_path / "seed.db")
+    with engine.connect() as conn:
+        before = schema_objects(conn)
+    seed(engine, books=50, readers=20, loans=200, until=UNTIL)
+    with engine.connect() as conn:
+        assert schema_objects(conn) == before
+        first_name = conn.scalar(select(Reader.name)).split()[0]
+        found = conn.scalar(
+            text(
+                "SELECT count(*) FROM readers_name_fts "
+                "WHERE readers_name_fts MATCH :name"
+            ),
+            {"name": first_name},
+        )
+        names = conn.scalar(
+            select(func.count(Reader.id)).where(
+                Reader.name.like(f"%{first_name}%")
+            )
+        )
+        assert found == names > 0
+        # Новые читатели попадают в поиск через восстановленные триггеры
+        conn.execute(
+            Reader.__table__.insert(),
+            {"name": "Joanna Seed", "email": "joanna@x.io"},
+        )
+        assert conn.scalar(
+            text(
+                "SELECT count(*) FROM readers_name_fts "
+                "WHERE readers_name_fts MATCH 'joanna'"
+            )
+        )
+    engine.dispose()
+
+
+def test_main_appends_to_existing_data(tmp_path, monkeypatch, capsys):
+    engine = make_db(tmp_path / "seed.db")
+    monkeypatch.setattr(seed_app, "engine", engine)
+    args = ["--books", "20", "--readers", "5", "--loans", "50"]
+    seed_app.main(args + ["--until", "2026-01-01"])
+    seed_app.main(args + ["--seed", "1"])
+    assert "books: 20" in capsys.readouterr().out
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count(Book.id))) == 40
+        assert conn.scalar(select(func.count(Item.id))) == conn.scalar(
+            select(func.count(func.distinct(Item.barcode)))
+        )
+    with pytest.raises(SystemExit):
+        seed_app.main(["--readers", "1", "--branches", "2"])
+    engine.dispose()
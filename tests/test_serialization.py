@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime
+import json
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import (
+    book_db_management_app,
+    bookkeeping_app,
+    reader_db_management_app,
+    serialization,
+)
+from app.models import Book, BorrowedBook, Reader
+from app.queries import LIVE_BOOK_ROWS
+from app.schemas import BookOut
+from app.serialization import dumps
+
+
+def set_fast_json(monkeypatch, enabled):
+    for module in (
+        book_db_management_app,
+        reader_db_management_app,
+        bookkeeping_app,
+    ):
+        monkeypatch.setattr(module, "FAST_JSON_RESPONSES", enabled)
+
+
+@pytest.fixture
+def library(db_engine):
+    db_session = sessionmaker(bind=db_engine)()
+    book = Book(
+        title="Serialized", author="Author", isbn="ser-1", genre="Poetry"
+    )
+    reader = Reader(name="Serialized Reader", email="ser@example.com")
+    db_session.add_all([book, reader])
+    db_session.commit()
+    db_session.add(
+        BorrowedBook(
+            book_id=book.id,
+            reader_id=reader.id,
+            borrow_date=datetime(2025, 1, 2, 3, 4, 5, 678),
+        )
+    )
+    db_session.commit()
+    db_session.close()
+
+
+@pytest.mark.parametrize("path", ["/books", "/readers", "/borrow"])
+def test_fast_path_matches_response_model(
+    auth_client, library, monkeypatch, path
+):
+    set_fast_json(monkeypatch, False)
+    expected = auth_client.get(path)
+    set_fast_json(monkeypatch, True)
+    fast = auth_client.get(path)
+
+    assert fast.status_code == 200
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == expected.json()
+
+
+def test_stream_joins_chunks_into_one_array(
+    auth_client, library, db_session, monkeypatch
+):
+    db_session.add_all(
+        Book(title=f"Chunk {i}", author="Author", copies=1) for i in range(5)
+    )
+    db_session.commit()
+    set_fast_json(monkeypatch, False)
+    expected = auth_client.get("/books").json()
+    set_fast_json(monkeypatch, True)
+    monkeypatch.setattr(serialization, "STREAM_CHUNK_SIZE", 2)
+
+    assert auth_client.get("/books").json() == expected
+
+
+def test_stream_does_not_use_request_session(db_session, library):
+    response = serialization.json_stream_response(
+        db_session, LIVE_BOOK_ROWS, Book.id, BookOut, chunk_size=1
+    )
+    # Так get_db закрывает сессию запроса до того, как поток прочитан
+    db_session.close()
+
+    async def read_body():
+        chunks = []
+        async for chunk in response.body_iterator:
+            chunks.append(chunk)
+            # Первая порция уже прочитана, а сессия запроса не тронута
+            assert not db_session.in_transaction()
+        return b"".join(chunks)
+
+    body = asyncio.run(read_body())
+    assert [book["title"] for book in json.loads(body)] == ["Serialized"]
+
+
+def test_dumps_formats_datetimes_like_pydantic():
+    value = datetime(2025, 1, 2, 3, 4, 5)
+    assert dumps([{"at": value, "n": None}]) == (
+        b'[{"at":"2025-01-02T03:04:05","n":null}]'
+    )
@@ -0,0 +1,72 @@
+from pathlib import Path
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app import main as main_module
+from app import server_app
+from app.database import dispose_engines, warm_up
+
+
+def test_build_options_for_workers():
+    options = server_app.build_options(
+        server_app.parse_args(["--workers", "4", "--port", "9000"])
+    )
+    assert options["workers"] == 4
+    assert options["port"] == 9000
+    assert options["lifespan"] == "on"
+    assert options["loop"] in ("uvloop", "asyncio")
+    assert options["http"] in ("httptools", "h11")
+
+
+def test_main_passes_import_string(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        server_app.uvicorn,
+        "run",
+        lambda app, **options: calls.append((app, options)),
+    )
+    server_app.main(["--workers", "2"])
+    assert calls[0][0] == "app.main:app"
+    assert calls[0][1]["workers"] == 2
+
+
+def test_warm_up_fills_pool_and_dispose_empties_it(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'warm.db'}")
+    warm_up([engine], connections=3)
+    assert engine.pool.checkedin() == 3
+    dispose_engines([engine])
+    assert engine.pool.checkedin() == 0
+
+
+def test_lifespan_warms_up_and_disposes(monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        main_module, "warm_up", lambda **kw: events.append("warm_up")
+    )
+    monkeypatch.setattr(
+        main_module, "dispose_engines", lambda: events.append("dispose")
+    )
+    with TestClient(main_module.app):
+        assert events == ["warm_up"]
+    assert events == ["warm_up", "dispose"]
+
+
+def test_import_defers_heavy_modules(tmp_path):
+    # Отдельный процесс: в этом модули уже загружены другими тестами
+    probe = (
+        "import sys, app.main; "
+        "print(sorted(m for m in ('jose', 'passlib', 'pyarrow') "
+        "if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=Path(__file__).parent.parent,
+        env={"DATABASE_URL": f"sqlite:///{tmp_path / 'startup.db'}"},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == "[]"
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+import time
+
+import pytest
+
+from app.models import ArchivedLoan, Book, BorrowedBook, Hold, Reader
+from app.purge import purge_deleted
+
+
+@pytest.fixture
+def loan(db_session):
+    """Книга на руках у читателя: (book_id, reader_id)."""
+    book = Book(title="Tombstone", author="Author", copies=1)
+    reader = Reader(name="Soft", email=f"soft{time.time_ns()}@x.io")
+    db_session.add_all([book, reader])
+    db_session.commit()
+    return book.id, reader.id
+
+
+def borrow(auth_client, book_id, reader_id, path="/borrow"):
+    return auth_client.post(
+        path, json={"book_id": book_id, "reader_id": reader_id}
+    )
+
+
+def test_active_loans_block_deletion(auth_client, loan):
+    book_id, reader_id = loan
+    assert borrow(auth_client, book_id, reader_id).status_code == 200
+    assert auth_client.delete(f"/books/{book_id}").status_code == 409
+    assert auth_client.delete(f"/readers/{reader_id}").status_code == 409
+
+    borrow(auth_client, book_id, reader_id, "/borrow/return")
+    assert auth_client.delete(f"/readers/{reader_id}").status_code == 204
+    assert auth_client.delete(f"/books/{book_id}").status_code == 204
+    assert auth_client.delete(f"/books/{book_id}").status_code == 404
+
+
+def test_deleted_rows_are_hidden_but_history_stays(auth_client, loan):
+    book_id, reader_id = loan
+    borrow(auth_client, book_id, reader_id)
+    borrow(auth_client, book_id, reader_id, "/borrow/return")
+    auth_client.delete(f"/books/{book_id}")
+
+    assert auth_client.get(f"/books/{book_id}").status_code == 404
+    assert book_id not in [b["id"] for b in auth_client.get("/books").json()]
+    patch = auth_client.patch(f"/books/{book_id}", json={"year": 1})
+    assert patch.status_code == 404
+    assert borrow(auth_client, book_id, reader_id).status_code == 404
+
+    history = [
+        row
+        for row in auth_client.get("/borrow").json()
+        if row["book_id"] == book_id
+    ]
+    assert [row["title"] for row in history] == ["Tombstone"]
+
+
+def test_deleting_reader_passes_ready_copy_on(auth_client, db_session):
+    suffix = time.time_ns()
+    book = Book(title="Queued", author="Author", copies=0)
+    first = Reader(name="First", email=f"first{suffix}@x.io")
+    second = Reader(name="Second", email=f"second{suffix}@x.io")
+    db_session.add_all([book, first, second])
+    db_session.commit()
+    holds = [
+        Hold(book_id=book.id, reader_id=first.id, status="ready"),
+        Hold(book_id=book.id, reader_id=second.id),
+    ]
+    db_session.add_all(holds)
+    db_session.commit()
+
+    assert auth_client.delete(f"/readers/{first.id}").status_code == 204
+
+    statuses = [auth_client.get(f"/holds/{h.id}").json() for h in holds]
+    assert [s["status"] for s in statuses] == ["cancelled", "ready"]
+
+
+def test_purge_archives_history_in_batches(
+    auth_client, db_engine, db_session, loan
+):
+    book_id, reader_id = loan
+    borrow(auth_client, book_id, reader_id)
+    borrow(auth_client, book_id, reader_id, "/borrow/return")
+    auth_client.delete(f"/books/{book_id}")
+
+    # Свежие метки ещё не подлежат очистке
+    assert purge_deleted(db_engine)["books"] == 0
+    purged = purge_deleted(
+        db_engine, datetime.utcnow() + timedelta(seconds=1), batch_size=1
+    )
+    assert purged["books"] >= 1
+
+    assert db_session.get(Book, book_id) is None
+    assert (
+        db_session.query(BorrowedBook)
+        .filter(BorrowedBook.book_id == book_id)
+        .count()
+        == 0
+    )
+    archived = (
+        db_session.query(ArchivedLoan)
+        .filter(ArchivedLoan.book_id == book_id)
+        .one()
+    )
+    assert (archived.title, archived.reader_id) == ("Tombstone", reader_id)
+    assert archived.return_date is not None
+
+
+def test_deleted_keys_can_be_reused(auth_client):
+    suffix = time.time_ns()
+    reader = {"name": "Returning", "email": f"again{suffix}@x.io"}
+    book = {"title": "Reprint", "author": "Author", "isbn": f"isbn-{suffix}"}
+    for path, body, created in (
+        ("/readers", reader, 201),
+        ("/books", book, 200),
+    ):
+        first = auth_client.post(path, json=body)
+        assert first.status_code == created
+        assert auth_client.post(path, json=body).status_code == 409
+        deleted = auth_client.delete(f"{path}/{first.json()['id']}")
+        assert deleted.status_code == 204
+        # Удалённая строка не занимает email или ISBN
+        second = auth_client.post(path, json=body)
+        assert second.status_code == created
+        assert second.json()["id"] != first.json()["id"]
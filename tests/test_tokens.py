@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+
+from jose import jwt
+import pytest
+
+from app import tokens
+from app.config_app import ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY
+from app.models import RevokedToken
+from app.purge import purge_deleted
+from app.tokens import BloomFilter, RevocationList
+
+LIBRARIAN = {"username": "first_librarian@library.com", "password": "qwe123"}
+
+
+def login(client):
+    response = client.post("/librarian/login", data=LIBRARIAN)
+    assert response.status_code == 200
+    return response.json()
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_login_returns_short_access_token_and_refresh_token(client):
+    pair = login(client)
+    assert pair["expires_in"] == ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    assert jwt.get_unverified_header(pair["access_token"])["kid"] == "default"
+    claims = jwt.get_unverified_claims(pair["access_token"])
+    expires = datetime.utcfromtimestamp(claims["exp"]) - datetime.utcnow()
+    assert expires <= timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    assert claims["typ"] == "access"
+    headers = bearer(pair["access_token"])
+    assert client.get("/books", headers=headers).status_code == 200
+    # refresh-токен не открывает эндпоинты
+    headers = bearer(pair["refresh_token"])
+    assert client.get("/books", headers=headers).status_code == 401
+
+
+def test_refresh_rotates_the_refresh_token(client):
+    pair = login(client)
+    body = {"refresh_token": pair["refresh_token"]}
+    response = client.post("/librarian/refresh", json=body)
+    assert response.status_code == 200
+    fresh = response.json()
+    assert fresh["refresh_token"] != pair["refresh_token"]
+    headers = bearer(fresh["access_token"])
+    assert client.get("/books", headers=headers).status_code == 200
+    # Повторный обмен того же refresh-токена отклоняется
+    assert client.post("/librarian/refresh", json=body).status_code == 401
+    body = {"refresh_token": pair["access_token"]}
+    assert client.post("/librarian/refresh", json=body).status_code == 401
+
+
+def test_logout_revokes_access_and_refresh_tokens(client):
+    pair = login(client)
+    headers = bearer(pair["access_token"])
+    response = client.post(
+        "/librarian/logout",
+        json={"refresh_token": pair["refresh_token"]},
+        headers=headers,
+    )
+    assert response.status_code == 204
+    assert client.get("/books", headers=headers).status_code == 401
+    body = {"refresh_token": pair["refresh_token"]}
+    assert client.post("/librarian/refresh", json=body).status_code == 401
+
+
+def test_refresh_and_logout_are_audited(client):
+    pair = login(client)
+    body = {"refresh_token": pair["refresh_token"]}
+    fresh = client.post("/librarian/refresh", json=body).json()
+    client.post(
+        "/librarian/logout",
+        json={"refresh_token": fresh["refresh_token"]},
+        headers=bearer(fresh["access_token"]),
+    )
+    headers = bearer(login(client)["access_token"])
+    entries = client.get(
+        "/audit", params={"entity": "token"}, headers=headers
+    ).json()
+    jti = [
+        jwt.get_unverified_claims(token)["jti"]
+        for token in (
+            pair["refresh_token"],
+            fresh["access_token"],
+            fresh["refresh_token"],
+        )
+    ]
+    assert [(e["action"], e["diff"]["revoked"][1]) for e in entries] == [
+        ("refresh", jti[:1]),
+        ("logout", jti[1:]),
+    ]
+
+
+def test_signing_key_rotation(client, monkeypatch):
+    old = login(client)["access_token"]
+    monkeypatch.setattr(
+        tokens, "SIGNING_KEYS", {"default": SECRET_KEY, "k2": "rotated"}
+    )
+    monkeypatch.setattr(tokens, "SIGNING_KID", "k2")
+    new = login(client)["access_token"]
+    assert jwt.get_unverified_header(new)["kid"] == "k2"
+    for token in (old, new):
+        assert client.get("/books", headers=bearer(token)).status_code == 200
+    # Старый ключ убран: выданные им токены больше не принимаются
+    monkeypatch.setattr(tokens, "SIGNING_KEYS", {"k2": "rotated"})
+    assert client.get("/books", headers=bearer(old)).status_code == 401
+    assert client.get("/books", headers=bearer(new)).status_code == 200
+
+
+def test_startup_requires_signing_key(monkeypatch):
+    tokens.check_signing_keys()
+    monkeypatch.setattr(tokens, "SIGNING_KEYS", {})
+    with pytest.raises(RuntimeError, match="SECRET_KEY"):
+        tokens.check_signing_keys()
+    monkeypatch.setattr(tokens, "SIGNING_KEYS", {"k2": "rotated"})
+    with pytest.raises(RuntimeError, match="SIGNING_KID"):
+        tokens.check_signing_keys()
+
+
+def test_revocations_of_other_processes_are_synced(db_session):
+    revocations = RevocationList(bits=4096, hashes=5, sync_seconds=0)
+    revocations.sync(db_session)
+    assert not revocations.is_revoked(db_session, "stolen")
+    # Отзыв записал другой воркер: фильтр узнаёт о нём при синхронизации
+    db_session.add(
+        RevokedToken(
+            jti="stolen", expires_at=datetime.utcnow() + timedelta(hours=1)
+        )
+    )
+    db_session.flush()
+    assert not revocations.is_revoked(db_session, "stolen")
+    revocations.sync(db_session)
+    assert revocations.is_revoked(db_session, "stolen")
+
+
+def test_purge_removes_expired_revocations(db_engine, db_session):
+    now = datetime.utcnow()
+    db_session.add_all(
+        [
+            RevokedToken(jti="expired", expires_at=now - timedelta(hours=1)),
+            RevokedToken(jti="live", expires_at=now + timedelta(hours=1)),
+        ]
+    )
+    db_session.commit()
+    assert purge_deleted(db_engine)["revoked_tokens"] == 1
+    assert [row.jti for row in db_session.query(RevokedToken)] == ["live"]
+
+
+@pytest.mark.parametrize("keys", [10, 1000])
+def test_bloom_filter_has_no_false_negatives(keys):
+    bloom = BloomFilter(bits=16384, hashes=7)
+    for i in range(keys):
+        bloom.add(f"jti-{i}")
+    assert all(f"jti-{i}" in bloom for i in range(keys))
+    false_positives = sum(f"other-{i}" in bloom for i in range(1000))
+    assert false_positives < 50